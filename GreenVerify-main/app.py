@@ -1,12 +1,35 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-import joblib
 import os
+import json
+import itertools
+import random
+import secrets
+import time
 import google.generativeai as genai
+from google.api_core.exceptions import InvalidArgument
 from datetime import datetime
 from dotenv import load_dotenv
+from inference import preprocess_batch, score
+from store import create_store
+from response_cache import ResponseCache, canonical_key
+from llm_pool import LLMPool
+from gemini_probe import GeminiProbe
+from artifact import load_trained_model
+from model_registry import ModelRegistry
+from batcher import MicroBatcher
+from prediction_cache import PredictionCache
+import metrics
+from metrics import FALLBACKS, LLM_ERRORS, LLM_SECONDS, timed
+from profiler import StackSampler
+from explain import Explainer, prompt_context, summary_text
+from whatif import WhatIfOptimizer, suggestion_lines
+import prompts
+from conversation import ConversationMemory, parse_structured_response, partial_json_string
+from retrieval import RetrievalIndex
+from drift import DriftMonitor
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,154 +39,408 @@ app = Flask(__name__)
 # Configure Google Gemini AI from environment variable
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Gemini state, filled in by the background readiness probe
+gemini_model = None
+gemini_model_name = None
+gemini_available = False
+gemini_probe = None
+
+def set_gemini_model(model, model_name):
+    """
+    Switch GreenyBot between LLM mode and offline mode
+    """
+    global gemini_model, gemini_model_name, gemini_available
+    gemini_model = model
+    gemini_model_name = model_name
+    gemini_available = model is not None
+
 if not GEMINI_API_KEY:
     print("Warning: GEMINI_API_KEY not found in environment variables")
-    gemini_available = False
 else:
     genai.configure(api_key=GEMINI_API_KEY)
 
-    # Initialize Gemini model with correct model name
-    try:
-        # Try different model names that are commonly available
-        model_names = [
+    # Probe model names that are commonly available in the background, so
+    # /predict is served immediately and LLM mode switches on once ready
+    gemini_probe = GeminiProbe(
+        model_names=[
             'gemini-2.5-flash',
             'gemini-1.5-flash',
             'gemini-pro'
-        ]
-        
-        gemini_model = None
-        gemini_available = False
-        
-        for model_name in model_names:
-            try:
-                gemini_model = genai.GenerativeModel(model_name)
-                # Test the model with a simple query
-                test_response = gemini_model.generate_content("Test")
-                gemini_available = True
-                print(f"Successfully initialized Gemini model: {model_name}")
-                break
-            except Exception as model_error:
-                print(f"Failed to initialize {model_name}: {model_error}")
-                continue
-        
-        if not gemini_available:
-            print("Warning: No Gemini models available")
-            
-    except Exception as e:
-        print(f"Warning: Gemini AI initialization failed: {e}")
-        gemini_available = False
+        ],
+        create_model=genai.GenerativeModel,
+        on_change=set_gemini_model,
+        interval=float(os.environ.get('GEMINI_PROBE_INTERVAL_SECONDS', 600)),
+        retry_interval=float(os.environ.get('GEMINI_RETRY_INTERVAL_SECONDS', 60)),
+        probe_timeout=float(os.environ.get('GEMINI_PROBE_TIMEOUT_SECONDS', 10))
+    ).start()
+
+    # Give the first probe a short startup budget before serving
+    gemini_probe.wait(float(os.environ.get('GEMINI_STARTUP_BUDGET_SECONDS', 2)))
 
 # ---------------------------
 # Load Existing Model Files
 # ---------------------------
-def load_trained_model():
+MODELS_DIR = os.environ.get('MODELS_DIR', 'models')
+
+def load_warmup_rows(path='green_building.csv', count=32):
     """
-    Loads pre-trained model files from the models directory.
+    Sample rows used to warm up a newly loaded model before it serves traffic
     """
     try:
-        # Check if all required files exist
-        required_files = [
-            'models/xgboost_green_certified_model.pkl',
-            'models/label_encoders.pkl', 
-            'models/feature_names.pkl',
-            'models/scaler.pkl',
-            'models/reverse_mapping.pkl'
-        ]
-        
-        for file_path in required_files:
-            if not os.path.exists(file_path):
-                return None, None, None, None, f"Required file missing: {file_path}"
-        
-        # Load all components
-        model = joblib.load('models/xgboost_green_certified_model.pkl')
-        label_encoders = joblib.load('models/label_encoders.pkl')
-        feature_names = joblib.load('models/feature_names.pkl')
-        scaler = joblib.load('models/scaler.pkl')
-        reverse_mapping = joblib.load('models/reverse_mapping.pkl')
-        
-        return model, feature_names, label_encoders, scaler, reverse_mapping
-        
-    except Exception as e:
-        return None, None, None, None, f"Error loading model: {str(e)}"
+        return pd.read_csv(path, nrows=count).to_dict('records')
+    except Exception:
+        return []
 
-# Load pre-trained model on startup
-model, feature_names, label_encoders, scaler, reverse_mapping = load_trained_model()
+# Load pre-trained model on startup, then watch for new versions and
+# hot-swap them without restarting workers
+model_registry = ModelRegistry(
+    load_trained_model,
+    models_dir=MODELS_DIR,
+    poll_interval=float(os.environ.get('MODEL_WATCH_INTERVAL_SECONDS', 30)),
+    warmup_rows=load_warmup_rows()
+)
+# No warm-up here: the master may fork right after this when preloaded
+model_registry.load(warm_up=False)
+model_registry.start_watching()
 
 # Set status message
-if model is not None:
+if model_registry.current() is not None:
     train_status = "Pre-trained model loaded successfully!"
 else:
     train_status = "Could not load pre-trained model files."
 
-# Store user session data (in production, use proper session management)
-user_sessions = {}
+# Score from raw booster margins instead of probabilities (opt-in)
+PREDICT_OUTPUT_MARGIN = os.environ.get('PREDICT_OUTPUT_MARGIN', '0') == '1'
+
+# Coalesce concurrent /predict calls into one booster pass (off by default)
+PREDICT_BATCH_WINDOW_MS = float(os.environ.get('PREDICT_BATCH_WINDOW_MS', 0))
+if PREDICT_BATCH_WINDOW_MS > 0:
+    predict_batcher = MicroBatcher(
+        window_ms=PREDICT_BATCH_WINDOW_MS,
+        max_rows=int(os.environ.get('PREDICT_BATCH_MAX_ROWS', 32)),
+        output_margin=PREDICT_OUTPUT_MARGIN
+    )
+else:
+    predict_batcher = None
+
+# Store user session data in a bounded store with LRU + TTL eviction.
+# Use SESSION_BACKEND=sqlite to share sessions between gunicorn workers.
+user_sessions = create_store(
+    backend=os.environ.get('SESSION_BACKEND', 'memory'),
+    path=os.environ.get('SESSION_DB_PATH', 'sessions.db'),
+    table='sessions',
+    max_entries=int(os.environ.get('SESSION_MAX_ENTRIES', 10000)),
+    max_bytes=int(os.environ.get('SESSION_MAX_BYTES', 64 * 1024 * 1024)),
+    ttl=int(os.environ.get('SESSION_TTL_SECONDS', 3600))
+)
+
+# Every in-process cache registers its clear function here, so
+# clear_caches() can make the next request cold, e.g. between load-test runs
+cache_clearers = []
+
+def register_cache(clear):
+    cache_clearers.append(clear)
+    return clear
+
+def clear_caches():
+    for clear in cache_clearers:
+        clear()
+
+# Cache Gemini assessments and sections keyed on their content.
+# Use LLM_CACHE_BACKEND=sqlite to persist the cache to disk.
+llm_cache = ResponseCache(create_store(
+    backend=os.environ.get('LLM_CACHE_BACKEND', 'memory'),
+    path=os.environ.get('LLM_CACHE_PATH', 'llm_cache.db'),
+    table='llm_responses',
+    max_entries=int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 5000)),
+    max_bytes=int(os.environ.get('LLM_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    ttl=int(os.environ.get('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+))
+register_cache(llm_cache.store.clear)
+
+# Per-process LRU cache of model outputs for duplicate /predict inputs.
+# Keys include the model version, and the cache is cleared on every swap.
+prediction_cache = PredictionCache(create_store(
+    backend='memory',
+    max_entries=int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', 10000)),
+    ttl=0
+))
+model_registry.on_swap(prediction_cache.invalidate)
+register_cache(prediction_cache.invalidate)
+
+# Local explanations from the booster's feature contributions, one
+# Explainer per model version, with an LRU cache of explained rows
+EXPLAIN_REFERENCE_CSV = os.environ.get('EXPLAIN_REFERENCE_CSV', 'green_building.csv')
+MAX_EXPLAIN_ROWS = int(os.environ.get('MAX_EXPLAIN_ROWS', 1000))
+EXPLAIN_PROMPT_FACTORS = int(os.environ.get('EXPLAIN_PROMPT_FACTORS', 6))
+explanation_cache = create_store(
+    backend='memory',
+    max_entries=int(os.environ.get('EXPLANATION_CACHE_MAX_ENTRIES', 2000)),
+    ttl=0
+)
+explainers = {}
+
+def get_explainer(bundle):
+    explainer = explainers.get(bundle.version)
+    if explainer is None:
+        explainer = explainers.setdefault(
+            bundle.version, Explainer(bundle, EXPLAIN_REFERENCE_CSV, explanation_cache)
+        )
+    return explainer
+
+def reset_explainers(bundle=None):
+    # On a swap, keep the new version's explainer, whose baseline was
+    # computed on load; without a bundle, drop every explainer
+    keep = bundle.version if bundle is not None else None
+    for version in [v for v in explainers if v != keep]:
+        explainers.pop(version, None)
+    explanation_cache.clear()
+
+model_registry.on_swap(reset_explainers)
+register_cache(reset_explainers)
+
+# Offline what-if search for the smallest changes that raise the rating,
+# one optimizer per model version, with an LRU cache of searched inputs
+WHATIF_TIME_BUDGET = float(os.environ.get('WHATIF_TIME_BUDGET_SECONDS', 0.5))
+whatif_cache = create_store(
+    backend='memory',
+    max_entries=int(os.environ.get('WHATIF_CACHE_MAX_ENTRIES', 2000)),
+    ttl=0
+)
+optimizers = {}
+
+def get_optimizer(bundle):
+    optimizer = optimizers.get(bundle.version)
+    if optimizer is None:
+        optimizer = optimizers.setdefault(
+            bundle.version,
+            WhatIfOptimizer(bundle, EXPLAIN_REFERENCE_CSV, whatif_cache, time_budget=WHATIF_TIME_BUDGET)
+        )
+    return optimizer
+
+def reset_optimizers(bundle=None):
+    keep = bundle.version if bundle is not None else None
+    for version in [v for v in optimizers if v != keep]:
+        optimizers.pop(version, None)
+    whatif_cache.clear()
+
+model_registry.on_swap(reset_optimizers)
+register_cache(reset_optimizers)
+
+def prepare_bundle(bundle, nthread=0):
+    """
+    Build the explainer baseline and what-if optimizer for a bundle before
+    it serves traffic, instead of on the first request that needs them
+    """
+    # Files rewritten in place keep their version name, so start afresh
+    explainers.pop(bundle.version, None)
+    optimizers.pop(bundle.version, None)
+    try:
+        get_explainer(bundle).baseline(nthread)
+        get_optimizer(bundle)
+    except Exception as e:
+        print(f"Warning: could not prepare explanations for model {bundle.version}: {e}")
+
+# Hot-reloaded versions are prepared during their warm-up. The model loaded
+# above is prepared here, on one thread since the master may fork next,
+# so preloaded workers inherit its baseline.
+model_registry.on_load(prepare_bundle)
+if model_registry.current() is not None:
+    prepare_bundle(model_registry.current(), nthread=1)
+
+# Input drift and data-quality monitor: per-feature histograms of live
+# inputs against EXPLAIN_REFERENCE_CSV, plus counts of clamped, unseen,
+# invalid and all-zero inputs. Raw inputs are never stored.
+DRIFT_MONITOR = os.environ.get('DRIFT_MONITOR', '1') == '1'
+
+def load_drift_monitor(bundle):
+    if not DRIFT_MONITOR or bundle is None:
+        return None
+    try:
+        return DriftMonitor(
+            EXPLAIN_REFERENCE_CSV, bundle.feature_names, bundle.label_encoders,
+            bins=int(os.environ.get('DRIFT_BINS', 10)),
+            window=int(os.environ.get('DRIFT_WINDOW_ROWS', 5000)),
+            min_rows=int(os.environ.get('DRIFT_MIN_ROWS', 200))
+        )
+    except Exception as e:
+        print(f"Warning: Drift monitor not available: {e}")
+        return None
+
+drift_monitor = load_drift_monitor(model_registry.current())
+
+def reset_drift_monitor(bundle):
+    global drift_monitor
+    if drift_monitor is None or list(bundle.feature_names) != drift_monitor.feature_names:
+        drift_monitor = load_drift_monitor(bundle)
+
+model_registry.on_swap(reset_drift_monitor)
+
+# Run Gemini calls on a bounded pool apart from the request workers.
+# Running plus queued calls stay below the request threads (see
+# gunicorn.conf.py), so a full pool never holds every thread.
+llm_pool = LLMPool(
+    max_workers=int(os.environ.get('LLM_POOL_WORKERS', 4)),
+    max_pending=int(os.environ.get('LLM_POOL_PENDING', 2)),
+    timeout=float(os.environ.get('LLM_TIMEOUT_SECONDS', 30))
+)
+
+# Estimated token budget per Gemini prompt; templates cut their
+# trimmable fields (building context, what-if text, long questions) to fit
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 1536))
+register_cache(prompts.clear_context_cache)
+
+# GreenyBot conversation memory kept in each session: recent turns up to
+# CHAT_HISTORY_TOKENS, older turns compacted into a rolling summary
+chat_memory = ConversationMemory(
+    turn_budget=int(os.environ.get('CHAT_HISTORY_TOKENS', 400)),
+    summary_budget=int(os.environ.get('CHAT_SUMMARY_TOKENS', 150))
+)
+
+# Ask Gemini for follow-up questions as structured JSON; switched off for
+# the process if the model rejects JSON mode
+chat_json_mode = os.environ.get('CHAT_JSON_MODE', '1') == '1'
+CHAT_JSON_CONFIG = {'response_mime_type': 'application/json'}
+
+# Hot-path stage timers, exported on /metrics
+STAGE_PARSE = metrics.stage('parse_form')
+STAGE_ENCODE = metrics.stage('encode')
+STAGE_SCALE = metrics.stage('scale')
+STAGE_CACHE = metrics.stage('prediction_cache')
+STAGE_SCORE = metrics.stage('score')
+STAGE_SESSION = metrics.stage('session_store')
+STAGE_BATCH_PREPROCESS = metrics.stage('batch_preprocess')
+STAGE_BATCH_SCORE = metrics.stage('batch_score')
+STAGE_EXPLAIN = metrics.stage('explain')
+STAGE_WHATIF = metrics.stage('whatif')
+STAGE_RETRIEVAL = metrics.stage('retrieval')
+STAGE_DRIFT = metrics.stage('drift_monitor')
+
+# Sampling profiler, enabled per request with an X-Profile: 1 header or
+# for a random PROFILE_SAMPLE_RATE share of requests
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', '0') == '1'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    if PROFILE_REQUESTS and (
+        request.headers.get('X-Profile') == '1' or random.random() < PROFILE_SAMPLE_RATE
+    ):
+        g.profiler = StackSampler(interval=PROFILE_INTERVAL).start()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    start = g.get('request_start')
+    if start is not None:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+    metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            name = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{endpoint.strip('/') or 'index'}-{os.getpid()}.folded"
+            path = os.path.join(PROFILE_DIR, name)
+            with open(path, 'w') as f:
+                f.write(profiler.collapsed())
+            response.headers['X-Profile-File'] = path
+        except OSError as e:
+            print(f"Warning: could not write profile: {e}")
+    return response
 
 @app.route('/')
 def index():
+    bundle = model_registry.current()
     return render_template('index.html', 
-                         feature_names=feature_names, 
-                         label_encoders=label_encoders,
+                         feature_names=bundle.feature_names if bundle else None, 
+                         label_encoders=bundle.label_encoders if bundle else None,
                          train_status=train_status,
-                         model=model)
+                         model=bundle.model if bundle else None)
 
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        if not model or not feature_names:
+        # Pin one model version for the whole request
+        bundle = model_registry.current()
+        if bundle is None:
             return jsonify({'error': 'Model not available'})
         
         # Get form data
-        inputs = {}
-        for feature in feature_names:
-            value = request.form.get(feature)
-            if feature in label_encoders:
-                inputs[feature] = value
-            else:
-                # Convert to float and ensure non-negative
-                num_value = float(value) if value else 0.0
-                inputs[feature] = max(0.0, num_value)  # Prevent negative values
-        
-        # Create input dataframe
-        input_data = {feature: [inputs[feature]] for feature in feature_names}
-        input_df = pd.DataFrame(input_data)
+        monitor = drift_monitor
+        with STAGE_PARSE.time():
+            inputs = {}
+            clamped = []
+            for feature in bundle.feature_names:
+                value = request.form.get(feature)
+                if feature in bundle.label_encoders:
+                    inputs[feature] = value
+                else:
+                    # Convert to float and ensure non-negative
+                    try:
+                        num_value = float(value) if value else 0.0
+                    except ValueError:
+                        if monitor is not None:
+                            monitor.observe_invalid(feature)
+                        raise
+                    if num_value < 0:
+                        clamped.append(feature)
+                    inputs[feature] = max(0.0, num_value)  # Prevent negative values
         
         # Check if all values are zero (not certified)
-        if input_df.replace(0, np.nan).dropna(axis=1, how='all').empty:
+        all_zero = bundle.layout.is_all_zero(inputs)
+        if monitor is not None:
+            with STAGE_DRIFT.time():
+                monitor.observe(inputs, bundle.layout, clamped, all_zero)
+        if all_zero:
             return jsonify({
                 'warning': True,
                 'message': 'This building is not certified.'
             })
         
-        # Encode categorical features
-        for col, encoder in label_encoders.items():
-            if col in input_df.columns:
-                try:
-                    input_df[col] = encoder.transform(input_df[col])
-                except ValueError:
-                    input_df[col] = 0
+        # Encode and scale straight into the precompiled feature row
+        with STAGE_ENCODE.time():
+            input_row = bundle.layout.fill_row(inputs)
+        with STAGE_SCALE.time():
+            bundle.layout.scale_inplace(input_row)
         
-        # Scale numeric features
-        num_features_to_scale = [f for f in feature_names if f not in label_encoders]
-        if num_features_to_scale:
-            input_df[num_features_to_scale] = scaler.transform(input_df[num_features_to_scale])
-        
-        # Make prediction
-        prediction_probs = model.predict_proba(input_df)[0]
-        prediction_idx = model.predict(input_df)[0]
-        prediction_label = reverse_mapping[prediction_idx]
+        # Duplicate inputs are answered from the prediction cache
+        with STAGE_CACHE.time():
+            cache_key = prediction_cache.key(bundle.version, input_row)
+            cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            prediction_probs, prediction_idx = cached
+        else:
+            # Make prediction: one booster pass gives probabilities and label
+            with STAGE_SCORE.time():
+                if predict_batcher is not None:
+                    prediction_probs, prediction_idx = predict_batcher.score(bundle, input_row)
+                else:
+                    probs, indices = score(bundle.booster, input_row, PREDICT_OUTPUT_MARGIN)
+                    prediction_probs = probs[0]
+                    prediction_idx = int(indices[0])
+            prediction_cache.put(cache_key, prediction_probs, prediction_idx)
+        prediction_label = bundle.reverse_mapping[prediction_idx]
         
-        # Store session data
-        session_id = str(hash(str(inputs)))
-        user_sessions[session_id] = {
-            'inputs': inputs,
-            'prediction': prediction_label,
-            'probabilities': prediction_probs
-        }
+        # Store session data under a fresh random id, so users who submit
+        # the same building never share a session or its conversation
+        session_id = secrets.token_urlsafe(16)
+        with STAGE_SESSION.time():
+            user_sessions.set(session_id, {
+                'inputs': inputs,
+                'prediction': int(prediction_label),
+                'probabilities': prediction_probs.tolist(),
+                'model_version': bundle.version
+            })
         
         # Prepare probabilities for response
         probabilities = []
         for idx, prob in enumerate(prediction_probs):
-            label = reverse_mapping[idx]
+            label = bundle.reverse_mapping[idx]
             probabilities.append({
                 'label': int(label),
                 'probability': float(prob)
@@ -174,39 +451,350 @@ def predict():
             'prediction': int(prediction_label),
             'probabilities': probabilities,
             'confidence': float(prediction_probs[prediction_idx]),
-            'session_id': session_id
+            'session_id': session_id,
+            'model_version': bundle.version
         })
         
     except Exception as e:
         return jsonify({'error': f'Prediction error: {str(e)}'})
 
+# Upper bound on rows accepted by a single /predict_batch call
+MAX_BATCH_ROWS = int(os.environ.get('MAX_BATCH_ROWS', 10000))
+
+def read_batch_request():
+    """
+    Read a batch of buildings from a CSV upload or a JSON array of objects.
+    """
+    if 'file' in request.files:
+        return pd.read_csv(request.files['file'])
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('rows')
+    if not isinstance(data, list):
+        raise ValueError('Expected a CSV file upload or a JSON array of buildings')
+    return pd.DataFrame(data)
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """
+    Score a whole portfolio of buildings in a single vectorized pass
+    """
+    try:
+        bundle = model_registry.current()
+        if bundle is None:
+            return jsonify({'error': 'Model not available'})
+
+        batch_df = read_batch_request()
+        if batch_df.empty:
+            return jsonify({'error': 'No buildings provided'})
+        if len(batch_df) > MAX_BATCH_ROWS:
+            return jsonify({'error': f'Batch too large: maximum is {MAX_BATCH_ROWS} rows'})
+
+        with STAGE_BATCH_PREPROCESS.time():
+            features, zero_mask, invalid_mask, features_df = preprocess_batch(bundle, batch_df)
+        score_mask = ~(zero_mask | invalid_mask)
+        monitor = drift_monitor
+        if monitor is not None:
+            with STAGE_DRIFT.time():
+                monitor.observe_batch(batch_df, bundle.layout, zero_mask, invalid_mask)
+
+        # Optional per-row explanations (?explain=1), top factors only
+        explain_rows = request.args.get('explain') == '1'
+        if explain_rows and score_mask.sum() > MAX_EXPLAIN_ROWS:
+            return jsonify({'error': f'Too many rows to explain: maximum is {MAX_EXPLAIN_ROWS}'})
+
+        # Make predictions for every scorable row at once
+        prediction_probs = np.empty((0, len(bundle.reverse_mapping)))
+        prediction_idx = np.empty(0, dtype=np.intp)
+        if score_mask.any():
+            with STAGE_BATCH_SCORE.time():
+                prediction_probs, prediction_idx = score(
+                    bundle.booster, features[score_mask], PREDICT_OUTPUT_MARGIN
+                )
+        labels = [int(bundle.reverse_mapping[idx]) for idx in range(prediction_probs.shape[1])]
+
+        explanations = []
+        if explain_rows and score_mask.any():
+            with STAGE_EXPLAIN.time():
+                explanations = get_explainer(bundle).explain_batch(
+                    features[score_mask],
+                    features_df[score_mask].to_dict('records'),
+                    prediction_idx,
+                    top_n=3
+                )
+
+        results = []
+        scored = 0
+        for row in range(len(features)):
+            if invalid_mask[row]:
+                results.append({'row': row, 'error': 'Invalid numeric value'})
+            elif zero_mask[row]:
+                results.append({
+                    'row': row,
+                    'warning': True,
+                    'message': 'This building is not certified.'
+                })
+            else:
+                probs = prediction_probs[scored]
+                idx = prediction_idx[scored]
+                results.append({
+                    'row': row,
+                    'prediction': labels[idx],
+                    'probabilities': [
+                        {'label': label, 'probability': float(prob)}
+                        for label, prob in zip(labels, probs)
+                    ],
+                    'confidence': float(probs[idx])
+                })
+                if explanations:
+                    results[-1]['top_factors'] = explanations[scored]['factors']
+                scored += 1
+
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'results': results,
+            'model_version': bundle.version
+        })
+
+    except Exception as e:
+        return jsonify({'error': f'Batch prediction error: {str(e)}'})
+
+def explain_inputs(user_inputs, prediction_rating, top_n=None):
+    """
+    Explain a session's predicted rating with the current model, or None
+    if the model is unavailable or the rating is not one of its classes
+    """
+    bundle = model_registry.current()
+    if bundle is None:
+        return None
+    class_index = next(
+        (idx for idx, label in bundle.reverse_mapping.items() if int(label) == int(prediction_rating)), None
+    )
+    if class_index is None:
+        return None
+    with STAGE_EXPLAIN.time():
+        row = bundle.layout.encode_row(user_inputs)
+        return get_explainer(bundle).explain(row, user_inputs, class_index, top_n)
+
+def whatif_inputs(user_inputs, prediction_rating, target_rating=None):
+    """
+    Search the smallest input changes that raise a session's rating with
+    the current model, or None if the model is unavailable
+    """
+    bundle = model_registry.current()
+    if bundle is None:
+        return None
+    with STAGE_WHATIF.time():
+        return get_optimizer(bundle).search(user_inputs, int(prediction_rating), target_rating)
+
+def whatif_text(user_inputs, prediction_rating):
+    """
+    Plain-text what-if suggestions for the report sections, or None when
+    there are none to give
+    """
+    try:
+        result = whatif_inputs(user_inputs, prediction_rating)
+    except Exception as e:
+        print(f"What-if error: {e}")
+        return None
+    if not result or not result['suggestions']:
+        return None
+    lines = suggestion_lines(result)
+    return f"To reach at least {result['target_rating']} stars, the smallest changes the model responds to are:\n" + "\n".join(lines)
+
+# Offline "Why This Rating?" text for each rating
+RATING_EXPLANATIONS = {
+    1: """This building received a 1-star GRIHA rating, indicating basic compliance with minimal green features. 
+         The building meets fundamental requirements but has significant room for improvement in sustainability measures.
+         Key areas likely lacking include energy efficiency systems, water conservation measures, and sustainable material usage.""",
+
+    2: """This building achieved a 2-star GRIHA rating, showing good performance with some green initiatives implemented.
+         While better than basic compliance, there are still substantial opportunities to enhance sustainability features
+         such as improved energy systems, better water management, and enhanced indoor environmental quality.""",
+
+    3: """This building earned a 3-star GRIHA rating, demonstrating very good performance with multiple sustainability measures.
+         The building shows commitment to green practices with adequate energy efficiency, water conservation, and
+         sustainable design elements, though improvements are still possible.""",
+
+    4: """This building achieved a 4-star GRIHA rating, indicating excellent performance with comprehensive green features.
+         The building demonstrates strong sustainability practices across energy, water, materials, and indoor environmental
+         quality, with only minor enhancements needed to reach the highest rating.""",
+
+    5: """This building earned the prestigious 5-star GRIHA rating, representing outstanding performance and serving as
+         a benchmark for sustainable buildings. The building excels in all sustainability criteria including energy
+         efficiency, water conservation, sustainable materials, and innovative design processes."""
+}
+
 def get_fallback_assessment(user_inputs, prediction_rating):
     """
     Provide fallback assessment when Gemini is not available
     """
-    rating_explanations = {
-        1: """This building received a 1-star GRIHA rating, indicating basic compliance with minimal green features. 
-             The building meets fundamental requirements but has significant room for improvement in sustainability measures.
-             Key areas likely lacking include energy efficiency systems, water conservation measures, and sustainable material usage.""",
-        
-        2: """This building achieved a 2-star GRIHA rating, showing good performance with some green initiatives implemented.
-             While better than basic compliance, there are still substantial opportunities to enhance sustainability features
-             such as improved energy systems, better water management, and enhanced indoor environmental quality.""",
-        
-        3: """This building earned a 3-star GRIHA rating, demonstrating very good performance with multiple sustainability measures.
-             The building shows commitment to green practices with adequate energy efficiency, water conservation, and
-             sustainable design elements, though improvements are still possible.""",
-        
-        4: """This building achieved a 4-star GRIHA rating, indicating excellent performance with comprehensive green features.
-             The building demonstrates strong sustainability practices across energy, water, materials, and indoor environmental
-             quality, with only minor enhancements needed to reach the highest rating.""",
-        
-        5: """This building earned the prestigious 5-star GRIHA rating, representing outstanding performance and serving as
-             a benchmark for sustainable buildings. The building excels in all sustainability criteria including energy
-             efficiency, water conservation, sustainable materials, and innovative design processes."""
-    }
+    FALLBACKS.inc(kind='assessment')
     
-    return rating_explanations.get(prediction_rating, "Rating assessment unavailable.")
+    assessment = RATING_EXPLANATIONS.get(prediction_rating, "Rating assessment unavailable.")
+
+    # Ground the canned text in what actually drove the model's decision
+    try:
+        explanation = explain_inputs(user_inputs, prediction_rating)
+    except Exception as e:
+        print(f"Explanation error: {e}")
+        explanation = None
+    if explanation is not None:
+        assessment = f"{assessment}\n\n{summary_text(explanation)}"
+    if retrieval_index is not None:
+        with STAGE_RETRIEVAL.time():
+            assessment = f"{assessment}\n\n{retrieval_index.rating_summary(user_inputs)}"
+    return assessment
+
+def call_gemini(kind, prompt, generation_config=None):
+    """
+    Call generate_content, recording its latency and any error by kind
+    """
+    start = time.perf_counter()
+    try:
+        if generation_config is not None:
+            return gemini_model.generate_content(prompt, generation_config=generation_config)
+        return gemini_model.generate_content(prompt)
+    except Exception as e:
+        LLM_ERRORS.inc(kind=kind, error=type(e).__name__)
+        raise
+    finally:
+        LLM_SECONDS.observe(time.perf_counter() - start, kind=kind)
+
+def call_gemini_timed(kind, prompt):
+    """
+    call_gemini plus the seconds that call took, for callers that run
+    several calls at once and need each one's own generation time
+    """
+    start = time.perf_counter()
+    response = call_gemini(kind, prompt)
+    return response, time.perf_counter() - start
+
+def generate_text(prompt, kind='text', generation_config=None):
+    """
+    Send a prompt to Gemini on the LLM pool and return the response text, or None if empty
+    """
+    response = llm_pool.call(call_gemini, kind, prompt, generation_config)
+    return response.text if response and response.text else None
+
+def stream_text(prompt, kind='text', generation_config=None):
+    """
+    Stream response text chunks for a prompt, generated on the LLM pool
+    """
+    options = {'generation_config': generation_config} if generation_config is not None else {}
+
+    def chunks():
+        start = time.perf_counter()
+        try:
+            for chunk in gemini_model.generate_content(prompt, stream=True, **options):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks that only carry a finish reason have no text parts
+                    continue
+                if text:
+                    yield text
+        except Exception as e:
+            LLM_ERRORS.inc(kind=kind, error=type(e).__name__)
+            raise
+        finally:
+            LLM_SECONDS.observe(time.perf_counter() - start, kind=kind)
+    return llm_pool.stream(chunks)
+
+def response_cache_key(template, user_inputs, prediction_rating, prompt):
+    """
+    Cache key for generated text: building inputs, rating, prompt template
+    and Gemini model name
+    """
+    return canonical_key(
+        template=template,
+        inputs=user_inputs,
+        rating=prediction_rating,
+        prompt=prompt,
+        model=gemini_model_name
+    )
+
+def generate_cached(template, user_inputs, prediction_rating, prompt):
+    """
+    Generate text through the response cache
+    """
+    key = response_cache_key(template, user_inputs, prediction_rating, prompt)
+    return llm_cache.get_or_generate(key, lambda: generate_text(prompt, template))
+
+def sse_event(data, event=None):
+    """
+    Format one server-sent event with a JSON payload
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def stream_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def stream_generated(template, user_inputs, prediction_rating, prompt, fallback):
+    """
+    Yield server-sent events with partial Gemini output, then a 'done' event
+    with the full text. Cached text is sent straight away, and the fallback
+    is sent when Gemini is unavailable or fails.
+    """
+    if not gemini_available:
+        yield sse_event({'text': fallback(), 'fallback': True}, 'done')
+        return
+
+    key = response_cache_key(template, user_inputs, prediction_rating, prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        yield sse_event({'text': cached}, 'done')
+        return
+
+    parts = []
+    start = time.perf_counter()
+    try:
+        for chunk in stream_text(prompt, template):
+            parts.append(chunk)
+            yield sse_event({'text': chunk})
+    except Exception as e:
+        print(f"Gemini error in streamed {template}: {e}")
+        yield sse_event({'text': fallback(), 'fallback': True}, 'done')
+        return
+
+    text = ''.join(parts)
+    llm_cache.put(key, text, time.perf_counter() - start)
+    if text:
+        yield sse_event({'text': text}, 'done')
+    else:
+        yield sse_event({'text': fallback(), 'fallback': True}, 'done')
+
+@timed('prompt_build')
+def build_initial_assessment_prompt(user_inputs, prediction_rating):
+    """
+    Build the "Why This Rating?" prompt for a building. When the model can
+    explain the rating, only its strongest drivers are sent instead of
+    every raw input.
+    """
+    try:
+        explanation = explain_inputs(user_inputs, prediction_rating)
+    except Exception as e:
+        print(f"Explanation error: {e}")
+        explanation = None
+
+    if explanation is not None:
+        building_info = (
+            "- Inputs that weighed most in the model's decision, with their "
+            "contribution to the score for this rating:\n" + prompt_context(explanation, EXPLAIN_PROMPT_FACTORS)
+        )
+    else:
+        building_info = "- Building Details:\n" + prompts.building_context(user_inputs)
+
+    return prompts.render(
+        'initial_assessment', PROMPT_TOKEN_BUDGET, rating=prediction_rating, building_info=building_info
+    )
 
 def get_initial_assessment(user_inputs, prediction_rating):
     """
@@ -216,159 +804,282 @@ def get_initial_assessment(user_inputs, prediction_rating):
         return get_fallback_assessment(user_inputs, prediction_rating)
     
     try:
-        building_details = []
-        for feature, value in user_inputs.items():
-            clean_feature = feature.replace('_', ' ').title()
-            building_details.append(f"- {clean_feature}: {value}")
-        
-        building_info = "\n".join(building_details)
-        prompt = f"""
-You are GreenyBot, an expert AI assistant specializing in GRIHA (Green Rating for Integrated Habitat Assessment) green building certification in India.
-
-BUILDING ASSESSMENT RESULTS:
-- Predicted GRIHA Rating: {prediction_rating} Stars (out of 5)
-- Building Details:
-{building_info}
-
-FEATURE CONTEXT:
-The following features use 0 and 1 values to indicate their presence:
-- Waste_Management: 0 means not present, 1 means present
-- Social_Benefits: 0 means not present, 1 means present
-- VOC/Lead Free Paints: 0 means not present, 1 means present
-- Air_Pollution_Control: 0 means not present, 1 means present
-Other features have numeric values indicating performance levels.
-
-GRIHA RATING CONTEXT:
-- 1 Star: Basic compliance with minimal green features
-- 2 Stars: Good performance with some green initiatives
-- 3 Stars: Very good performance with multiple sustainability measures
-- 4 Stars: Excellent performance with comprehensive green features
-- 5 Stars: Outstanding performance, benchmark for sustainable buildings
-
-Please provide ONLY the "Why This Rating?" section. Explain why the building received this specific star rating based on the input parameters. Reference specific GRIHA criteria and requirements. Keep it concise and informative.
-
-Format your response as plain text without any markdown formatting, emojis, or special characters.
-"""
-        response = gemini_model.generate_content(prompt)
-        return response.text if response and response.text else get_fallback_assessment(user_inputs, prediction_rating)
+        prompt = build_initial_assessment_prompt(user_inputs, prediction_rating)
+        text = generate_cached('initial_assessment', user_inputs, prediction_rating, prompt)
+        return text if text else get_fallback_assessment(user_inputs, prediction_rating)
 
     except Exception as e:
         print(f"Gemini error in initial assessment: {e}")
         return get_fallback_assessment(user_inputs, prediction_rating)
 
+@timed('prompt_build')
+def build_section_prompt(user_inputs, prediction_rating, section_type):
+    """
+    Build the prompt for one report section, or None for an unknown section
+    """
+    if section_type not in prompts.SECTION_TEMPLATES:
+        return None
+
+    # Ground the recommendations in changes the model actually responds to
+    whatif = ""
+    if section_type in ('improvements', 'next_steps'):
+        suggestions = whatif_text(user_inputs, prediction_rating)
+        if suggestions:
+            whatif = f"\n\nModel What-If Analysis:\n{suggestions}\n\nPrioritize these changes and explain how to achieve them."
+
+    return prompts.render(
+        section_type, PROMPT_TOKEN_BUDGET,
+        rating=prediction_rating, building_info=prompts.building_context(user_inputs), whatif=whatif
+    )
+
 def get_section_details(user_inputs, prediction_rating, section_type):
     """
     Generate specific section details based on section type
     """
     if not gemini_available:
-        return get_fallback_section_content(prediction_rating, section_type)
+        return get_fallback_section_content(prediction_rating, section_type, user_inputs)
     
     try:
-        building_details = []
-        for feature, value in user_inputs.items():
-            clean_feature = feature.replace('_', ' ').title()
-            building_details.append(f"- {clean_feature}: {value}")
-        
-        building_info = "\n".join(building_details)
-        
-        section_prompts = {
-            'strengths': f"""
-Based on the building details and {prediction_rating} star GRIHA rating, list 3-4 key strengths of this building design. Focus on what the building does well in terms of sustainability and green features. Be specific and reference GRIHA criteria.
-
-Building Details:
-{building_info}
-
-Provide only the strengths in a clear, numbered list format.
-""",
-            'improvements': f"""
-Based on the building details and {prediction_rating} star GRIHA rating, provide 4-5 specific, actionable recommendations to improve the GRIHA rating. Focus on:
-- Energy efficiency measures
-- Water conservation strategies
-- Sustainable materials and resources
-- Indoor environmental quality improvements
-- Innovation in design processes
-
-Building Details:
-{building_info}
-
-Provide practical recommendations that can be implemented. Use numbered list format.
-""",
-            'benefits': f"""
-Explain the benefits of implementing green building improvements for this {prediction_rating} star rated building. Cover:
-- Environmental impact reduction
-- Cost savings potential
-- Health and comfort improvements
-- Certification advantages
-- Long-term value addition
-
-Building Details:
-{building_info}
-
-Provide clear,concise and  actionable benefits.
-""",
-            'next_steps': f"""
-Provide 3-4 immediate actionable steps that the building owner can take to improve their {prediction_rating} star GRIHA rating. Make these steps practical, prioritized, and feasible.
-
-Building Details:
-{building_info}
-
-List the steps in order of priority.
-"""
-        }
-        
-        prompt = section_prompts.get(section_type, "Invalid section type")
-        if prompt == "Invalid section type":
+        prompt = build_section_prompt(user_inputs, prediction_rating, section_type)
+        if prompt is None:
             return "Invalid section requested."
             
-        response = gemini_model.generate_content(prompt)
-        return response.text if response and response.text else get_fallback_section_content(prediction_rating, section_type)
+        text = generate_cached(section_type, user_inputs, prediction_rating, prompt)
+        return text if text else get_fallback_section_content(prediction_rating, section_type, user_inputs)
 
     except Exception as e:
         print(f"Gemini error in section details: {e}")
-        return get_fallback_section_content(prediction_rating, section_type)
+        return get_fallback_section_content(prediction_rating, section_type, user_inputs)
 
-def get_fallback_section_content(prediction_rating, section_type):
+# Offline report section text, by section and rating
+FALLBACK_SECTION_CONTENT = {
+    'strengths': {
+        1: "1. Building meets basic GRIHA compliance requirements\n2. Foundation for future green improvements established\n3. Regulatory compliance achieved\n4. Potential for significant sustainability upgrades",
+        2: "1. Good foundation with some green initiatives implemented\n2. Energy efficiency measures partially in place\n3. Water conservation systems showing initial results\n4. Indoor environmental quality meets standard requirements",
+        3: "1. Strong energy efficiency performance with multiple systems integrated\n2. Comprehensive water conservation and management strategies\n3. Good use of sustainable materials and resources\n4. Well-designed indoor environmental quality systems",
+        4: "1. Excellent energy performance with advanced efficiency systems\n2. Outstanding water conservation and recycling measures\n3. Comprehensive sustainable materials and waste management\n4. Superior indoor environmental quality with smart controls",
+        5: "1. Benchmark energy performance with innovative efficiency solutions\n2. Exemplary water conservation with zero discharge systems\n3. Outstanding sustainable materials usage and circular economy principles\n4. Exceptional indoor environmental quality with advanced monitoring"
+    },
+    'improvements': {
+        1: "1. Implement energy-efficient lighting and HVAC systems\n2. Install water conservation fixtures and rainwater harvesting\n3. Use sustainable building materials and reduce waste\n4. Improve natural lighting and ventilation systems\n5. Add renewable energy systems like solar panels",
+        2: "1. Upgrade to high-performance HVAC and lighting systems\n2. Enhance water recycling and greywater treatment\n3. Increase use of recycled and locally sourced materials\n4. Improve building envelope performance\n5. Implement smart building management systems",
+        3: "1. Optimize energy systems with advanced controls and monitoring\n2. Implement advanced water treatment and reuse systems\n3. Enhance material lifecycle assessment and optimization\n4. Improve indoor air quality monitoring and control\n5. Add innovative sustainable technologies",
+        4: "1. Implement cutting-edge energy storage and smart grid integration\n2. Achieve water positive status with advanced treatment systems\n3. Optimize material selection for minimal environmental impact\n4. Enhance occupant comfort with personalized environmental controls\n5. Integrate IoT and AI for building optimization",
+        5: "1. Maintain peak performance through regular monitoring and optimization\n2. Share best practices and mentor other projects\n3. Implement emerging technologies for continuous improvement\n4. Enhance occupant engagement and education programs\n5. Pursue additional certifications and recognition"
+    },
+    'benefits': {
+        1: "Implementing green improvements will significantly reduce operating costs, improve occupant health and comfort, increase property value, and position the building for future regulatory compliance.",
+        2: "Green building improvements will deliver substantial energy and water cost savings, enhanced indoor environmental quality, increased marketability, and improved organizational sustainability credentials.",
+        3: "Further sustainability enhancements will optimize operational efficiency, maximize occupant productivity and well-being, strengthen market position, and contribute to climate action goals.",
+        4: "Advanced green building features will minimize environmental impact, maximize cost savings, ensure optimal occupant experience, and establish the building as a sustainability leader.",
+        5: "Maintaining this exceptional performance ensures continued leadership in sustainability, maximizes all benefits, and creates lasting positive impact on the environment and community."
+    },
+    'next_steps': {
+        1: "1. Conduct detailed energy audit to identify improvement opportunities\n2. Install basic water conservation fixtures and LED lighting\n3. Develop waste management and recycling programs\n4. Begin planning for renewable energy installation",
+        2: "1. Upgrade HVAC systems with high-efficiency equipment\n2. Implement comprehensive water management strategies\n3. Source sustainable materials for upcoming renovations\n4. Install building management system for monitoring and control",
+        3: "1. Optimize existing systems through advanced controls and monitoring\n2. Implement water recycling and treatment systems\n3. Conduct material lifecycle assessments for future projects\n4. Enhance indoor environmental quality monitoring",
+        4: "1. Integrate smart building technologies and IoT systems\n2. Implement advanced water treatment for reuse applications\n3. Optimize material selection processes with sustainability criteria\n4. Pursue additional green building certifications",
+        5: "1. Maintain performance through regular system optimization\n2. Document and share best practices with industry\n3. Explore emerging technologies for continuous improvement\n4. Engage occupants in sustainability education and participation"
+    }
+}
+
+# Offline retrieval over the guidance above and the reference buildings,
+# for grounded answers without Gemini and narrower chat prompts
+def load_retrieval_index():
+    try:
+        return RetrievalIndex.build(
+            RATING_EXPLANATIONS, FALLBACK_SECTION_CONTENT, EXPLAIN_REFERENCE_CSV,
+            peers=int(os.environ.get('RETRIEVAL_PEERS', 10))
+        )
+    except Exception as e:
+        print(f"Warning: Retrieval index not available: {e}")
+        return None
+
+retrieval_index = load_retrieval_index()
+
+def peer_summary(user_inputs, prediction_rating, section_type):
     """
-    Provide fallback content when Gemini is not available
+    Comparison with similar reference buildings for a report section, or
+    None for sections without one
     """
-    fallback_content = {
-        'strengths': {
-            1: "1. Building meets basic GRIHA compliance requirements\n2. Foundation for future green improvements established\n3. Regulatory compliance achieved\n4. Potential for significant sustainability upgrades",
-            2: "1. Good foundation with some green initiatives implemented\n2. Energy efficiency measures partially in place\n3. Water conservation systems showing initial results\n4. Indoor environmental quality meets standard requirements",
-            3: "1. Strong energy efficiency performance with multiple systems integrated\n2. Comprehensive water conservation and management strategies\n3. Good use of sustainable materials and resources\n4. Well-designed indoor environmental quality systems",
-            4: "1. Excellent energy performance with advanced efficiency systems\n2. Outstanding water conservation and recycling measures\n3. Comprehensive sustainable materials and waste management\n4. Superior indoor environmental quality with smart controls",
-            5: "1. Benchmark energy performance with innovative efficiency solutions\n2. Exemplary water conservation with zero discharge systems\n3. Outstanding sustainable materials usage and circular economy principles\n4. Exceptional indoor environmental quality with advanced monitoring"
-        },
-        'improvements': {
-            1: "1. Implement energy-efficient lighting and HVAC systems\n2. Install water conservation fixtures and rainwater harvesting\n3. Use sustainable building materials and reduce waste\n4. Improve natural lighting and ventilation systems\n5. Add renewable energy systems like solar panels",
-            2: "1. Upgrade to high-performance HVAC and lighting systems\n2. Enhance water recycling and greywater treatment\n3. Increase use of recycled and locally sourced materials\n4. Improve building envelope performance\n5. Implement smart building management systems",
-            3: "1. Optimize energy systems with advanced controls and monitoring\n2. Implement advanced water treatment and reuse systems\n3. Enhance material lifecycle assessment and optimization\n4. Improve indoor air quality monitoring and control\n5. Add innovative sustainable technologies",
-            4: "1. Implement cutting-edge energy storage and smart grid integration\n2. Achieve water positive status with advanced treatment systems\n3. Optimize material selection for minimal environmental impact\n4. Enhance occupant comfort with personalized environmental controls\n5. Integrate IoT and AI for building optimization",
-            5: "1. Maintain peak performance through regular monitoring and optimization\n2. Share best practices and mentor other projects\n3. Implement emerging technologies for continuous improvement\n4. Enhance occupant engagement and education programs\n5. Pursue additional certifications and recognition"
-        },
-        'benefits': {
-            1: "Implementing green improvements will significantly reduce operating costs, improve occupant health and comfort, increase property value, and position the building for future regulatory compliance.",
-            2: "Green building improvements will deliver substantial energy and water cost savings, enhanced indoor environmental quality, increased marketability, and improved organizational sustainability credentials.",
-            3: "Further sustainability enhancements will optimize operational efficiency, maximize occupant productivity and well-being, strengthen market position, and contribute to climate action goals.",
-            4: "Advanced green building features will minimize environmental impact, maximize cost savings, ensure optimal occupant experience, and establish the building as a sustainability leader.",
-            5: "Maintaining this exceptional performance ensures continued leadership in sustainability, maximizes all benefits, and creates lasting positive impact on the environment and community."
-        },
-        'next_steps': {
-            1: "1. Conduct detailed energy audit to identify improvement opportunities\n2. Install basic water conservation fixtures and LED lighting\n3. Develop waste management and recycling programs\n4. Begin planning for renewable energy installation",
-            2: "1. Upgrade HVAC systems with high-efficiency equipment\n2. Implement comprehensive water management strategies\n3. Source sustainable materials for upcoming renovations\n4. Install building management system for monitoring and control",
-            3: "1. Optimize existing systems through advanced controls and monitoring\n2. Implement water recycling and treatment systems\n3. Conduct material lifecycle assessments for future projects\n4. Enhance indoor environmental quality monitoring",
-            4: "1. Integrate smart building technologies and IoT systems\n2. Implement advanced water treatment for reuse applications\n3. Optimize material selection processes with sustainability criteria\n4. Pursue additional green building certifications",
-            5: "1. Maintain performance through regular system optimization\n2. Document and share best practices with industry\n3. Explore emerging technologies for continuous improvement\n4. Engage occupants in sustainability education and participation"
-        }
+    if retrieval_index is None or section_type not in ('strengths', 'improvements', 'next_steps'):
+        return None
+    target = prediction_rating if section_type == 'strengths' else min(prediction_rating + 1, 5)
+    try:
+        with STAGE_RETRIEVAL.time():
+            return retrieval_index.peer_summary(user_inputs, prediction_rating, target)
+    except Exception as e:
+        print(f"Retrieval error: {e}")
+        return None
+
+def get_fallback_section_content(prediction_rating, section_type, user_inputs=None):
+    """
+    Provide fallback content when Gemini is not available. With the
+    inputs, improvements and next steps lead with the model's what-if
+    suggestions, and sections compare the building with similar ones.
+    """
+    FALLBACKS.inc(kind='section')
+    
+    content = FALLBACK_SECTION_CONTENT.get(section_type, {}).get(prediction_rating, "Content not available for this rating.")
+    if user_inputs is None:
+        return content
+    grounded = [peer_summary(user_inputs, prediction_rating, section_type)]
+    if section_type in ('improvements', 'next_steps'):
+        grounded.insert(0, whatif_text(user_inputs, prediction_rating))
+    return "\n\n".join([text for text in grounded if text] + [content])
+
+def question_inputs(user_inputs, question):
+    """
+    The inputs a question is about, or all of them when it names none
+    """
+    if retrieval_index is None:
+        return user_inputs
+    with STAGE_RETRIEVAL.time():
+        features = retrieval_index.relevant_features(question)
+    relevant = {f: user_inputs[f] for f in features if f in user_inputs}
+    return relevant or user_inputs
+
+@timed('prompt_build')
+def build_chat_prompt(user_inputs, prediction_rating, question, conversation=None, json_mode=False):
+    """
+    Build the GreenyBot chat prompt for a user question, with the bounded
+    history of the session's conversation so far. When the prompt is over
+    budget, the history gives way first, oldest part first, so follow-up
+    questions keep the latest turns
+    """
+    values = {
+        'rating': prediction_rating,
+        'building_info': prompts.building_context(question_inputs(user_inputs, question)),
+        'question': question,
+        'response_format': prompts.CHAT_JSON_FORMAT if json_mode else prompts.CHAT_TEXT_FORMAT
     }
+    history = ''
+    if conversation:
+        room = None
+        if PROMPT_TOKEN_BUDGET:
+            room = max(prompts.room('chat', PROMPT_TOKEN_BUDGET, 'history', **values), 0)
+        history = chat_memory.render(conversation, room)
+    return prompts.render('chat', PROMPT_TOKEN_BUDGET, history=history, **values)
+
+def default_suggestions(prediction_rating):
+    """
+    Follow-up questions to offer when Gemini gives none
+    """
+    if prediction_rating <= 2:
+        return [
+            "How can I improve my energy efficiency score?",
+            "What water conservation measures should I implement?",
+            "Which sustainable materials would be most cost-effective?"
+        ]
+    elif prediction_rating == 3:
+        return [
+            "How can I reach a 4-star rating?",
+            "What are the most impactful improvements I can make?",
+            "How do I optimize indoor environmental quality?"
+        ]
+    return [
+        "How can I maintain this high rating over time?",
+        "What innovative features could push me to 5 stars?",
+        "How do I maximize the ROI of green investments?"
+    ]
+
+def parse_chat_response(full_response, prediction_rating):
+    """
+    Split Gemini chat output into the answer and up to 3 follow-up questions.
+    JSON-mode output is read as structured data; anything else falls back
+    to the FOLLOW_UP_QUESTIONS text format.
+    """
+    structured = parse_structured_response(full_response)
+    if structured is not None:
+        main_response, suggestions = structured
+        return {
+            'response': main_response,
+            'suggestions': (suggestions or default_suggestions(prediction_rating))[:3]
+        }
+
+    # Extract main response and follow-up questions
+    if "FOLLOW_UP_QUESTIONS:" in full_response:
+        parts = full_response.split("FOLLOW_UP_QUESTIONS:")
+        main_response = parts[0].strip()
+        suggestions_text = parts[1].strip()
+        
+        # Parse follow-up questions
+        suggestions = []
+        for line in suggestions_text.split('\n'):
+            line = line.strip()
+            if line and (line.startswith('1.') or line.startswith('2.') or line.startswith('3.')):
+                question = line.split('.', 1)[1].strip()
+                if question.startswith('[') and question.endswith(']'):
+                    question = question[1:-1]
+                suggestions.append(question)
+    else:
+        main_response = full_response
+        # Default suggestions based on rating
+        suggestions = default_suggestions(prediction_rating)
     
-    return fallback_content.get(section_type, {}).get(prediction_rating, "Content not available for this rating.")
+    return {
+        'response': main_response,
+        'suggestions': suggestions[:3]  # Ensure max 3 suggestions
+    }
+
+def generate_chat_text(prompt_for, stream=False):
+    """
+    Generate a chat reply in JSON mode, falling back to the text format for
+    the rest of the process if the Gemini model rejects JSON mode with an
+    InvalidArgument error. Busy pools, timeouts and transient API errors
+    are raised to the caller without a retry, and JSON mode stays on.
+    prompt_for(json_mode) builds the prompt.
+    """
+    global chat_json_mode
+    if chat_json_mode:
+        try:
+            if not stream:
+                return generate_text(prompt_for(True), 'chat', CHAT_JSON_CONFIG), True
+            # Pull the first chunk here so a rejected request still falls back
+            chunks = iter(stream_text(prompt_for(True), 'chat', CHAT_JSON_CONFIG))
+            first = next(chunks, '')
+            return itertools.chain([first], chunks), True
+        except InvalidArgument as e:
+            print(f"Gemini JSON mode unavailable, using text follow-ups: {e}")
+            chat_json_mode = False
+    if not stream:
+        return generate_text(prompt_for(False), 'chat'), False
+    return stream_text(prompt_for(False), 'chat'), False
 
-def get_chat_response(user_inputs, prediction_rating, question):
+def remember_turn(session_id, session_data, question, answer):
+    """
+    Add a chat turn to the session's conversation and return its number
+    """
+    conversation = chat_memory.record(chat_memory.state(session_data), question, answer)
+    user_sessions.set(session_id, dict(session_data, conversation=conversation))
+    return conversation['turn_count']
+
+def offline_chat_response(user_inputs, prediction_rating, question):
+    """
+    Answer a chat question from the retrieval index, or None when the
+    index has nothing on it
+    """
+    if retrieval_index is None:
+        return None
+    FALLBACKS.inc(kind='chat')
+    with STAGE_RETRIEVAL.time():
+        answer = retrieval_index.answer(question, user_inputs, prediction_rating)
+    if answer is None:
+        return None
+    return {
+        'response': f"GreenyBot is in offline mode, so this answer comes from the built-in GRIHA guidance and similar buildings in the dataset:\n{answer}",
+        'suggestions': default_suggestions(prediction_rating),
+        'answered': True
+    }
+
+def get_chat_response(user_inputs, prediction_rating, question, conversation=None):
     """
     Generate response to user's chat question with follow-up suggestions
     """
     if not gemini_available:
+        offline = offline_chat_response(user_inputs, prediction_rating, question)
+        if offline is not None:
+            return offline
         return {
             'response': f"GreenyBot is currently using offline mode. Based on your {prediction_rating}-star GRIHA rating, I can provide general guidance. However, for detailed analysis, please ensure the Gemini AI service is properly configured.",
             'suggestions': [
@@ -379,82 +1090,18 @@ def get_chat_response(user_inputs, prediction_rating, question):
         }
     
     try:
-        building_details = []
-        for feature, value in user_inputs.items():
-            clean_feature = feature.replace('_', ' ').title()
-            building_details.append(f"- {clean_feature}: {value}")
-        
-        building_info = "\n".join(building_details)
-        prompt = f"""
-You are GreenyBot, an expert AI assistant specializing in GRIHA green building certification in India.
-
-CONTEXT:
-- Building GRIHA Rating: {prediction_rating} Stars
-- Building Details: {building_info}
-
-USER QUESTION: {question}
-
-Your Task:
-- Act as a GRIHA expert and provide accurate, clear, and practical information about the GRIHA rating system, its criteria, benefits, processes, and sustainability measures.
-- Only use the building-specific context (rating or details) if the user explicitly asks about that building; otherwise provide general GRIHA-related information.
-- Keep responses concise and practical.
-
-After your main response, suggest 3 relevant follow-up questions that the user might want to ask, formatted as:
-FOLLOW_UP_QUESTIONS:
-1. [Question 1]
-2. [Question 2]
-3. [Question 3]
-"""
-        response = gemini_model.generate_content(prompt)
-        if not response or not response.text:
+        full_response, _ = generate_chat_text(
+            lambda json_mode: build_chat_prompt(user_inputs, prediction_rating, question, conversation, json_mode)
+        )
+        if not full_response:
             return {
                 'response': "I apologize, but I'm having trouble generating a response right now. Please try again later.",
                 'suggestions': ["What are the key areas for improvement?", "How can I reduce energy consumption?", "What are the benefits of higher GRIHA ratings?"]
             }
-            
-        full_response = response.text
-        
-        # Extract main response and follow-up questions
-        if "FOLLOW_UP_QUESTIONS:" in full_response:
-            parts = full_response.split("FOLLOW_UP_QUESTIONS:")
-            main_response = parts[0].strip()
-            suggestions_text = parts[1].strip()
-            
-            # Parse follow-up questions
-            suggestions = []
-            for line in suggestions_text.split('\n'):
-                line = line.strip()
-                if line and (line.startswith('1.') or line.startswith('2.') or line.startswith('3.')):
-                    question = line.split('.', 1)[1].strip()
-                    if question.startswith('[') and question.endswith(']'):
-                        question = question[1:-1]
-                    suggestions.append(question)
-        else:
-            main_response = full_response
-            # Default suggestions based on rating
-            if prediction_rating <= 2:
-                suggestions = [
-                    "How can I improve my energy efficiency score?",
-                    "What water conservation measures should I implement?",
-                    "Which sustainable materials would be most cost-effective?"
-                ]
-            elif prediction_rating == 3:
-                suggestions = [
-                    "How can I reach a 4-star rating?",
-                    "What are the most impactful improvements I can make?",
-                    "How do I optimize indoor environmental quality?"
-                ]
-            else:
-                suggestions = [
-                    "How can I maintain this high rating over time?",
-                    "What innovative features could push me to 5 stars?",
-                    "How do I maximize the ROI of green investments?"
-                ]
         
-        return {
-            'response': main_response,
-            'suggestions': suggestions[:3]  # Ensure max 3 suggestions
-        }
+        chat_data = parse_chat_response(full_response, prediction_rating)
+        chat_data['answered'] = True
+        return chat_data
 
     except Exception as e:
         print(f"Gemini error in chat response: {e}")
@@ -463,6 +1110,118 @@ FOLLOW_UP_QUESTIONS:
             'suggestions': []
         }
 
+def stream_chat_response(user_inputs, prediction_rating, question, conversation=None, on_answer=None):
+    """
+    Yield server-sent events with the partial chat answer, then a 'done'
+    event with the answer and follow-up suggestions. In JSON mode the
+    partial events carry the decoded "answer" field as it arrives; in text
+    mode, text from the FOLLOW_UP_QUESTIONS marker onwards is held back.
+    on_answer(chat_data) is called before the 'done' event with a real answer.
+    """
+    if not gemini_available:
+        chat_data = get_chat_response(user_inputs, prediction_rating, question, conversation)
+        if chat_data.pop('answered', False) and on_answer is not None:
+            chat_data['turn'] = on_answer(chat_data)
+        yield sse_event(chat_data, 'done')
+        return
+
+    marker = "FOLLOW_UP_QUESTIONS:"
+    full_response = ''
+    sent = 0
+    try:
+        chunks, json_mode = generate_chat_text(
+            lambda json_mode: build_chat_prompt(user_inputs, prediction_rating, question, conversation, json_mode),
+            stream=True
+        )
+        for chunk in chunks:
+            full_response += chunk
+            if json_mode:
+                answer = partial_json_string(full_response, 'answer')
+                if len(answer) > sent:
+                    yield sse_event({'text': answer[sent:]})
+                    sent = len(answer)
+                continue
+            cut = full_response.find(marker)
+            visible = cut if cut >= 0 else max(len(full_response) - len(marker), 0)
+            if visible > sent:
+                yield sse_event({'text': full_response[sent:visible]})
+                sent = visible
+    except Exception as e:
+        print(f"Gemini error in streamed chat response: {e}")
+        yield sse_event({
+            'response': f"I encountered an error while processing your question. Please try again later. Error: {str(e)}",
+            'suggestions': []
+        }, 'done')
+        return
+
+    if not full_response:
+        yield sse_event({
+            'response': "I apologize, but I'm having trouble generating a response right now. Please try again later.",
+            'suggestions': ["What are the key areas for improvement?", "How can I reduce energy consumption?", "What are the benefits of higher GRIHA ratings?"]
+        }, 'done')
+        return
+
+    chat_data = parse_chat_response(full_response, prediction_rating)
+    if on_answer is not None:
+        chat_data['turn'] = on_answer(chat_data)
+    yield sse_event(chat_data, 'done')
+
+# Sections generated alongside the assessment by /get_report
+REPORT_SECTIONS = ['strengths', 'improvements', 'benefits', 'next_steps']
+REPORT_SECTION_TIMEOUT = float(os.environ.get('REPORT_SECTION_TIMEOUT_SECONDS', 20))
+
+def get_report(user_inputs, prediction_rating):
+    """
+    Generate the assessment and every report section concurrently on the
+    LLM pool. A section that times out or fails falls back on its own.
+    """
+    fallbacks = {'assessment': lambda: get_fallback_assessment(user_inputs, prediction_rating)}
+    section_prompts = {}
+    if gemini_available:
+        section_prompts['assessment'] = ('initial_assessment', build_initial_assessment_prompt(user_inputs, prediction_rating))
+    for section_type in REPORT_SECTIONS:
+        fallbacks[section_type] = lambda section_type=section_type: get_fallback_section_content(prediction_rating, section_type, user_inputs)
+        if gemini_available:
+            section_prompts[section_type] = (section_type, build_section_prompt(user_inputs, prediction_rating, section_type))
+
+    report = {}
+    tasks = {}
+    keys = {}
+    for name, (template, prompt) in section_prompts.items():
+        keys[name] = response_cache_key(template, user_inputs, prediction_rating, prompt)
+        cached = llm_cache.get(keys[name])
+        if cached is not None:
+            report[name] = cached
+        else:
+            tasks[name] = (call_gemini_timed, (template, prompt))
+
+    results = llm_pool.run_all(tasks, timeout=REPORT_SECTION_TIMEOUT)
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            print(f"Gemini error in report section {name}: {result}")
+            continue
+        # Each section is cached with its own generation time, not the
+        # wall time of the whole report
+        result, elapsed = result
+        try:
+            text = result.text if result and result.text else None
+        except ValueError as e:
+            print(f"Gemini error in report section {name}: {e}")
+            continue
+        llm_cache.put(keys[name], text, elapsed)
+        if text:
+            report[name] = text
+
+    fallback_sections = [name for name in fallbacks if name not in report]
+    for name in fallback_sections:
+        report[name] = fallbacks[name]()
+
+    return {
+        'assessment': report['assessment'],
+        'sections': {section_type: report[section_type] for section_type in REPORT_SECTIONS},
+        'fallback_sections': fallback_sections
+    }
+
 @app.route('/get_initial_assessment', methods=['POST'])
 def get_initial_assessment_endpoint():
     """
@@ -472,10 +1231,18 @@ def get_initial_assessment_endpoint():
         data = request.get_json()
         session_id = data.get('session_id')
         
-        if session_id not in user_sessions:
+        session_data = user_sessions.get(session_id)
+        if session_data is None:
             return jsonify({'success': False, 'error': 'Session not found'})
         
-        session_data = user_sessions[session_id]
+        if data.get('stream'):
+            inputs, rating = session_data['inputs'], session_data['prediction']
+            return stream_response(stream_generated(
+                'initial_assessment', inputs, rating,
+                build_initial_assessment_prompt(inputs, rating),
+                lambda: get_fallback_assessment(inputs, rating)
+            ))
+        
         assessment = get_initial_assessment(session_data['inputs'], session_data['prediction'])
         
         return jsonify({
@@ -499,10 +1266,20 @@ def get_section():
         session_id = data.get('session_id')
         section_type = data.get('section_type')
         
-        if session_id not in user_sessions:
+        session_data = user_sessions.get(session_id)
+        if session_data is None:
             return jsonify({'success': False, 'error': 'Session not found'})
         
-        session_data = user_sessions[session_id]
+        if data.get('stream'):
+            inputs, rating = session_data['inputs'], session_data['prediction']
+            prompt = build_section_prompt(inputs, rating, section_type)
+            if prompt is None:
+                return jsonify({'success': True, 'content': "Invalid section requested."})
+            return stream_response(stream_generated(
+                section_type, inputs, rating, prompt,
+                lambda: get_fallback_section_content(rating, section_type, inputs)
+            ))
+        
         section_content = get_section_details(
             session_data['inputs'], 
             session_data['prediction'], 
@@ -520,6 +1297,64 @@ def get_section():
             'error': f'Section error: {str(e)}'
         })
 
+@app.route('/get_report', methods=['POST'])
+def get_report_endpoint():
+    """
+    Get the assessment and all report sections in one request
+    """
+    try:
+        data = request.get_json()
+        session_id = data.get('session_id')
+        
+        session_data = user_sessions.get(session_id)
+        if session_data is None:
+            return jsonify({'success': False, 'error': 'Session not found'})
+        
+        report = get_report(session_data['inputs'], session_data['prediction'])
+        
+        return jsonify({
+            'success': True,
+            **report
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Report error: {str(e)}'
+        })
+
+@app.route('/explain', methods=['POST'])
+def explain_endpoint():
+    """
+    Explain a session's rating from the model's feature contributions
+    """
+    try:
+        data = request.get_json()
+        session_id = data.get('session_id')
+        top_n = data.get('top_n')
+
+        session_data = user_sessions.get(session_id)
+        if session_data is None:
+            return jsonify({'success': False, 'error': 'Session not found'})
+
+        explanation = explain_inputs(
+            session_data['inputs'], session_data['prediction'], int(top_n) if top_n else None
+        )
+        if explanation is None:
+            return jsonify({'success': False, 'error': 'Explanation not available'})
+
+        return jsonify({
+            'success': True,
+            'explanation': explanation,
+            'summary': summary_text(explanation)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Explanation error: {str(e)}'
+        })
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """
@@ -530,21 +1365,33 @@ def chat():
         session_id = data.get('session_id')
         question = data.get('question')
         
-        if session_id not in user_sessions:
+        session_data = user_sessions.get(session_id)
+        if session_data is None:
             return jsonify({'success': False, 'error': 'Session not found'})
         
-        session_data = user_sessions[session_id]
+        conversation = chat_memory.state(session_data)
+        
+        if data.get('stream'):
+            return stream_response(stream_chat_response(
+                session_data['inputs'], session_data['prediction'], question, conversation,
+                lambda chat_data: remember_turn(session_id, session_data, question, chat_data['response'])
+            ))
+        
         chat_data = get_chat_response(
             session_data['inputs'], 
             session_data['prediction'], 
-            question
+            question,
+            conversation
         )
         
-        return jsonify({
+        result = {
             'success': True,
             'response': chat_data['response'],
             'suggestions': chat_data['suggestions']
-        })
+        }
+        if chat_data.pop('answered', False):
+            result['turn'] = remember_turn(session_id, session_data, question, chat_data['response'])
+        return jsonify(result)
         
     except Exception as e:
         return jsonify({
@@ -553,13 +1400,120 @@ def chat():
             'suggestions': []
         })
 
+def component_stats():
+    """
+    Numeric /health stats flattened into (component, stat) gauge samples
+    """
+    components = {
+        'sessions': user_sessions.stats(),
+        'llm_cache': llm_cache.stats(),
+        'llm_pool': llm_pool.stats(),
+        'prediction_cache': prediction_cache.stats(),
+        'model': model_registry.status()
+    }
+    if predict_batcher is not None:
+        components['predict_batching'] = predict_batcher.stats()
+    samples = {('gemini', 'available'): int(gemini_available)}
+    for component, stats in components.items():
+        for stat, value in stats.items():
+            if isinstance(value, (int, float)):
+                samples[(component, stat)] = float(value)
+    return samples
+
+metrics.registry.gauge_callback(
+    'greenverify_component_stat', 'Numeric stats also reported on /health.',
+    ['component', 'stat'], component_stats
+)
+
+def drift_samples(read):
+    """
+    Scrape-time samples from the current drift monitor, if there is one
+    """
+    return lambda: read(drift_monitor) if drift_monitor is not None else {}
+
+metrics.registry.counter_callback(
+    'greenverify_input_rows_total', 'Input rows seen by the drift monitor, by source.',
+    ['source'], drift_samples(lambda m: m.row_samples())
+)
+metrics.registry.counter_callback(
+    'greenverify_input_issue_rows_total',
+    'Input rows with a data-quality issue: clamped_negative, unseen_category, invalid or all_zero.',
+    ['issue'], drift_samples(lambda m: m.issue_row_samples())
+)
+metrics.registry.counter_callback(
+    'greenverify_input_issue_values_total', 'Input values with a data-quality issue, by feature.',
+    ['issue', 'feature'], drift_samples(lambda m: m.issue_value_samples())
+)
+metrics.registry.gauge_callback(
+    'greenverify_input_drift_psi', 'Population stability index of recent inputs against the reference data.',
+    ['feature'], drift_samples(lambda m: m.psi_samples())
+)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Prometheus text-format metrics for this worker process
+    """
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/whatif', methods=['POST'])
+def whatif_endpoint():
+    """
+    Find the smallest input changes that raise a session's rating
+    """
+    try:
+        data = request.get_json()
+        session_id = data.get('session_id')
+        target_rating = data.get('target_rating')
+
+        session_data = user_sessions.get(session_id)
+        if session_data is None:
+            return jsonify({'success': False, 'error': 'Session not found'})
+
+        result = whatif_inputs(
+            session_data['inputs'], session_data['prediction'], int(target_rating) if target_rating else None
+        )
+        if result is None:
+            return jsonify({'success': False, 'error': 'Model not available'})
+
+        return jsonify({
+            'success': True,
+            'whatif': result,
+            'summary': suggestion_lines(result)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'What-if error: {str(e)}'
+        })
+
+
 # Add health check endpoint
 @app.route('/health')
 def health_check():
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model is not None,
+        'model_loaded': model_registry.current() is not None,
+        'model': model_registry.status(),
         'gemini_available': gemini_available,
+        'gemini': gemini_probe.status() if gemini_probe else {'configured': False},
+        'sessions': user_sessions.stats(),
+        'llm_cache': llm_cache.stats(),
+        'llm_pool': llm_pool.stats(),
+        'prediction_cache': prediction_cache.stats(),
+        'explanation_cache': explanation_cache.stats(),
+        'whatif_cache': whatif_cache.stats(),
+        'prompt_context_cache': prompts.context_cache_stats(),
+        'retrieval': retrieval_index.stats() if retrieval_index else {'enabled': False},
+        'input_drift': drift_monitor.stats() if drift_monitor else {'enabled': False},
+        'chat': {
+            'json_mode': chat_json_mode,
+            'history_tokens': chat_memory.turn_budget,
+            'summary_tokens': chat_memory.summary_budget
+        },
+        'predict_batching': predict_batcher.stats() if predict_batcher else {'enabled': False},
         'timestamp': datetime.now().isoformat()
     })
 
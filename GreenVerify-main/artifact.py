@@ -0,0 +1,243 @@
+"""
+Single-file, versioned model bundle that packs the booster, encoder class
+tables, scaler arrays, feature names and reverse mapping together.
+
+The scaler arrays are read straight out of a read-only memory map, so
+every process on a host shares those pages. The booster is not: XGBoost
+parses it into its own heap memory, so each process that loads the bundle
+holds a private copy (shared copy-on-write only by workers forked after a
+preloaded load). Build the bundle from the pickled artifacts with:
+    python artifact.py export
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+MAGIC = b'GVBUNDLE'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<8sII')
+
+BUNDLE_FILENAME = 'greenverify.bundle'
+DEFAULT_BUNDLE_PATH = os.path.join('models', BUNDLE_FILENAME)
+
+
+def _pad(length):
+    return (-length) % ALIGNMENT
+
+
+def booster_bytes(model):
+    """
+    Serialize the classifier to native XGBoost UBJSON, including the
+    scikit-learn attributes needed to restore an XGBClassifier.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'model.ubj')
+        model.save_model(path)
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def write_bundle(path, model, feature_names, label_encoders, scaler, reverse_mapping, model_version=None):
+    """
+    Write every model component into one bundle file and return its version.
+    """
+    raw_booster = booster_bytes(model)
+    sections = {'booster': np.frombuffer(raw_booster, dtype=np.uint8)}
+    for attr in ('mean_', 'scale_', 'var_'):
+        value = getattr(scaler, attr, None)
+        if value is not None:
+            sections[f'scaler_{attr.rstrip("_")}'] = np.ascontiguousarray(value, dtype=np.float64)
+
+    if model_version is None:
+        model_version = hashlib.sha256(raw_booster).hexdigest()[:12]
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'model_version': model_version,
+        'created_at': datetime.now().isoformat(),
+        'feature_names': list(feature_names),
+        'reverse_mapping': [[int(k), int(v)] for k, v in reverse_mapping.items()],
+        'label_encoders': {
+            feature: [c.item() if isinstance(c, np.generic) else c for c in encoder.classes_]
+            for feature, encoder in label_encoders.items()
+        },
+        'scaler': {
+            'with_mean': scaler.with_mean,
+            'with_std': scaler.with_std,
+            'feature_names_in': [str(f) for f in getattr(scaler, 'feature_names_in_', [])],
+            'n_samples_seen': int(np.max(getattr(scaler, 'n_samples_seen_', 0)))
+        },
+        'sections': {}
+    }
+
+    # Section offsets are relative to the end of the padded header
+    offset = 0
+    for name, array in sections.items():
+        header['sections'][name] = {
+            'offset': offset,
+            'nbytes': array.nbytes,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape)
+        }
+        offset += array.nbytes + _pad(array.nbytes)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * _pad(PREAMBLE.size + len(header_bytes))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for array in sections.values():
+            f.write(array.tobytes())
+            f.write(b'\0' * _pad(array.nbytes))
+    os.replace(tmp_path, path)
+    return model_version
+
+
+def read_bundle(path):
+    """
+    Memory-map a bundle and return its header and zero-copy section arrays.
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_length = PREAMBLE.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Not a model bundle: {path}")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version {version}")
+
+    header = json.loads(bytes(mapped[PREAMBLE.size:PREAMBLE.size + header_length]))
+    base = PREAMBLE.size + header_length
+    arrays = {}
+    for name, section in header['sections'].items():
+        dtype = np.dtype(section['dtype'])
+        arrays[name] = np.frombuffer(
+            mapped, dtype=dtype, count=section['nbytes'] // dtype.itemsize,
+            offset=base + section['offset']
+        ).reshape(section['shape'])
+    return header, arrays
+
+
+def load_bundle(path):
+    """
+    Load a bundle into the same components as the pickled artifacts:
+    model, feature_names, label_encoders, scaler, reverse_mapping, plus
+    the bundle's model version.
+    """
+    header, arrays = read_bundle(path)
+
+    # XGBoost copies the serialized booster into its own trees, so the
+    # model is private to this process; only the arrays below stay mapped
+    model = xgb.XGBClassifier()
+    model.load_model(bytearray(arrays['booster']))
+
+    label_encoders = {}
+    for feature, classes in header['label_encoders'].items():
+        encoder = LabelEncoder()
+        encoder.classes_ = np.array(classes)
+        label_encoders[feature] = encoder
+
+    # Scaler arrays stay backed by the read-only memory map
+    scaler_info = header['scaler']
+    scaler = StandardScaler(with_mean=scaler_info['with_mean'], with_std=scaler_info['with_std'])
+    scaler.mean_ = arrays.get('scaler_mean')
+    scaler.scale_ = arrays.get('scaler_scale')
+    scaler.var_ = arrays.get('scaler_var')
+    scaler.n_samples_seen_ = scaler_info['n_samples_seen']
+    if scaler_info['feature_names_in']:
+        scaler.feature_names_in_ = np.array(scaler_info['feature_names_in'], dtype=object)
+    scaler.n_features_in_ = len(scaler.mean_) if scaler.mean_ is not None else len(scaler_info['feature_names_in'])
+
+    reverse_mapping = {k: np.int64(v) for k, v in header['reverse_mapping']}
+    return model, header['feature_names'], label_encoders, scaler, reverse_mapping, header['model_version']
+
+
+def export_bundle(models_dir='models', output=DEFAULT_BUNDLE_PATH):
+    """
+    Pack the pickled artifacts in models_dir into a single bundle.
+    """
+    model = joblib.load(os.path.join(models_dir, 'xgboost_green_certified_model.pkl'))
+    label_encoders = joblib.load(os.path.join(models_dir, 'label_encoders.pkl'))
+    feature_names = joblib.load(os.path.join(models_dir, 'feature_names.pkl'))
+    scaler = joblib.load(os.path.join(models_dir, 'scaler.pkl'))
+    reverse_mapping = joblib.load(os.path.join(models_dir, 'reverse_mapping.pkl'))
+    return write_bundle(output, model, feature_names, label_encoders, scaler, reverse_mapping)
+
+
+def load_trained_model(models_dir='models'):
+    """
+    Loads pre-trained model files from the models directory.
+    Prefers the memory-mapped bundle when one has been exported.
+    """
+    try:
+        bundle_path = os.path.join(models_dir, BUNDLE_FILENAME)
+        if os.path.exists(bundle_path):
+            model, feature_names, label_encoders, scaler, reverse_mapping, _ = load_bundle(bundle_path)
+            return model, feature_names, label_encoders, scaler, reverse_mapping
+        
+        # Check if all required files exist
+        required_files = [
+            'xgboost_green_certified_model.pkl',
+            'label_encoders.pkl', 
+            'feature_names.pkl',
+            'scaler.pkl',
+            'reverse_mapping.pkl'
+        ]
+        
+        for file_name in required_files:
+            file_path = os.path.join(models_dir, file_name)
+            if not os.path.exists(file_path):
+                return None, None, None, None, f"Required file missing: {file_path}"
+        
+        # Load all components
+        model = joblib.load(os.path.join(models_dir, 'xgboost_green_certified_model.pkl'))
+        label_encoders = joblib.load(os.path.join(models_dir, 'label_encoders.pkl'))
+        feature_names = joblib.load(os.path.join(models_dir, 'feature_names.pkl'))
+        scaler = joblib.load(os.path.join(models_dir, 'scaler.pkl'))
+        reverse_mapping = joblib.load(os.path.join(models_dir, 'reverse_mapping.pkl'))
+        
+        return model, feature_names, label_encoders, scaler, reverse_mapping
+        
+    except Exception as e:
+        return None, None, None, None, f"Error loading model: {str(e)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Green Verify model bundle tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='pack models/*.pkl into one bundle')
+    export_parser.add_argument('--models-dir', default='models')
+    export_parser.add_argument('--output', default=DEFAULT_BUNDLE_PATH)
+
+    info_parser = subparsers.add_parser('info', help='print a bundle header')
+    info_parser.add_argument('path', nargs='?', default=DEFAULT_BUNDLE_PATH)
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        start = time.perf_counter()
+        version = export_bundle(args.models_dir, args.output)
+        size = os.path.getsize(args.output)
+        print(f"Wrote {args.output} ({size / 1024:.0f} KiB, model version {version}) "
+              f"in {time.perf_counter() - start:.2f}s")
+    else:
+        header, _ = read_bundle(args.path)
+        print(json.dumps(header, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import numpy as np
+
+from inference import score
+
+
+class _Batch:
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.rows = []
+        self.enqueued_at = []
+        self.closed = threading.Event()
+        self.done = threading.Event()
+        self.probs = None
+        self.indices = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one booster call.
+
+    The first request to arrive opens a batch and becomes its leader: it
+    waits up to window_ms for other requests (or until max_rows are
+    queued), scores the whole matrix, and hands each caller its row.
+    Batches are grouped by model bundle, so a hot reload never mixes
+    versions inside one matrix. No background thread is needed, which
+    keeps the batcher safe across gunicorn's fork.
+    """
+
+    SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+    def __init__(self, window_ms=2.0, max_rows=32, output_margin=False):
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+        self.output_margin = output_margin
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.rows = 0
+        self.full_batches = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        self.score_seconds = 0.0
+        self.size_counts = [0] * (len(self.SIZE_BUCKETS) + 1)
+
+    def score(self, bundle, row):
+        """
+        Score one encoded, scaled (1, n) row with bundle and return its
+        (probabilities, class index). The row is copied, so callers may
+        reuse their buffer.
+        """
+        key = id(bundle)
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch(bundle)
+                self._pending[key] = batch
+            pos = len(batch.rows)
+            batch.rows.append(row[0].copy())
+            batch.enqueued_at.append(time.perf_counter())
+            if len(batch.rows) >= self.max_rows:
+                del self._pending[key]
+                batch.closed.set()
+
+        if leader:
+            batch.closed.wait(self.window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+            self._run(batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.probs[pos], int(batch.indices[pos])
+
+    def _run(self, batch):
+        start = time.perf_counter()
+        try:
+            matrix = np.vstack(batch.rows)
+            batch.probs, batch.indices = score(batch.bundle.booster, matrix, self.output_margin)
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
+        self._record(batch, start, time.perf_counter() - start)
+
+    def _record(self, batch, start, score_seconds):
+        size = len(batch.rows)
+        waits = [start - t for t in batch.enqueued_at]
+        bucket = next((i for i, limit in enumerate(self.SIZE_BUCKETS) if size <= limit), len(self.SIZE_BUCKETS))
+        with self._lock:
+            self.batches += 1
+            self.rows += size
+            self.full_batches += size >= self.max_rows
+            self.queue_wait_seconds += sum(waits)
+            self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, max(waits))
+            self.score_seconds += score_seconds
+            self.size_counts[bucket] += 1
+
+    def stats(self):
+        labels = [f'<={limit}' for limit in self.SIZE_BUCKETS] + [f'>{self.SIZE_BUCKETS[-1]}']
+        return {
+            'enabled': True,
+            'window_ms': self.window * 1000,
+            'max_rows': self.max_rows,
+            'batches': self.batches,
+            'rows': self.rows,
+            'full_batches': self.full_batches,
+            'avg_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'batch_size_histogram': dict(zip(labels, self.size_counts)),
+            'avg_queue_wait_ms': self.queue_wait_seconds / self.rows * 1000 if self.rows else 0.0,
+            'max_queue_wait_ms': self.max_queue_wait_seconds * 1000,
+            'avg_score_ms': self.score_seconds / self.batches * 1000 if self.batches else 0.0
+        }
@@ -0,0 +1,114 @@
+"""
+Compare loading the pickled artifacts with the memory-mapped bundle:
+boot time per load, and per-worker memory (PSS) as the worker count
+grows, with and without loading before fork.
+
+Linux only (reads /proc/<pid>/smaps_rollup). Run from GreenVerify-main
+after `python artifact.py export`:
+    python -m benchmarks.bench_artifact --workers 1 2 4
+"""
+import argparse
+import os
+import signal
+import statistics
+import time
+import warnings
+
+import joblib
+
+from artifact import DEFAULT_BUNDLE_PATH, load_bundle
+
+
+def load_pickles():
+    return (
+        joblib.load('models/xgboost_green_certified_model.pkl'),
+        joblib.load('models/feature_names.pkl'),
+        joblib.load('models/label_encoders.pkl'),
+        joblib.load('models/scaler.pkl'),
+        joblib.load('models/reverse_mapping.pkl')
+    )
+
+
+def pss_kib(pid):
+    """
+    Proportional set size of a process: shared pages are split between
+    the processes that map them.
+    """
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_workers(loader, workers, preload):
+    """
+    Fork workers the way gunicorn does and return the mean worker PSS.
+    """
+    if preload:
+        loaded = loader()
+    children = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            if not preload:
+                loaded = loader()
+            os.write(write_fd, b'1')
+            signal.pause()
+            os._exit(0)
+        os.close(write_fd)
+        os.read(read_fd, 1)
+        os.close(read_fd)
+        children.append(pid)
+
+    try:
+        return statistics.mean(pss_kib(pid) for pid in children)
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+
+
+def time_loads(loader, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loader()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bundle', default=DEFAULT_BUNDLE_PATH)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    if not os.path.exists(args.bundle):
+        raise SystemExit(f"{args.bundle} not found, run `python artifact.py export` first")
+
+    loaders = {
+        'pickles': load_pickles,
+        'bundle': lambda: load_bundle(args.bundle)
+    }
+
+    print(f"{'format':10s} {'load ms':>9s}")
+    for name, loader in loaders.items():
+        print(f"{name:10s} {time_loads(loader, args.repeat):9.1f}")
+
+    print()
+    print(f"{'format':10s} {'mode':12s} {'workers':>7s} {'PSS/worker KiB':>15s}")
+    for name, loader in loaders.items():
+        for preload in (False, True):
+            for workers in args.workers:
+                mean_pss = measure_workers(loader, workers, preload)
+                mode = 'preload' if preload else 'per-worker'
+                print(f"{name:10s} {mode:12s} {workers:7d} {mean_pss:15.0f}")
+
+
+if __name__ == '__main__':
+    main()
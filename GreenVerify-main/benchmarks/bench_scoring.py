@@ -0,0 +1,92 @@
+"""
+Compare the old two-call scoring path with the single-pass one on rows
+from green_building.csv.
+
+Run from the GreenVerify-main directory:
+    python -m benchmarks.bench_scoring --rows 500 --repeat 3
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from artifact import load_trained_model
+from inference import FeatureLayout, score
+
+
+def time_per_row(fn, rows, repeat):
+    """
+    Call fn once per row and return per-call latencies in microseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        for row in rows:
+            start = time.perf_counter()
+            fn(row)
+            timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default='green_building.csv')
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    model, feature_names, label_encoders, scaler, reverse_mapping = load_trained_model()
+    if model is None:
+        raise SystemExit(reverse_mapping)
+
+    layout = FeatureLayout(feature_names, label_encoders, scaler)
+    booster = model.get_booster()
+
+    frame = pd.read_csv(args.csv, nrows=args.rows)[feature_names]
+    scaled = layout.scale_inplace(frame.to_numpy(dtype=np.float64))
+    df_rows = [frame.iloc[[i]] for i in range(len(frame))]
+    np_rows = [scaled[i:i + 1] for i in range(len(scaled))]
+
+    def old_path(row_df):
+        input_df = row_df.copy()
+        input_df[feature_names] = scaler.transform(input_df[feature_names])
+        probs = model.predict_proba(input_df)[0]
+        idx = model.predict(input_df)[0]
+        return probs, reverse_mapping[idx]
+
+    def two_calls(row):
+        return model.predict_proba(row)[0], model.predict(row)[0]
+
+    def single_pass(row):
+        return score(booster, row)
+
+    def margin_pass(row):
+        return score(booster, row, output_margin=True)
+
+    # Sanity check: every path agrees on the label for every row
+    labels = score(booster, scaled)[1]
+    assert (labels == model.predict(scaled)).all()
+    assert (labels == score(booster, scaled, output_margin=True)[1]).all()
+
+    cases = [
+        ('dataframe + predict_proba + predict', old_path, df_rows),
+        ('numpy + predict_proba + predict', two_calls, np_rows),
+        ('numpy + single booster pass', single_pass, np_rows),
+        ('numpy + single pass on margins', margin_pass, np_rows),
+    ]
+
+    print(f"{len(frame)} rows x {args.repeat} repeats")
+    print(f"{'path':40s} {'p50 us':>9s} {'p99 us':>9s} {'mean us':>9s} {'speedup':>8s}")
+    baseline = None
+    for name, fn, rows in cases:
+        timings = time_per_row(fn, rows, args.repeat)
+        mean = timings.mean()
+        baseline = baseline or mean
+        p50, p99 = np.percentile(timings, [50, 99])
+        print(f"{name:40s} {p50:9.1f} {p99:9.1f} {mean:9.1f} {baseline / mean:7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+"""
+Load-test the app endpoints through Flask's test client, with a local
+stub standing in for Gemini, and time each preprocessing stage.
+
+Reports throughput, p50/p95/p99 latency, and peak RSS and RSS growth
+during each endpoint and concurrency level. Results can be saved as a baseline and compared with
+later runs. Run from the GreenVerify-main directory:
+    python -m benchmarks.load_test --concurrency 1 8 --save baseline.json
+    python -m benchmarks.load_test --concurrency 1 8 --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Keep the real Gemini probe out of the run; the stub is installed below
+os.environ['GEMINI_API_KEY'] = ''
+
+import app as greenverify  # noqa: E402
+from inference import score  # noqa: E402
+
+ENDPOINTS = ['predict', 'get_initial_assessment', 'get_section', 'chat']
+SECTIONS = ['strengths', 'improvements', 'benefits', 'next_steps']
+QUESTIONS = [
+    'How can I improve my energy efficiency score?',
+    'What water conservation measures should I implement?',
+    'Which renewable energy options fit this building?'
+]
+
+# Latency and throughput metrics compared against a baseline, and
+# whether a higher value is better
+COMPARED_METRICS = {
+    'throughput_rps': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'rss_growth_mib': False
+}
+
+# RSS growth is compared in MiB, since a scenario often grows by almost
+# nothing; differences below this are allocator noise
+RSS_NOISE_MIB = 2.0
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGeminiModel:
+    """
+    Stand-in for genai.GenerativeModel that sleeps for a fixed latency and
+    returns a canned answer in the format the app parses.
+    """
+
+    model_name = 'models/benchmark-stub'
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        text = (
+            "This building performs well on energy and water use. "
+            "Adding rooftop solar would raise the renewable share.\n"
+            "FOLLOW_UP_QUESTIONS:\n"
+            "1. [What would solar cost?]\n"
+            "2. [How can I cut water use?]\n"
+            "3. [Which materials should I use?]"
+        )
+        if stream:
+            chunks = text.split(' ')
+            return (self._chunk(word + ' ', self.delay / len(chunks)) for word in chunks)
+        time.sleep(self.delay)
+        return _StubResponse(text)
+
+    @staticmethod
+    def _chunk(text, delay):
+        time.sleep(delay)
+        return _StubResponse(text)
+
+
+def peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mib():
+    """
+    Resident set size right now, or the lifetime peak where /proc is not
+    available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return peak_rss_mib()
+
+
+class RssSampler:
+    """
+    Polls current RSS in the background while a scenario runs. ru_maxrss
+    is the high-water mark of the whole process, so every later scenario
+    would inherit the peaks of the earlier ones.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    def __enter__(self):
+        self.start_mib = self.peak_mib = current_rss_mib()
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mib = max(self.peak_mib, current_rss_mib())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mib = max(self.peak_mib, current_rss_mib())
+
+
+def sample_forms(csv_path, count, seed):
+    """
+    Rows sampled from the CSV, as the string form fields /predict receives.
+    """
+    frame = pd.read_csv(csv_path)
+    frame = frame.sample(n=count, replace=count > len(frame), random_state=seed)
+    feature_names = greenverify.model_registry.current().feature_names
+    return [{f: str(row[f]) for f in feature_names} for row in frame.to_dict('records')]
+
+
+def build_requests(endpoint, forms, session_ids, rng):
+    """
+    (path, kwargs) pairs for the test client, one per request.
+    """
+    requests = []
+    for i, form in enumerate(forms):
+        session_id = session_ids[i % len(session_ids)] if session_ids else None
+        if endpoint == 'predict':
+            requests.append(('/predict', {'data': form}))
+        elif endpoint == 'get_initial_assessment':
+            requests.append(('/get_initial_assessment', {'json': {'session_id': session_id}}))
+        elif endpoint == 'get_section':
+            section = SECTIONS[rng.integers(len(SECTIONS))]
+            requests.append(('/get_section', {'json': {'session_id': session_id, 'section_type': section}}))
+        else:
+            question = QUESTIONS[rng.integers(len(QUESTIONS))]
+            requests.append(('/chat', {'json': {'session_id': session_id, 'question': question}}))
+    return requests
+
+
+def run_load(requests, concurrency):
+    """
+    Fire requests from concurrency threads, each with its own test client,
+    and return latency and throughput stats.
+    """
+    clients = {}
+    errors = []
+
+    def send(request_spec):
+        path, kwargs = request_spec
+        client = clients.setdefault(threading.get_ident(), greenverify.app.test_client())
+        start = time.perf_counter()
+        response = client.post(path, **kwargs)
+        elapsed = time.perf_counter() - start
+        body = response.get_json(silent=True) or {}
+        if response.status_code != 200 or 'error' in body:
+            errors.append(body.get('error', response.status_code))
+        return elapsed
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = np.array(list(executor.map(send, requests))) * 1000
+        wall = time.perf_counter() - start
+
+    return {
+        'requests': len(requests),
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'wall_seconds': round(wall, 4),
+        'throughput_rps': round(len(requests) / wall, 2),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'max_ms': round(float(latencies.max()), 3),
+        'peak_rss_mib': round(rss.peak_mib, 1),
+        'rss_growth_mib': round(rss.peak_mib - rss.start_mib, 1)
+    }
+
+
+def time_stage(fn, items, repeat):
+    """
+    Per-call latency of fn over items, in microseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1e6
+    return {
+        'calls': len(timings),
+        'mean_us': round(float(timings.mean()), 2),
+        'p50_us': round(float(np.percentile(timings, 50)), 2),
+        'p99_us': round(float(np.percentile(timings, 99)), 2)
+    }
+
+
+def stage_benchmarks(forms, repeat):
+    """
+    Time each step of /predict separately: form parsing, categorical
+    encoding, scaling, the cache key and the booster call.
+    """
+    bundle = greenverify.model_registry.current()
+    layout = bundle.layout
+
+    def parse(form):
+        return {
+            f: form.get(f) if f in bundle.label_encoders else max(0.0, float(form.get(f) or 0.0))
+            for f in bundle.feature_names
+        }
+
+    inputs = [parse(form) for form in forms]
+    filled = [layout.fill_row(i).copy() for i in inputs]
+    scaled = [layout.scale_inplace(row.copy()) for row in filled]
+
+    return {
+        'parse_form': time_stage(parse, forms, repeat),
+        'encode': time_stage(layout.fill_row, inputs, repeat),
+        'scale': time_stage(lambda row: layout.scale_inplace(row.copy()), filled, repeat),
+        'cache_key': time_stage(lambda row: greenverify.prediction_cache.key(bundle.version, row), scaled, repeat),
+        'booster': time_stage(lambda row: score(bundle.booster, row), scaled, repeat)
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Print each metric next to its baseline value and return the list of
+    regressions beyond threshold percent.
+    """
+    regressions = []
+    print(f"\nComparison with baseline from {baseline['meta']['timestamp']}")
+    print(f"{'scenario':<36} {'metric':<16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for scenario, result in current['endpoints'].items():
+        base = baseline['endpoints'].get(scenario)
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == 'rss_growth_mib':
+                change = (new - old) / old * 100 if old else 0.0
+                worse = new - old > max(RSS_NOISE_MIB, abs(old) * threshold / 100)
+            elif old:
+                change = (new - old) / old * 100
+                worse = (-change if higher_is_better else change) > threshold
+            else:
+                continue
+            flag = ' !' if worse else ''
+            if flag:
+                regressions.append(f"{scenario} {metric}")
+            print(f"{scenario:<36} {metric:<16} {old:>10.2f} {new:>10.2f} {change:>+7.1f}%{flag}")
+
+    for stage, result in current['stages'].items():
+        base = baseline['stages'].get(stage)
+        if not base or not base['mean_us']:
+            continue
+        change = (result['mean_us'] - base['mean_us']) / base['mean_us'] * 100
+        flag = ' !' if change > threshold else ''
+        if flag:
+            regressions.append(f"stage {stage}")
+        print(f"{'stage ' + stage:<36} {'mean_us':<16} {base['mean_us']:>10.2f} "
+              f"{result['mean_us']:>10.2f} {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Green Verify endpoint load test')
+    parser.add_argument('--csv', default='green_building.csv')
+    parser.add_argument('--endpoints', nargs='+', default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--llm-delay-ms', type=float, default=50.0, help='stub Gemini latency')
+    parser.add_argument('--warm-cache', action='store_true',
+                        help='keep the prediction and LLM caches between scenarios')
+    parser.add_argument('--stage-repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='percent change counted as a regression')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    if greenverify.model_registry.current() is None:
+        raise SystemExit('Model not available')
+    greenverify.set_gemini_model(StubGeminiModel(args.llm_delay_ms / 1000), 'benchmark-stub')
+
+    rng = np.random.default_rng(args.seed)
+    forms = sample_forms(args.csv, args.requests, args.seed)
+
+    # Sessions for the LLM endpoints come from real /predict calls
+    client = greenverify.app.test_client()
+    session_ids = [client.post('/predict', data=form).get_json().get('session_id') for form in forms]
+    session_ids = [s for s in session_ids if s]
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'model_version': greenverify.model_registry.current().version,
+            'requests': args.requests,
+            'llm_delay_ms': args.llm_delay_ms,
+            'warm_cache': args.warm_cache
+        },
+        'stages': stage_benchmarks(forms, args.stage_repeat),
+        'endpoints': {}
+    }
+
+    print(f"{'stage':<12} {'mean_us':>10} {'p50_us':>10} {'p99_us':>10}")
+    for stage, result in results['stages'].items():
+        print(f"{stage:<12} {result['mean_us']:>10.1f} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f}")
+
+    print(f"\n{'scenario':<36} {'rps':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'rss_mib':>8} "
+          f"{'rss_+mib':>8} {'errors':>6}")
+    for endpoint in args.endpoints:
+        for concurrency in args.concurrency:
+            if not args.warm_cache:
+                greenverify.clear_caches()
+            requests = build_requests(endpoint, forms, session_ids, rng)
+            result = run_load(requests, concurrency)
+            scenario = f"{endpoint}@c{concurrency}"
+            results['endpoints'][scenario] = result
+            print(f"{scenario:<36} {result['throughput_rps']:>8.1f} {result['p50_ms']:>8.2f} "
+                  f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['peak_rss_mib']:>8.1f} "
+                  f"{result['rss_growth_mib']:>8.1f} {result['errors']:>6}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0f}%: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
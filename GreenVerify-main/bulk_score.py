@@ -0,0 +1,391 @@
+"""
+Score large CSV or Parquet files offline with the served model.
+
+The input is split into fixed-size chunks. Each chunk is read, parsed,
+preprocessed, scored and formatted by a worker process, with the same
+artifacts, preprocessing and booster call as /predict_batch. The parent
+only finds the chunk boundaries (byte ranges of a CSV, runs of row groups
+of a Parquet file) and appends the finished chunks to the output in input
+order. At most a few chunks are in flight at once, so memory stays flat
+however large the file. Run from the GreenVerify-main directory:
+    python bulk_score.py history.csv predictions.csv --workers 4
+    python bulk_score.py history.parquet predictions.parquet --chunksize 100000
+
+Parquet input or output needs pyarrow.
+"""
+import argparse
+import csv
+import io
+import os
+import resource
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from artifact import load_trained_model
+from inference import preprocess_batch, score
+from model_registry import ModelRegistry
+
+# Chunks submitted ahead of the one being written, per worker
+PENDING_PER_WORKER = 2
+
+# Probabilities to six significant digits keep CSV output smaller and
+# about a third faster to format
+CSV_FLOAT_FORMAT = '%.6g'
+
+# Bytes read at a time while looking for CSV chunk boundaries
+SCAN_BLOCK_BYTES = 8 * 1024 * 1024
+
+_bundle = None
+
+
+def load_bundle(models_dir, threads=None):
+    """
+    The active model bundle, loaded the same way the web app loads it.
+    """
+    registry = ModelRegistry(load_trained_model, models_dir, poll_interval=0)
+    if not registry.load(warm_up=False):
+        raise SystemExit(f"Model not available: {registry.status().get('last_error')}")
+    bundle = registry.current()
+    if threads:
+        bundle.booster.set_param({'nthread': threads})
+    return bundle
+
+
+def _init_worker(models_dir, threads):
+    global _bundle
+    _bundle = load_bundle(models_dir, threads)
+
+
+def score_chunk(first_row, frame, keep_columns=(), output_margin=False, bundle=None):
+    """
+    Score one chunk into an output frame: the input row number, any kept
+    columns, a status, the rating, its confidence and one probability
+    column per rating.
+    """
+    bundle = bundle or _bundle
+    features, zero_mask, invalid_mask, _ = preprocess_batch(bundle, frame)
+    score_mask = ~(zero_mask | invalid_mask)
+    labels = [int(bundle.reverse_mapping[idx]) for idx in range(len(bundle.reverse_mapping))]
+
+    probabilities = np.full((len(frame), len(labels)), np.nan)
+    prediction = pd.array([None] * len(frame), dtype='Int64')
+    confidence = np.full(len(frame), np.nan)
+    if score_mask.any():
+        probs, indices = score(bundle.booster, features[score_mask], output_margin)
+        probabilities[score_mask] = probs
+        prediction[score_mask] = np.asarray(labels)[indices]
+        confidence[score_mask] = probs[np.arange(len(indices)), indices]
+
+    status = np.where(invalid_mask, 'invalid', np.where(zero_mask, 'not_certified', 'scored'))
+    output = pd.DataFrame({'row': np.arange(first_row, first_row + len(frame))})
+    for column in keep_columns:
+        output[column] = frame[column].to_numpy()
+    output['status'] = status
+    output['prediction'] = prediction
+    output['confidence'] = confidence
+    for pos, label in enumerate(labels):
+        output[f'prob_{label}'] = probabilities[:, pos]
+    return output
+
+
+def finish_chunk(first_row, frame, keep_columns=(), output_margin=False, parquet_output=False, bundle=None):
+    """
+    Score a chunk and format it for the writer: CSV text without a header,
+    or the frame itself for Parquet output, plus its status counts.
+    """
+    result = score_chunk(first_row, frame, keep_columns, output_margin, bundle)
+    if parquet_output:
+        payload = result
+    else:
+        payload = result.to_csv(header=False, index=False, float_format=CSV_FLOAT_FORMAT)
+    return {
+        'rows': len(result),
+        'counts': {status: int(count) for status, count in result['status'].value_counts().items()},
+        'columns': list(result.columns),
+        'payload': payload
+    }
+
+
+def score_frame(first_row, frame, keep_columns, output_margin, parquet_output):
+    """
+    Worker task for a chunk the parent has already read.
+    """
+    return finish_chunk(first_row, frame, keep_columns, output_margin, parquet_output)
+
+
+def score_csv_range(path, header, columns, first_row, start, end, keep_columns, output_margin, parquet_output):
+    """
+    Worker task that reads and parses its own byte range of a CSV file.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    frame = pd.read_csv(io.BytesIO(header + data), usecols=set(columns).__contains__)
+    return finish_chunk(first_row, frame, keep_columns, output_margin, parquet_output)
+
+
+def score_row_groups(path, columns, first_row, groups, keep_columns, output_margin, parquet_output):
+    """
+    Worker task that reads its own row groups of a Parquet file.
+    """
+    import pyarrow.parquet as pq
+    frame = pq.ParquetFile(path).read_row_groups(groups, columns=columns).to_pandas()
+    return finish_chunk(first_row, frame, keep_columns, output_margin, parquet_output)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise SystemExit('Parquet files need pyarrow: pip install pyarrow')
+
+
+def is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def read_chunks(path, chunksize, columns=None):
+    """
+    Yield DataFrames of at most chunksize rows from a CSV or Parquet file.
+    """
+    if is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        usecols = set(columns).__contains__ if columns is not None else None
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=usecols)
+
+
+def plan_csv_chunks(path, chunksize):
+    """
+    The header line and (first_row, start, end) byte ranges of chunksize
+    lines each. Returns None for the ranges when the file has quotes or
+    blank lines, since then a line break is not always a row break.
+    """
+    ranges = []
+    with open(path, 'rb') as f:
+        header = f.readline()
+        start = offset = f.tell()
+        first_row = lines = 0
+        last = b'\n'
+        while True:
+            block = f.read(SCAN_BLOCK_BYTES)
+            if not block:
+                break
+            if (b'"' in block or b'\n\n' in block or b'\n\r\n' in block
+                    or (last == b'\n' and block[:1] in (b'\n', b'\r'))):
+                return header, None
+            pos = 0
+            while True:
+                need = chunksize - lines
+                found = block.count(b'\n', pos)
+                if found < need:
+                    lines += found
+                    break
+                for _ in range(need):
+                    pos = block.index(b'\n', pos) + 1
+                ranges.append((first_row, start, offset + pos))
+                first_row += chunksize
+                start = offset + pos
+                lines = 0
+            offset += len(block)
+            last = block[-1:]
+    if offset > start:
+        ranges.append((first_row, start, offset))
+    return header, ranges
+
+
+def plan_tasks(path, chunksize, columns):
+    """
+    One (task, args) per chunk for workers that read their own input, or
+    None when the file can only be read in order by the parent. Parquet
+    chunks are runs of whole row groups, so a file with a row group larger
+    than chunksize is read by the parent in chunksize batches instead;
+    otherwise a single chunk could be as large as that row group.
+    """
+    if is_parquet(path):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        metadata = pq.ParquetFile(path).metadata
+        tasks = []
+        groups, rows, first_row = [], 0, 0
+        for index in range(metadata.num_row_groups):
+            group_rows = metadata.row_group(index).num_rows
+            if group_rows > chunksize:
+                return None
+            groups.append(index)
+            rows += group_rows
+            if rows >= chunksize:
+                tasks.append((score_row_groups, (path, columns, first_row, groups)))
+                first_row += rows
+                groups, rows = [], 0
+        if groups:
+            tasks.append((score_row_groups, (path, columns, first_row, groups)))
+        return tasks
+
+    header, ranges = plan_csv_chunks(path, chunksize)
+    if ranges is None:
+        return None
+    return [(score_csv_range, (path, header, columns, *chunk)) for chunk in ranges]
+
+
+def _frame_tasks(chunks):
+    first_row = 0
+    for frame in chunks:
+        yield score_frame, (first_row, frame)
+        first_row += len(frame)
+
+
+class ChunkWriter:
+    """
+    Appends finished chunks to a CSV or Parquet file. Output goes to a
+    temporary file that is renamed into place once every chunk is written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.parquet = is_parquet(path)
+        self._handle = None
+        self._writer = None
+        self._schema = None
+        if self.parquet:
+            _require_pyarrow()
+
+    def write(self, chunk):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            frame = chunk['payload']
+            if self._writer is None:
+                self._schema = pa.Schema.from_pandas(frame, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.tmp_path, self._schema)
+            self._writer.write_table(pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False))
+        else:
+            if self._handle is None:
+                self._handle = open(self.tmp_path, 'w', newline='')
+                csv.writer(self._handle, lineterminator='\n').writerow(chunk['columns'])
+            self._handle.write(chunk['payload'])
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._handle is not None:
+            self._handle.close()
+        if self._writer is not None or self._handle is not None:
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._handle is not None:
+            self._handle.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def peak_rss_mib(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def bulk_score(input_path, output_path, models_dir='models', chunksize=50_000, workers=1,
+               keep_columns=(), output_margin=False, progress_seconds=10.0):
+    """
+    Score input_path into output_path and return run statistics.
+    """
+    bundle = load_bundle(models_dir)
+    # Read only the columns that are scored or copied to the output
+    columns = list(dict.fromkeys(list(bundle.feature_names) + list(keep_columns)))
+
+    writer = ChunkWriter(output_path)
+    options = (keep_columns, output_margin, writer.parquet)
+    counts = {'rows': 0, 'scored': 0, 'not_certified': 0, 'invalid': 0}
+    start = last_report = time.perf_counter()
+
+    def collect(chunk):
+        nonlocal last_report
+        writer.write(chunk)
+        counts['rows'] += chunk['rows']
+        for status, count in chunk['counts'].items():
+            counts[status] += count
+        now = time.perf_counter()
+        if progress_seconds and now - last_report >= progress_seconds:
+            last_report = now
+            print(f"{counts['rows']:,} rows, {counts['rows'] / (now - start):,.0f} rows/s",
+                  file=sys.stderr, flush=True)
+
+    try:
+        if workers <= 1:
+            first_row = 0
+            for frame in read_chunks(input_path, chunksize, columns):
+                collect(finish_chunk(first_row, frame, *options, bundle=bundle))
+                first_row += len(frame)
+        else:
+            tasks = plan_tasks(input_path, chunksize, columns)
+            if tasks is None:
+                print('Input has quoted fields, blank lines or row groups over --chunksize rows; '
+                      'reading it in this process', file=sys.stderr, flush=True)
+                tasks = _frame_tasks(read_chunks(input_path, chunksize, columns))
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(models_dir, 1)) as pool:
+                for task, args in tasks:
+                    pending.append(pool.submit(task, *args, *options))
+                    # Keep the number of chunks held in memory bounded
+                    if len(pending) >= workers * PENDING_PER_WORKER:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        **counts,
+        'model_version': bundle.version,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(counts['rows'] / seconds, 1) if seconds else None,
+        'peak_rss_mib': round(peak_rss_mib(), 1),
+        'worker_peak_rss_mib': round(peak_rss_mib(resource.RUSAGE_CHILDREN), 1) if workers > 1 else None,
+        'parent_cpu_seconds': round(sum(resource.getrusage(resource.RUSAGE_SELF)[:2]), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a CSV or Parquet file of buildings offline')
+    parser.add_argument('input', help='CSV or .parquet file with the model feature columns')
+    parser.add_argument('output', help='CSV or .parquet file to write predictions to')
+    parser.add_argument('--models-dir', default=os.environ.get('MODELS_DIR', 'models'))
+    parser.add_argument('--chunksize', type=int, default=50_000, help='rows per chunk')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='scoring processes; 1 scores in this process')
+    parser.add_argument('--keep-columns', nargs='+', default=[],
+                        help='input columns copied to the output, e.g. an ID column')
+    parser.add_argument('--output-margin', action='store_true',
+                        help='score raw margins and apply softmax in NumPy')
+    parser.add_argument('--progress-seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    try:
+        stats = bulk_score(args.input, args.output, args.models_dir, args.chunksize, args.workers,
+                           args.keep_columns, args.output_margin, args.progress_seconds)
+    except (FileNotFoundError, ValueError) as e:
+        raise SystemExit(f"Bulk scoring failed: {e}")
+    print(f"Scored {stats['rows']:,} rows ({stats['scored']:,} scored, {stats['not_certified']:,} not certified, "
+          f"{stats['invalid']:,} invalid) with model {stats['model_version']} in {stats['seconds']:.1f}s: "
+          f"{stats['rows_per_second']:,.0f} rows/s, peak RSS {stats['peak_rss_mib']:.0f} MiB"
+          + (f" (largest worker {stats['worker_peak_rss_mib']:.0f} MiB)" if stats['worker_peak_rss_mib'] else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Bounded GreenyBot conversation memory, kept in the session store.
+
+The state is a plain dict so it serializes with the rest of the session:
+the most recent turns verbatim, plus a rolling summary of older turns.
+When the recent turns go over their token budget, the oldest are compacted
+into one summary line each, and the oldest summary lines drop off once the
+summary goes over its own budget. The history a chat prompt carries is
+bounded however long the conversation runs.
+"""
+import json
+import re
+
+from prompts import CHARS_PER_TOKEN, estimate_tokens
+
+SUMMARY_QUESTION_CHARS = 120
+SUMMARY_ANSWER_CHARS = 200
+
+
+def _clip(text, limit):
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + '...'
+
+
+def _first_sentence(text):
+    match = re.match(r'(.+?[.!?])(\s|$)', ' '.join(text.split()))
+    return match.group(1) if match else text
+
+
+def new_state():
+    return {'summary': [], 'turns': [], 'turn_count': 0}
+
+
+class ConversationMemory:
+    """
+    Records turns into a session's conversation state and renders the
+    history block for the chat prompt.
+    """
+
+    def __init__(self, turn_budget=400, summary_budget=150):
+        self.turn_budget = turn_budget
+        self.summary_budget = summary_budget
+
+    @staticmethod
+    def state(session_data):
+        return session_data.get('conversation') or new_state()
+
+    @staticmethod
+    def compact(turn):
+        """
+        One summary line for a turn: the question and the opening
+        sentence of the answer.
+        """
+        question = _clip(turn['question'], SUMMARY_QUESTION_CHARS)
+        answer = _clip(_first_sentence(turn['answer']), SUMMARY_ANSWER_CHARS)
+        return f"- Asked: {question} Answered: {answer}"
+
+    @staticmethod
+    def _turn_text(turn):
+        return f"User: {turn['question']}\nGreenyBot: {turn['answer']}"
+
+    def record(self, state, question, answer):
+        """
+        Return a new state with the turn appended and the history
+        compacted back within budget. The old state is left untouched.
+        """
+        turns = state['turns'] + [{'question': question, 'answer': answer}]
+        summary = list(state['summary'])
+
+        while len(turns) > 1 and sum(estimate_tokens(self._turn_text(t)) for t in turns) > self.turn_budget:
+            summary.append(self.compact(turns.pop(0)))
+        if turns and estimate_tokens(self._turn_text(turns[0])) > self.turn_budget:
+            # A single oversized turn is kept with its answer cut down
+            turn = turns[0]
+            room = max(self.turn_budget - estimate_tokens(f"User: {turn['question']}\nGreenyBot: "), 0)
+            turns[0] = {'question': turn['question'], 'answer': _clip(turn['answer'], room * CHARS_PER_TOKEN)}
+
+        while summary and estimate_tokens('\n'.join(summary)) > self.summary_budget:
+            summary.pop(0)
+
+        return {'summary': summary, 'turns': turns, 'turn_count': state['turn_count'] + 1}
+
+    def render(self, state, max_tokens=None):
+        """
+        History block for the chat prompt, or '' before the first turn.
+        With max_tokens, the oldest history goes first to make it fit:
+        summary lines, then older turns, then the latest answer is cut.
+        """
+        summary = list(state['summary'])
+        turns = list(state['turns'])
+        text = self._render(summary, turns)
+        if max_tokens is None or estimate_tokens(text) <= max_tokens:
+            return text
+        while (summary or len(turns) > 1) and estimate_tokens(text) > max_tokens:
+            if summary:
+                summary.pop(0)
+            else:
+                turns.pop(0)
+            text = self._render(summary, turns)
+        if estimate_tokens(text) > max_tokens and turns:
+            turn = turns[0]
+            room = max_tokens - estimate_tokens(self._render([], [dict(turn, answer='')]))
+            if room <= 0:
+                return ''
+            turns[0] = dict(turn, answer=_clip(turn['answer'], room * CHARS_PER_TOKEN))
+            text = self._render([], turns)
+        return text
+
+    def _render(self, summary, turns):
+        if not turns and not summary:
+            return ''
+        lines = ['', 'CONVERSATION SO FAR:']
+        if summary:
+            lines.append('Earlier questions, summarized:')
+            lines.extend(summary)
+        if turns:
+            lines.append('Most recent turns:')
+            lines.extend(self._turn_text(t) for t in turns)
+        return '\n'.join(lines) + '\n'
+
+    def stats(self, state):
+        return {
+            'turns': state['turn_count'],
+            'recent_turns': len(state['turns']),
+            'summary_lines': len(state['summary']),
+            'history_tokens': estimate_tokens(self.render(state))
+        }
+
+
+def parse_structured_response(text):
+    """
+    Parse a JSON-mode chat reply into (answer, follow-up questions), or
+    return None when the text is not the expected JSON object.
+    """
+    text = text.strip()
+    if text.startswith('```'):
+        text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text)
+    try:
+        data = json.loads(text, strict=False)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('answer'), str):
+        return None
+    questions = data.get('follow_up_questions')
+    if not isinstance(questions, list):
+        questions = []
+    return data['answer'].strip(), [q.strip() for q in questions if isinstance(q, str) and q.strip()]
+
+
+def partial_json_string(text, field):
+    """
+    Decoded prefix of a string field in a JSON object that is still being
+    streamed, so the answer can be shown before the object is complete.
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(field), text)
+    if match is None:
+        return ''
+    start = match.end()
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            break
+        if char == '\\':
+            # Stop before an escape sequence that has not fully arrived
+            length = 6 if text[i + 1:i + 2] == 'u' else 2
+            if i + length > len(text):
+                break
+            i += length
+            continue
+        i += 1
+    try:
+        return json.loads('"' + text[start:i] + '"', strict=False)
+    except ValueError:
+        return ''
@@ -0,0 +1,273 @@
+"""
+Streaming input drift and data-quality monitor for live traffic.
+
+Reference histograms are built once from green_building.csv: quantile bins
+for each numeric feature and one bin per known category. Each scored row
+adds one count per feature to a fixed-size table. Quality counters record
+negative values clamped to 0, categories the encoders have not seen,
+all-zero (not certified) inputs and unparsable values. Updates cost the
+same however much traffic has been seen, memory is fixed by the number of
+features and bins, and raw inputs are never stored or logged.
+
+Live counts cover a sliding window of window to 2 * window rows. Two
+tables take turns, and the older one is cleared when the newer one fills.
+Drift is the population stability index (PSI) of that window against the
+reference, computed only when /metrics or /health is read.
+"""
+import bisect
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Usual PSI bands: below 0.1 stable, 0.1 to 0.25 a moderate shift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Share given to empty bins so the PSI stays finite
+PSI_EPSILON = 1e-4
+
+# Per-feature issues; all_zero applies to a whole row
+FEATURE_ISSUES = ('clamped_negative', 'unseen_category', 'invalid')
+ROW_ISSUES = FEATURE_ISSUES + ('all_zero',)
+
+
+def psi(actual, expected):
+    """
+    Population stability index between two distributions over the same bins.
+    """
+    actual = np.maximum(actual, PSI_EPSILON)
+    expected = np.maximum(expected, PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def drift_status(value):
+    if value is None:
+        return 'warming_up'
+    if value >= PSI_SIGNIFICANT:
+        return 'significant'
+    if value >= PSI_MODERATE:
+        return 'moderate'
+    return 'stable'
+
+
+class DriftMonitor:
+    """
+    Per-feature histograms and quality counters for the inputs of
+    /predict and /predict_batch, compared with the reference CSV.
+    """
+
+    def __init__(self, reference_csv, feature_names, categorical=(), bins=10, window=5000, min_rows=200):
+        self.feature_names = list(feature_names)
+        self.window = window
+        self.min_rows = min_rows
+
+        frame = pd.read_csv(reference_csv)
+        # (feature, sorted bin edges or None, category lookup or None)
+        self._specs = []
+        reference = []
+        for feature in self.feature_names:
+            if feature not in frame.columns:
+                continue
+            if feature in categorical:
+                values = frame[feature].dropna().astype(str)
+                lookup = {category: i for i, category in enumerate(sorted(values.unique()))}
+                # The last bin holds categories missing from the reference
+                counts = np.bincount(values.map(lookup).to_numpy(), minlength=len(lookup) + 1)
+                self._specs.append((feature, None, lookup))
+            else:
+                values = pd.to_numeric(frame[feature], errors='coerce').dropna().to_numpy()
+                if not len(values):
+                    continue
+                edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+                counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+                self._specs.append((feature, edges.tolist(), None))
+            reference.append(counts / counts.sum())
+
+        self.n_bins = max((len(r) for r in reference), default=1)
+        self.reference = np.zeros((len(reference), self.n_bins))
+        for i, proportions in enumerate(reference):
+            self.reference[i, :len(proportions)] = proportions
+        self._rows_index = np.arange(len(self._specs))
+
+        self._current = np.zeros((len(self._specs), self.n_bins), dtype=np.int64)
+        self._previous = np.zeros_like(self._current)
+        self._current_rows = 0
+        self._previous_rows = 0
+
+        self._feature_index = {feature: i for i, feature in enumerate(self.feature_names)}
+        self.rows = {'predict': 0, 'batch': 0}
+        self.issue_rows = dict.fromkeys(ROW_ISSUES, 0)
+        self.issue_values = {issue: np.zeros(len(self.feature_names), dtype=np.int64) for issue in FEATURE_ISSUES}
+        self._lock = threading.Lock()
+
+    def _bin(self, edges, lookup, value):
+        if lookup is not None:
+            return lookup.get(value, len(lookup))
+        return bisect.bisect_right(edges, value)
+
+    def _rotate(self):
+        """
+        Start a new table once the current one holds a full window.
+        """
+        if self._current_rows >= self.window:
+            self._previous, self._current = self._current, self._previous
+            self._current.fill(0)
+            self._previous_rows = self._current_rows
+            self._current_rows = 0
+
+    def _count_issues(self, issue, features):
+        counts = self.issue_values[issue]
+        for feature in features:
+            index = self._feature_index.get(feature)
+            if index is not None:
+                counts[index] += 1
+        if features:
+            self.issue_rows[issue] += 1
+
+    def observe(self, inputs, layout, clamped=(), all_zero=False):
+        """
+        Record one parsed /predict input. Rows that are not scored (all
+        zero) are counted but left out of the histograms.
+        """
+        unseen = [
+            feature for _, feature, lookup in layout.categorical
+            if inputs.get(feature) is not None and inputs[feature] not in lookup
+        ]
+        bins = None
+        if not all_zero:
+            bins = [self._bin(edges, lookup, inputs[feature]) for feature, edges, lookup in self._specs]
+
+        with self._lock:
+            self.rows['predict'] += 1
+            self._count_issues('clamped_negative', clamped)
+            self._count_issues('unseen_category', unseen)
+            if all_zero:
+                self.issue_rows['all_zero'] += 1
+            else:
+                self._current[self._rows_index, bins] += 1
+                self._current_rows += 1
+                self._rotate()
+
+    def observe_invalid(self, feature):
+        """
+        Record a /predict input rejected for an unparsable value.
+        """
+        with self._lock:
+            self.rows['predict'] += 1
+            self._count_issues('invalid', [feature])
+
+    def observe_batch(self, batch_df, layout, zero_mask, invalid_mask):
+        """
+        Record every row of a /predict_batch request in one vectorized pass.
+        """
+        numeric = {}
+        negatives = np.zeros(len(self.feature_names), dtype=np.int64)
+        invalid = np.zeros(len(self.feature_names), dtype=np.int64)
+        negative_rows = np.zeros(len(batch_df), dtype=bool)
+        for feature in layout.numeric_features:
+            raw = batch_df[feature].replace('', np.nan)
+            values = pd.to_numeric(raw, errors='coerce').to_numpy(dtype=np.float64)
+            negative = values < 0
+            negative_rows |= negative
+            index = self._feature_index.get(feature)
+            if index is not None:
+                negatives[index] = negative.sum()
+                invalid[index] = (np.isnan(values) & raw.notna().to_numpy()).sum()
+            numeric[feature] = values
+
+        unseen = np.zeros(len(self.feature_names), dtype=np.int64)
+        unseen_rows = np.zeros(len(batch_df), dtype=bool)
+        for _, feature, lookup in layout.categorical:
+            column = batch_df[feature]
+            mask = (column.notna() & ~column.isin(list(lookup))).to_numpy()
+            unseen_rows |= mask
+            index = self._feature_index.get(feature)
+            if index is not None:
+                unseen[index] = mask.sum()
+
+        # Histograms only cover rows that were scored
+        scored = ~(zero_mask | invalid_mask)
+        counts = np.zeros_like(self._current)
+        for i, (feature, edges, lookup) in enumerate(self._specs):
+            if lookup is not None:
+                bins = batch_df[feature][scored].astype(str).map(lookup).fillna(len(lookup)).to_numpy(dtype=np.intp)
+            else:
+                values = np.nan_to_num(np.maximum(numeric[feature][scored], 0.0))
+                bins = np.searchsorted(edges, values, side='right')
+            counts[i] += np.bincount(bins, minlength=self.n_bins)[:self.n_bins]
+
+        with self._lock:
+            self.rows['batch'] += len(batch_df)
+            self.issue_values['clamped_negative'] += negatives
+            self.issue_values['unseen_category'] += unseen
+            self.issue_values['invalid'] += invalid
+            self.issue_rows['clamped_negative'] += int(negative_rows.sum())
+            self.issue_rows['unseen_category'] += int(unseen_rows.sum())
+            self.issue_rows['invalid'] += int(invalid_mask.sum())
+            self.issue_rows['all_zero'] += int((zero_mask & ~invalid_mask).sum())
+            self._current += counts
+            self._current_rows += int(scored.sum())
+            self._rotate()
+
+    def drift(self):
+        """
+        PSI per feature over the live window, or None per feature until
+        the window holds min_rows rows.
+        """
+        with self._lock:
+            counts = self._current + self._previous
+            rows = self._current_rows + self._previous_rows
+        if rows < self.min_rows:
+            return rows, {feature: None for feature, _, _ in self._specs}
+        actual = counts / rows
+        return rows, {
+            feature: round(psi(actual[i], self.reference[i]), 4)
+            for i, (feature, _, _) in enumerate(self._specs)
+        }
+
+    def stats(self, top_n=5):
+        window_rows, scores = self.drift()
+        with self._lock:
+            rows = dict(self.rows)
+            issue_rows = dict(self.issue_rows)
+            by_feature = {
+                issue: {self.feature_names[i]: int(n) for i, n in enumerate(counts) if n}
+                for issue, counts in self.issue_values.items()
+            }
+        total = sum(rows.values())
+        known = {feature: value for feature, value in scores.items() if value is not None}
+        max_psi = max(known.values(), default=None)
+        return {
+            'enabled': True,
+            'rows': rows,
+            'window_rows': window_rows,
+            'issue_rates': {issue: round(n / total, 4) if total else 0.0 for issue, n in issue_rows.items()},
+            'issues_by_feature': {issue: counts for issue, counts in by_feature.items() if counts},
+            'max_psi': max_psi,
+            'status': drift_status(max_psi),
+            'top_drift': [
+                {'feature': feature, 'psi': value}
+                for feature, value in sorted(known.items(), key=lambda item: -item[1])[:top_n]
+            ]
+        }
+
+    def row_samples(self):
+        with self._lock:
+            return {(source,): n for source, n in self.rows.items()}
+
+    def issue_row_samples(self):
+        with self._lock:
+            return {(issue,): n for issue, n in self.issue_rows.items()}
+
+    def issue_value_samples(self):
+        with self._lock:
+            return {
+                (issue, self.feature_names[i]): int(n)
+                for issue, counts in self.issue_values.items()
+                for i, n in enumerate(counts) if n
+            }
+
+    def psi_samples(self):
+        _, scores = self.drift()
+        return {(feature,): value for feature, value in scores.items()}
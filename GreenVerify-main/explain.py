@@ -0,0 +1,217 @@
+"""
+Model-faithful explanations from the booster's own per-feature
+contributions (TreeSHAP, `pred_contribs`).
+
+For the predicted class, each feature's contribution is its share of that
+class's margin relative to the model's expected margin, so the
+contributions plus the bias add up exactly to what the booster scored.
+Population baselines from green_building.csv put every contribution next
+to what is typical for buildings with the same rating.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from prediction_cache import PredictionCache
+
+
+def feature_label(feature):
+    """
+    Human-readable feature name, matching how the prompts list inputs.
+    """
+    return feature.replace('_', ' ').title()
+
+
+class Explainer:
+    """
+    Computes and caches contributions for one model bundle. The app
+    computes the baseline when the bundle loads; otherwise it is computed
+    on first use, once per model version.
+    """
+
+    def __init__(self, bundle, reference_csv='green_building.csv', cache_store=None):
+        self.bundle = bundle
+        self.reference_csv = reference_csv
+        self.cache_store = cache_store
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    def contributions(self, matrix):
+        """
+        Raw contributions for an encoded, scaled matrix, shaped
+        (rows, classes, features + 1); the last column is the bias.
+        """
+        dmatrix = xgb.DMatrix(np.ascontiguousarray(matrix), feature_names=list(self.bundle.feature_names))
+        contribs = self.bundle.booster.predict(dmatrix, pred_contribs=True)
+        if contribs.ndim == 2:
+            # Binary models return one margin per row
+            contribs = contribs[:, np.newaxis, :]
+        return contribs
+
+    def baseline(self, nthread=0):
+        """
+        Population statistics over the reference CSV: sorted raw values per
+        feature (for percentiles), plus the mean contribution of each
+        feature to each class among buildings predicted in that class.
+        nthread=1 keeps XGBoost from starting OpenMP threads, for a process
+        that forks afterwards.
+        """
+        if self._baseline is not None:
+            return self._baseline
+        with self._lock:
+            if self._baseline is None:
+                with xgb.config_context(nthread=nthread):
+                    self._baseline = self._compute_baseline()
+        return self._baseline
+
+    def _compute_baseline(self):
+        layout = self.bundle.layout
+        frame = pd.read_csv(self.reference_csv)
+        lookups = {feature: lookup for _, feature, lookup in layout.categorical}
+        raw = np.zeros((len(frame), layout.n_features))
+        for pos, feature in enumerate(layout.feature_names):
+            if feature not in frame.columns:
+                continue
+            if feature in lookups:
+                raw[:, pos] = frame[feature].map(lambda v: lookups[feature].get(v, 0)).to_numpy(dtype=np.float64)
+            else:
+                raw[:, pos] = pd.to_numeric(frame[feature], errors='coerce').fillna(0.0).to_numpy()
+
+        matrix = layout.scale_inplace(raw.copy())
+        contribs = self.contributions(matrix)
+        predicted = contribs.sum(axis=2).argmax(axis=1)
+
+        n_classes = contribs.shape[1]
+        class_means = np.zeros((n_classes, layout.n_features))
+        class_counts = np.zeros(n_classes, dtype=np.int64)
+        for k in range(n_classes):
+            members = predicted == k
+            class_counts[k] = members.sum()
+            if class_counts[k]:
+                class_means[k] = contribs[members, k, :-1].mean(axis=0)
+
+        return {
+            'rows': len(frame),
+            'sorted_values': np.sort(raw, axis=0),
+            'class_mean_contributions': class_means,
+            'class_counts': class_counts,
+            'mean_abs_contributions': np.abs(contribs[:, :, :-1]).mean(axis=(0, 1))
+        }
+
+    def explain_batch(self, matrix, raw_inputs, class_indices, top_n=None):
+        """
+        Explain many rows with one pred_contribs call. raw_inputs are the
+        unscaled input dicts; class_indices are the predicted classes.
+        """
+        contribs = self.contributions(matrix)
+        baseline = self.baseline()
+        return [
+            self._explanation(contribs[i], raw_inputs[i], int(class_indices[i]), baseline, top_n)
+            for i in range(len(matrix))
+        ]
+
+    def explain(self, row, raw_inputs, class_index, top_n=None):
+        """
+        Explain one encoded, scaled (1, n) row, through the cache.
+        """
+        key = None
+        if self.cache_store is not None:
+            key = f"{PredictionCache.key(self.bundle.version, row)}:{class_index}"
+            cached = self.cache_store.get(key)
+            if cached is not None:
+                return self._trim(cached, top_n)
+        explanation = self.explain_batch(row, [raw_inputs], [class_index])[0]
+        if key is not None:
+            self.cache_store.set(key, explanation)
+        return self._trim(explanation, top_n)
+
+    @staticmethod
+    def _trim(explanation, top_n):
+        if top_n is None:
+            return explanation
+        return dict(explanation, factors=explanation['factors'][:top_n])
+
+    def _explanation(self, contribs, raw_inputs, class_index, baseline, top_n):
+        values = contribs[class_index]
+        sorted_values = baseline['sorted_values']
+        typical = baseline['class_mean_contributions'][class_index]
+
+        factors = []
+        for pos, feature in enumerate(self.bundle.feature_names):
+            value = raw_inputs.get(feature)
+            if isinstance(value, (int, float, np.number)):
+                percentile = float(np.searchsorted(sorted_values[:, pos], value, side='left')) / baseline['rows'] * 100
+            else:
+                percentile = None
+            factors.append({
+                'feature': feature,
+                'label': feature_label(feature),
+                'value': value.item() if isinstance(value, np.generic) else value,
+                'contribution': float(values[pos]),
+                'typical_contribution': float(typical[pos]),
+                'percentile': round(percentile, 1) if percentile is not None else None
+            })
+        factors.sort(key=lambda f: -abs(f['contribution']))
+
+        return {
+            'model_version': self.bundle.version,
+            'rating': int(self.bundle.reverse_mapping[class_index]),
+            'class_index': class_index,
+            'bias': float(values[-1]),
+            'margin': float(values.sum()),
+            'factors': factors[:top_n] if top_n else factors
+        }
+
+
+def _percentile_phrase(factor):
+    if factor['percentile'] is None:
+        return None
+    if factor['percentile'] < 1:
+        return "among the lowest in the dataset"
+    return f"higher than {factor['percentile']:.0f}% of buildings"
+
+
+def _value_phrase(factor):
+    phrase = f"{factor['label']} of {factor['value']}"
+    percentile = _percentile_phrase(factor)
+    return f"{phrase}, {percentile}" if percentile else phrase
+
+
+def describe_factor(factor):
+    """
+    One compact prompt line: value, population percentile and the signed
+    contribution towards the predicted rating.
+    """
+    details = [_percentile_phrase(factor), f"{factor['contribution']:+.2f} towards this rating"]
+    return f"{factor['label']}: {factor['value']} ({'; '.join(d for d in details if d)})"
+
+
+def prompt_context(explanation, top_n=6):
+    """
+    Compact, model-grounded lines for an LLM prompt: the strongest drivers
+    of the predicted rating with their values and direction.
+    """
+    return '\n'.join(f"- {describe_factor(f)}" for f in explanation['factors'][:top_n])
+
+
+def summary_text(explanation, top_n=3):
+    """
+    Offline "Why this rating" answer built only from the contributions.
+    """
+    rating = explanation['rating']
+    factors = explanation['factors']
+    supporting = [f for f in factors if f['contribution'] > 0][:top_n]
+    against = [f for f in factors if f['contribution'] < 0][:top_n]
+
+    lines = [f"The model rated this building {rating} stars. The inputs that weighed most in that decision:"]
+    if supporting:
+        lines.append("")
+        lines.append(f"Pointing towards {rating} stars:")
+        lines.extend(f"- {_value_phrase(f)}" for f in supporting)
+    if against:
+        lines.append("")
+        lines.append(f"Pointing away from {rating} stars:")
+        lines.extend(f"- {_value_phrase(f)}" for f in against)
+    return '\n'.join(lines)
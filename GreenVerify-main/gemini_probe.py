@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class GeminiProbe:
+    """
+    Finds a working Gemini model on a background thread so workers never
+    wait on the network at import time. The result is cached and handed to
+    on_change; the probe repeats every interval seconds while a model is
+    available, and every retry_interval seconds while none is.
+    """
+
+    def __init__(self, model_names, create_model, on_change, interval=600, retry_interval=60, probe_timeout=10):
+        self.model_names = model_names
+        self.create_model = create_model
+        self.on_change = on_change
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.probe_timeout = probe_timeout
+
+        self.model_name = None
+        self.available = False
+        self.probes = 0
+        self.last_probe_at = None
+        self.last_probe_seconds = None
+        self.last_error = None
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start probing in the background. Forked workers start their own
+        probe thread, since threads do not survive fork.
+        """
+        self._spawn()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        return self
+
+    def _spawn(self):
+        self._thread = threading.Thread(target=self._loop, name='gemini-probe', daemon=True)
+        self._thread.start()
+
+    def _after_fork(self):
+        """
+        Keep the cached result so the worker serves LLM requests at once,
+        but rebuild the client object and re-probe from this process.
+        """
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        if self.model_name is not None:
+            self.on_change(self.create_model(self.model_name), self.model_name)
+            self._ready.set()
+        self._spawn()
+
+    def _loop(self):
+        while True:
+            self.probe()
+            self._wake.wait(self.interval if self.available else self.retry_interval)
+            self._wake.clear()
+
+    def probe(self):
+        """
+        Try each candidate model with a small request and keep the first
+        one that answers.
+        """
+        start = time.perf_counter()
+        model = None
+        model_name = None
+        error = None
+        for name in self.model_names:
+            try:
+                candidate = self.create_model(name)
+                candidate.generate_content("Test", request_options={'timeout': self.probe_timeout})
+                model, model_name = candidate, name
+                break
+            except Exception as e:
+                error = f"{name}: {e}"
+                if self.probes == 0:
+                    print(f"Failed to initialize {name}: {e}")
+
+        self.probes += 1
+        self.last_probe_seconds = time.perf_counter() - start
+        self.last_probe_at = datetime.now().isoformat()
+        self.last_error = None if model else error
+
+        if model_name != self.model_name or model is None:
+            if model is not None:
+                print(f"Successfully initialized Gemini model: {model_name}")
+            elif self.available or self.probes == 1:
+                print("Warning: No Gemini models available")
+            self.model_name = model_name
+            self.available = model is not None
+            self.on_change(model, model_name)
+        self._ready.set()
+
+    def wait(self, timeout):
+        """
+        Block up to timeout seconds for the first probe to finish.
+        """
+        return self._ready.wait(timeout)
+
+    def status(self):
+        return {
+            'ready': self._ready.is_set(),
+            'available': self.available,
+            'model': self.model_name,
+            'probes': self.probes,
+            'last_probe_at': self.last_probe_at,
+            'last_probe_latency_ms': (
+                round(self.last_probe_seconds * 1000, 1) if self.last_probe_seconds is not None else None
+            ),
+            'last_error': self.last_error
+        }
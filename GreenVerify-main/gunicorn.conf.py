@@ -0,0 +1,44 @@
+# Gunicorn settings: gunicorn -c gunicorn.conf.py app:app
+#
+# Threaded workers keep /predict and /health responsive while GreenyBot
+# requests wait on Gemini, which runs on the bounded LLM pool in app.py.
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# In-memory sessions are per process, so follow-up requests served by
+# another worker would not find the session. Share them through SQLite
+# whenever more than one worker runs, unless SESSION_BACKEND is set.
+if workers > 1:
+    os.environ.setdefault('SESSION_BACKEND', 'sqlite')
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# A GreenyBot request holds its thread while its Gemini call runs or waits
+# in the LLM pool. Size the pool below the thread count, so the pool turns
+# requests away with the offline content before every thread is taken and
+# SCORING_THREADS threads stay free for /predict and /health.
+scoring_threads = int(os.environ.get('SCORING_THREADS', 2))
+llm_slots = max(threads - scoring_threads, 1)
+os.environ.setdefault('LLM_POOL_WORKERS', str(max(llm_slots * 2 // 3, 1)))
+os.environ.setdefault('LLM_POOL_PENDING', str(max(llm_slots - int(os.environ['LLM_POOL_WORKERS']), 0)))
+if int(os.environ['LLM_POOL_WORKERS']) + int(os.environ['LLM_POOL_PENDING']) >= threads:
+    print(f"Warning: LLM_POOL_WORKERS + LLM_POOL_PENDING should be below {threads} threads, "
+          f"or slow Gemini calls can block /predict and /health")
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Load the app (and the model) once in the master before forking, so
+# workers share the model pages copy-on-write instead of each loading
+# their own copy.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the garbage collector's reach;
+    # otherwise collections in the workers touch those objects and copy
+    # the shared pages.
+    if preload_app:
+        gc.freeze()
@@ -0,0 +1,173 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class FeatureLayout:
+    """
+    Fixed NumPy feature layout compiled once from the loaded label encoders,
+    scaler and feature names, so scoring a request never touches pandas.
+    """
+
+    def __init__(self, feature_names, label_encoders, scaler):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+
+        # Lookup tables for the categoricals, unseen categories map to 0
+        self.categorical = []
+        for pos, feature in enumerate(self.feature_names):
+            if feature in label_encoders:
+                classes = label_encoders[feature].classes_
+                lookup = {cls: idx for idx, cls in enumerate(classes)}
+                self.categorical.append((pos, feature, lookup))
+
+        self.numeric_features = [f for f in self.feature_names if f not in label_encoders]
+        self.numeric_positions = np.array(
+            [self.feature_names.index(f) for f in self.numeric_features], dtype=np.intp
+        )
+
+        # Precomputed mean/scale arrays in the order the scaler was fitted
+        n_numeric = len(self.numeric_features)
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        self.mean = np.zeros(n_numeric) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones(n_numeric) if scale is None else np.asarray(scale, dtype=np.float64)
+
+        fitted_names = getattr(scaler, 'feature_names_in_', None)
+        if fitted_names is not None and list(fitted_names) != self.numeric_features:
+            order = [list(fitted_names).index(f) for f in self.numeric_features]
+            self.mean = self.mean[order]
+            self.scale = self.scale[order]
+
+        # Skip the fancy-indexed copy when every feature is numeric and in order
+        self.all_numeric = (
+            not self.categorical
+            and np.array_equal(self.numeric_positions, np.arange(self.n_features))
+        )
+
+        self._local = threading.local()
+
+    def _row(self):
+        """
+        Preallocated input row, one per thread so concurrent requests
+        never share a buffer.
+        """
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = np.zeros((1, self.n_features), dtype=np.float64)
+            self._local.row = row
+        return row
+
+    def is_all_zero(self, inputs):
+        """
+        Matches the DataFrame check: every numeric input is 0 and every
+        categorical input is missing.
+        """
+        for feature in self.feature_names:
+            value = inputs[feature]
+            if value is None:
+                continue
+            if isinstance(value, str) or value != 0:
+                return False
+        return True
+
+    def fill_row(self, inputs):
+        """
+        Fill the preallocated row from an inputs dict with the categoricals
+        encoded, before scaling.
+        """
+        row = self._row()
+        values = row[0]
+        for pos, feature in enumerate(self.feature_names):
+            value = inputs[feature]
+            values[pos] = value if not isinstance(value, str) and value is not None else 0.0
+        for pos, feature, lookup in self.categorical:
+            values[pos] = lookup.get(inputs[feature], 0)
+        return row
+
+    def encode_row(self, inputs):
+        """
+        Fill the preallocated row from an inputs dict and return it encoded
+        and scaled, ready for the booster.
+        """
+        return self.scale_inplace(self.fill_row(inputs))
+
+    def scale_inplace(self, matrix):
+        """
+        Standardize the numeric columns of a 2D matrix in place.
+        """
+        if self.all_numeric:
+            matrix -= self.mean
+            matrix /= self.scale
+        elif len(self.numeric_positions):
+            cols = self.numeric_positions
+            matrix[:, cols] = (matrix[:, cols] - self.mean) / self.scale
+        return matrix
+
+
+def softmax(margins):
+    """
+    Row-wise softmax over raw booster margins.
+    """
+    shifted = margins - margins.max(axis=1, keepdims=True)
+    np.exp(shifted, out=shifted)
+    shifted /= shifted.sum(axis=1, keepdims=True)
+    return shifted
+
+
+def score(booster, matrix, output_margin=False):
+    """
+    Single booster evaluation that yields both the class probabilities and
+    the argmax class index for every row of an encoded, scaled matrix.
+
+    With output_margin the booster returns raw margins: the label is taken
+    straight from them and the probabilities come from a NumPy softmax.
+    """
+    if output_margin:
+        margins = booster.inplace_predict(matrix, predict_type='margin')
+        if margins.ndim == 1:
+            margins = np.column_stack([np.zeros_like(margins), margins])
+        return softmax(margins), margins.argmax(axis=1)
+
+    probs = booster.inplace_predict(matrix)
+    if probs.ndim == 1:
+        probs = np.column_stack([1.0 - probs, probs])
+    return probs, probs.argmax(axis=1)
+
+
+def preprocess_batch(bundle, batch_df):
+    """
+    Vectorized version of the /predict preprocessing for many rows at once.
+    Returns the encoded and scaled feature matrix, a mask of all-zero rows
+    (not certified), a mask of rows with invalid numeric values and the
+    cleaned, unscaled feature frame.
+    """
+    feature_names = bundle.feature_names
+    feature_layout = bundle.layout
+    missing = [f for f in feature_names if f not in batch_df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    features_df = batch_df[feature_names].copy()
+    num_features = feature_layout.numeric_features
+
+    # Empty cells default to 0 like the form; unparsable values are flagged
+    raw_numeric = features_df[num_features].replace('', np.nan)
+    numeric = raw_numeric.apply(pd.to_numeric, errors='coerce')
+    invalid_mask = (numeric.isna() & raw_numeric.notna()).any(axis=1).to_numpy()
+    features_df[num_features] = numeric.fillna(0.0).clip(lower=0.0)
+
+    # Check which rows are all zero (not certified)
+    zero_mask = features_df.replace(0, np.nan).isna().all(axis=1).to_numpy()
+
+    # Encode into the precompiled feature layout, unseen categories map to 0
+    matrix = np.zeros((len(features_df), feature_layout.n_features))
+    matrix[:, feature_layout.numeric_positions] = features_df[num_features].to_numpy(dtype=np.float64)
+    for pos, col, lookup in feature_layout.categorical:
+        matrix[:, pos] = features_df[col].map(lookup).fillna(0).to_numpy()
+
+    # Scale numeric features
+    feature_layout.scale_inplace(matrix)
+
+    return matrix, zero_mask, invalid_mask, features_df
@@ -0,0 +1,157 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class PoolBusy(Exception):
+    """
+    Raised when every LLM slot is taken, so the caller can fall back
+    immediately instead of queueing behind slow responses.
+    """
+
+
+class LLMPool:
+    """
+    Bounded thread pool that runs Gemini calls apart from the request
+    workers. At most max_workers calls run at once and max_pending more
+    may wait; anything beyond that is rejected with PoolBusy.
+    """
+
+    def __init__(self, max_workers=4, max_pending=16, timeout=30.0):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.first_chunk_seconds = 0.0
+        self.streams = 0
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self.active += 1
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule fn on the pool and return its Future.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolBusy('All LLM workers are busy')
+        with self._lock:
+            self.submitted += 1
+        return self._executor.submit(self._run, fn, args, kwargs)
+
+    def call(self, fn, *args, timeout=None, **kwargs):
+        """
+        Run fn on the pool and wait for its result, raising TimeoutError
+        once the timeout passes.
+        """
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def run_all(self, tasks, timeout=None):
+        """
+        Run several calls concurrently and wait for them under one shared
+        deadline. tasks maps a name to (fn, args); the result maps each name
+        to the call's return value, or to the exception it raised
+        (PoolBusy, TimeoutError or the call's own error).
+        """
+        futures = {}
+        results = {}
+        for name, (fn, args) in tasks.items():
+            try:
+                futures[name] = self.submit(fn, *args)
+            except PoolBusy as e:
+                results[name] = e
+
+        deadline = time.perf_counter() + (timeout or self.timeout)
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(deadline - time.perf_counter(), 0))
+            except TimeoutError:
+                future.cancel()
+                with self._lock:
+                    self.timeouts += 1
+                results[name] = TimeoutError(f'{name} timed out')
+            except Exception as e:
+                results[name] = e
+        return results
+
+    def stream(self, fn, *args, timeout=None, **kwargs):
+        """
+        Run fn, which returns an iterable of text chunks, on the pool and
+        yield the chunks as soon as they arrive. The timeout applies to the
+        wait for each chunk.
+        """
+        chunks = queue.Queue()
+
+        def produce():
+            try:
+                for chunk in fn(*args, **kwargs):
+                    chunks.put(('chunk', chunk))
+                chunks.put(('done', None))
+            except Exception as e:
+                chunks.put(('error', e))
+
+        self.submit(produce)
+        start = time.perf_counter()
+        first = True
+        while True:
+            try:
+                kind, value = chunks.get(timeout=timeout or self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self.timeouts += 1
+                raise TimeoutError('LLM stream timed out')
+            if kind == 'error':
+                raise value
+            if kind == 'done':
+                return
+            if first:
+                first = False
+                with self._lock:
+                    self.streams += 1
+                    self.first_chunk_seconds += time.perf_counter() - start
+            yield value
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'timeout_seconds': self.timeout,
+            'active': self.active,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'avg_first_chunk_seconds': (
+                self.first_chunk_seconds / self.streams if self.streams else 0.0
+            )
+        }
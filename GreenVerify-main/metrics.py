@@ -0,0 +1,280 @@
+"""
+Low-overhead in-process metrics rendered in the Prometheus text format.
+
+Counters and histograms keep one small child per label set, so the hot
+path is a dict lookup, a bisect and a locked add. Metrics are per process:
+with several gunicorn workers each scrape sees the worker that served it.
+"""
+import bisect
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+
+# Latency buckets in seconds, from sub-millisecond scoring to slow LLM calls
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        """
+        Child metric for one label set; keep a reference to it on hot paths.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1, **labels):
+        self.labels(**labels).inc(amount)
+
+
+class _Timer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(labelnames, key, ('le', _format_value(float(bound))))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, key)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value, **labels):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels):
+        """
+        Context manager that observes the wall time of its block.
+        """
+        return _Timer(self.labels(**labels))
+
+
+class GaugeCallback:
+    """
+    Gauge whose samples are read at scrape time from a callback returning
+    {label values tuple: value}, so existing stats need no extra bookkeeping.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            samples = self.callback()
+        except Exception as e:
+            return lines + [f"# error reading {self.name}: {e}"]
+        for key, value in sorted(samples.items()):
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class CounterCallback(GaugeCallback):
+    """
+    Counter read at scrape time, for totals another component already keeps.
+    """
+
+    kind = 'counter'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, labelnames, callback):
+        return self.register(GaugeCallback(name, documentation, labelnames, callback))
+
+    def counter_callback(self, name, documentation, labelnames, callback):
+        return self.register(CounterCallback(name, documentation, labelnames, callback))
+
+    def render(self):
+        """
+        Every metric in the Prometheus text exposition format (0.0.4).
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    'greenverify_request_seconds', 'Request latency by endpoint.', ['endpoint']
+)
+REQUESTS = registry.counter(
+    'greenverify_requests_total', 'Requests by endpoint and HTTP status.', ['endpoint', 'status']
+)
+STAGE_SECONDS = registry.histogram(
+    'greenverify_stage_seconds', 'Latency of each request processing stage.', ['stage']
+)
+LLM_SECONDS = registry.histogram(
+    'greenverify_llm_call_seconds', 'Latency of each Gemini generate_content call.', ['kind']
+)
+LLM_ERRORS = registry.counter(
+    'greenverify_llm_errors_total', 'Gemini calls that raised, by kind and exception type.', ['kind', 'error']
+)
+FALLBACKS = registry.counter(
+    'greenverify_fallbacks_total', 'Offline fallback content served instead of Gemini output.', ['kind']
+)
+PROMPT_TOKENS = registry.histogram(
+    'greenverify_prompt_tokens', 'Estimated input tokens of each rendered Gemini prompt.', ['template'],
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+)
+PROMPT_TRIMS = registry.counter(
+    'greenverify_prompt_trims_total', 'Prompt fields cut to fit the token budget.', ['template', 'field']
+)
+
+
+def stage(name):
+    """
+    Histogram child for one stage; module-level references keep the hot
+    path to a perf_counter pair and one observe.
+    """
+    return STAGE_SECONDS.labels(stage=name)
+
+
+def timed(name):
+    """
+    Decorator that records each call of the wrapped function as a stage.
+    """
+    child = stage(name)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
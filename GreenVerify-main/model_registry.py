@@ -0,0 +1,219 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from artifact import booster_bytes
+from inference import FeatureLayout, score
+
+
+class ModelBundle:
+    """
+    Everything needed to score one model version. Bundles are never
+    mutated: a reload builds a new one and swaps the reference, so a
+    request that picked up a bundle finishes on that version.
+    """
+
+    def __init__(self, model, feature_names, label_encoders, scaler, reverse_mapping, version, source):
+        self.model = model
+        self.feature_names = feature_names
+        self.label_encoders = label_encoders
+        self.scaler = scaler
+        self.reverse_mapping = reverse_mapping
+        self.version = version
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        # Compile encoders and scaler into a fixed NumPy layout for scoring
+        self.layout = FeatureLayout(feature_names, label_encoders, scaler)
+        self.booster = model.get_booster()
+
+    def warm_up(self, rows):
+        """
+        Score sample rows once so the first real request does not pay for
+        lazy initialization inside the booster.
+        """
+        matrix = np.zeros((len(rows), self.layout.n_features))
+        for i, row in enumerate(rows):
+            for pos, feature in enumerate(self.feature_names):
+                value = row.get(feature, 0)
+                try:
+                    matrix[i, pos] = float(value)
+                except (TypeError, ValueError):
+                    matrix[i, pos] = 0.0
+        self.layout.scale_inplace(matrix)
+        score(self.booster, matrix)
+        for i in range(len(matrix)):
+            score(self.booster, matrix[i:i + 1])
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelBundle and hot-reloads it when the model files
+    change. New versions go in models/versions/<version>/; the
+    lexicographically greatest directory wins, and without one the files
+    in models/ are used. A background thread polls the file fingerprints,
+    loads and warms up the new bundle, then swaps it in atomically.
+    """
+
+    def __init__(self, loader, models_dir='models', poll_interval=30, warmup_rows=None):
+        self.loader = loader
+        self.models_dir = models_dir
+        self.versions_dir = os.path.join(models_dir, 'versions')
+        self.poll_interval = poll_interval
+        self.warmup_rows = warmup_rows or []
+        self.load_listeners = []
+        self.listeners = []
+
+        self._bundle = None
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.last_error = None
+        self.last_reload_at = None
+        self.last_reload_seconds = None
+        self.history = []
+
+    def current(self):
+        """
+        The active bundle, or None if no model could be loaded.
+        """
+        return self._bundle
+
+    def on_load(self, listener):
+        """
+        Call listener(bundle) on each new bundle after its warm-up and
+        before it is swapped in, to precompute per-version state so the
+        first requests on the new version do not pay for it.
+        """
+        self.load_listeners.append(listener)
+
+    def on_swap(self, listener):
+        """
+        Call listener(bundle) after each new bundle is swapped in.
+        """
+        self.listeners.append(listener)
+
+    def active_dir(self):
+        """
+        Directory holding the model to serve: the newest version directory
+        if there is one, otherwise models/. Hidden directories are skipped
+        so a version can be staged and then renamed into place.
+        """
+        if os.path.isdir(self.versions_dir):
+            versions = sorted(
+                name for name in os.listdir(self.versions_dir)
+                if not name.startswith('.') and os.path.isdir(os.path.join(self.versions_dir, name))
+            )
+            if versions:
+                return os.path.join(self.versions_dir, versions[-1])
+        return self.models_dir
+
+    def fingerprint(self):
+        """
+        Cheap change detector: path, size and mtime of every model file.
+        """
+        directory = self.active_dir()
+        entries = []
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and name.endswith(('.pkl', '.bundle')):
+                stat = os.stat(path)
+                entries.append((name, stat.st_size, stat.st_mtime_ns))
+        return directory, tuple(entries)
+
+    def load(self, warm_up=True):
+        """
+        Load the model from the active directory and swap it in. Returns
+        True on success; on failure the current bundle keeps serving.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            fingerprint = self.fingerprint()
+            directory = fingerprint[0]
+            model, feature_names, label_encoders, scaler, reverse_mapping = self.loader(directory)
+            if model is None:
+                self.last_error = reverse_mapping
+                self._fingerprint = fingerprint
+                print(f"Warning: could not load model from {directory}: {reverse_mapping}")
+                return False
+
+            if directory != self.models_dir:
+                version = os.path.basename(directory)
+            else:
+                version = hashlib.sha256(booster_bytes(model)).hexdigest()[:12]
+
+            bundle = ModelBundle(
+                model, feature_names, label_encoders, scaler, reverse_mapping, version, directory
+            )
+            if warm_up:
+                if self.warmup_rows:
+                    bundle.warm_up(self.warmup_rows)
+                for listener in self.load_listeners:
+                    listener(bundle)
+
+            previous = self._bundle
+            self._bundle = bundle
+            self._fingerprint = fingerprint
+            self.last_error = None
+            self.last_reload_at = datetime.now().isoformat()
+            self.last_reload_seconds = time.perf_counter() - start
+            if previous is not None:
+                self.reloads += 1
+                print(f"Swapped model version {previous.version} -> {version}")
+            self.history = (self.history + [{'version': version, 'loaded_at': bundle.loaded_at}])[-10:]
+
+        for listener in self.listeners:
+            listener(bundle)
+        return True
+
+    def check(self):
+        """
+        Reload if the model files changed since the last load.
+        """
+        try:
+            if self.fingerprint() != self._fingerprint:
+                return self.load()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Warning: model reload failed: {e}")
+        return False
+
+    def start_watching(self):
+        """
+        Poll for new model files in the background. Forked workers start
+        their own watcher, since threads do not survive fork.
+        """
+        if self.poll_interval <= 0:
+            return self
+        self._spawn()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        return self
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._spawn()
+
+    def _spawn(self):
+        threading.Thread(target=self._watch, name='model-watcher', daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.check()
+
+    def status(self):
+        bundle = self._bundle
+        return {
+            'version': bundle.version if bundle else None,
+            'source': bundle.source if bundle else None,
+            'loaded_at': bundle.loaded_at if bundle else None,
+            'reloads': self.reloads,
+            'last_reload_at': self.last_reload_at,
+            'last_reload_seconds': self.last_reload_seconds,
+            'last_error': self.last_error,
+            'history': self.history
+        }
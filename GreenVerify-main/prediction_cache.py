@@ -0,0 +1,49 @@
+import hashlib
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU cache of model outputs keyed on the encoded, scaled feature row
+    and the model version, so duplicate submissions skip the booster.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.invalidations = 0
+
+    @staticmethod
+    def key(version, row):
+        """
+        Canonical key for one (1, n) feature row under a model version.
+        """
+        digest = hashlib.blake2b(np.ascontiguousarray(row).tobytes(), digest_size=16).hexdigest()
+        return f"{version}:{digest}"
+
+    def get(self, key):
+        """
+        Return (probabilities, class index) for key, or None.
+        """
+        cached = self.store.get(key)
+        if cached is None:
+            return None
+        return np.asarray(cached['probabilities']), cached['index']
+
+    def put(self, key, probabilities, index):
+        self.store.set(key, {
+            'probabilities': probabilities.tolist(),
+            'index': int(index)
+        })
+
+    def invalidate(self, bundle=None):
+        """
+        Drop every cached prediction; registered as a model swap listener.
+        """
+        self.store.clear()
+        self.invalidations += 1
+
+    def stats(self):
+        stats = self.store.stats()
+        stats['invalidations'] = self.invalidations
+        return stats
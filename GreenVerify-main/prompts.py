@@ -0,0 +1,250 @@
+"""
+Prompt templates for Gemini, compiled once at import.
+
+Each template is split into its literal text and field names up front, so
+rendering is a single join. The building context for a set of inputs is
+formatted once and cached. Templates name the fields that may be trimmed
+when a prompt would exceed its token budget, and the estimated token count
+of every rendered prompt is recorded on /metrics.
+"""
+import functools
+from string import Formatter
+
+from explain import feature_label
+from metrics import PROMPT_TOKENS, PROMPT_TRIMS
+
+# Gemini averages about four characters of English per token; the estimate
+# needs no tokenizer or network call
+CHARS_PER_TOKEN = 4
+
+CONTEXT_CACHE_SIZE = 4096
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def format_value(value):
+    """
+    Compact form of an input value: 1.0 becomes 1, 0.05000 becomes 0.05.
+    """
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+@functools.lru_cache(maxsize=CONTEXT_CACHE_SIZE)
+def _building_context(items):
+    return '\n'.join(f"- {feature_label(feature)}: {format_value(value)}" for feature, value in items)
+
+
+def building_context(user_inputs):
+    """
+    One "- Label: value" line per input. Every prompt for a session is
+    built from the same inputs, so the text is formatted once per session.
+    """
+    return _building_context(tuple(user_inputs.items()))
+
+
+def clear_context_cache():
+    _building_context.cache_clear()
+
+
+def context_cache_stats():
+    info = _building_context.cache_info()
+    return {
+        'entries': info.currsize,
+        'max_entries': info.maxsize,
+        'hits': info.hits,
+        'misses': info.misses
+    }
+
+
+def trim_text(text, max_tokens):
+    """
+    Drop trailing lines until text fits max_tokens, then cut the last
+    line if it alone is still too long.
+    """
+    if max_tokens <= 0:
+        return ''
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lines = text.split('\n')
+    while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop()
+    text = '\n'.join(lines)
+    if estimate_tokens(text) > max_tokens:
+        text = text[:max(max_tokens * CHARS_PER_TOKEN - 3, 0)] + '...'
+    return text
+
+
+class PromptTemplate:
+    """
+    A prompt with {field} placeholders. Fields listed in trim are cut, in
+    that order, when the rendered prompt would go over the budget.
+    """
+
+    def __init__(self, name, text, trim=()):
+        self.name = name
+        self.trim = tuple(trim)
+        self.parts = [(literal, field) for literal, field, _, _ in Formatter().parse(text)]
+        self.fields = {field for _, field in self.parts if field is not None}
+        self.fixed_tokens = estimate_tokens(''.join(literal for literal, _ in self.parts))
+        self._tokens = PROMPT_TOKENS.labels(template=name)
+
+    def room(self, budget, field, **values):
+        """
+        Tokens left for field once the fixed text and the other values
+        are counted, so a caller can shape that field to fit.
+        """
+        others = sum(estimate_tokens(str(values.get(f, ''))) for f in self.fields if f != field)
+        return budget - self.fixed_tokens - others
+
+    def render(self, budget=None, **values):
+        values = {field: str(values.get(field, '')) for field in self.fields}
+
+        if budget:
+            over = self.fixed_tokens + sum(estimate_tokens(v) for v in values.values()) - budget
+            for field in self.trim:
+                if over <= 0:
+                    break
+                before = estimate_tokens(values[field])
+                values[field] = trim_text(values[field], before - over)
+                over -= before - estimate_tokens(values[field])
+                PROMPT_TRIMS.inc(template=self.name, field=field)
+
+        prompt = ''.join(literal + (values[field] if field is not None else '') for literal, field in self.parts)
+        self._tokens.observe(estimate_tokens(prompt))
+        return prompt
+
+
+INITIAL_ASSESSMENT = """
+You are GreenyBot, an expert AI assistant specializing in GRIHA (Green Rating for Integrated Habitat Assessment) green building certification in India.
+
+BUILDING ASSESSMENT RESULTS:
+- Predicted GRIHA Rating: {rating} Stars (out of 5)
+{building_info}
+
+FEATURE CONTEXT:
+The following features use 0 and 1 values to indicate their presence:
+- Waste_Management: 0 means not present, 1 means present
+- Social_Benefits: 0 means not present, 1 means present
+- VOC/Lead Free Paints: 0 means not present, 1 means present
+- Air_Pollution_Control: 0 means not present, 1 means present
+Other features have numeric values indicating performance levels.
+
+GRIHA RATING CONTEXT:
+- 1 Star: Basic compliance with minimal green features
+- 2 Stars: Good performance with some green initiatives
+- 3 Stars: Very good performance with multiple sustainability measures
+- 4 Stars: Excellent performance with comprehensive green features
+- 5 Stars: Outstanding performance, benchmark for sustainable buildings
+
+Please provide ONLY the "Why This Rating?" section. Explain why the building received this specific star rating based on the input parameters. Reference specific GRIHA criteria and requirements. Keep it concise and informative.
+
+Format your response as plain text without any markdown formatting, emojis, or special characters.
+"""
+
+STRENGTHS = """
+Based on the building details and {rating} star GRIHA rating, list 3-4 key strengths of this building design. Focus on what the building does well in terms of sustainability and green features. Be specific and reference GRIHA criteria.
+
+Building Details:
+{building_info}
+
+Provide only the strengths in a clear, numbered list format.
+"""
+
+IMPROVEMENTS = """
+Based on the building details and {rating} star GRIHA rating, provide 4-5 specific, actionable recommendations to improve the GRIHA rating. Focus on:
+- Energy efficiency measures
+- Water conservation strategies
+- Sustainable materials and resources
+- Indoor environmental quality improvements
+- Innovation in design processes
+
+Building Details:
+{building_info}{whatif}
+
+Provide practical recommendations that can be implemented. Use numbered list format.
+"""
+
+BENEFITS = """
+Explain the benefits of implementing green building improvements for this {rating} star rated building. Cover:
+- Environmental impact reduction
+- Cost savings potential
+- Health and comfort improvements
+- Certification advantages
+- Long-term value addition
+
+Building Details:
+{building_info}
+
+Provide clear,concise and  actionable benefits.
+"""
+
+NEXT_STEPS = """
+Provide 3-4 immediate actionable steps that the building owner can take to improve their {rating} star GRIHA rating. Make these steps practical, prioritized, and feasible.
+
+Building Details:
+{building_info}{whatif}
+
+List the steps in order of priority.
+"""
+
+CHAT = """
+You are GreenyBot, an expert AI assistant specializing in GRIHA green building certification in India.
+
+CONTEXT:
+- Building GRIHA Rating: {rating} Stars
+- Building Details: {building_info}
+{history}
+USER QUESTION: {question}
+
+Your Task:
+- Act as a GRIHA expert and provide accurate, clear, and practical information about the GRIHA rating system, its criteria, benefits, processes, and sustainability measures.
+- Only use the building-specific context (rating or details) if the user explicitly asks about that building; otherwise provide general GRIHA-related information.
+- Use the conversation so far to resolve follow-up questions, without repeating earlier answers.
+- Keep responses concise and practical.
+
+{response_format}
+"""
+
+# Follow-up questions as marked-up text, parsed by parse_chat_response
+CHAT_TEXT_FORMAT = """After your main response, suggest 3 relevant follow-up questions that the user might want to ask, formatted as:
+FOLLOW_UP_QUESTIONS:
+1. [Question 1]
+2. [Question 2]
+3. [Question 3]"""
+
+# Follow-up questions as structured output, for Gemini's JSON mode
+CHAT_JSON_FORMAT = """Respond with only a JSON object of this form:
+{"answer": "<your response as plain text>", "follow_up_questions": ["<question 1>", "<question 2>", "<question 3>"]}
+The follow-up questions are 3 relevant questions that the user might want to ask next."""
+
+TEMPLATES = {
+    template.name: template for template in [
+        PromptTemplate('initial_assessment', INITIAL_ASSESSMENT, trim=['building_info']),
+        PromptTemplate('strengths', STRENGTHS, trim=['building_info']),
+        PromptTemplate('improvements', IMPROVEMENTS, trim=['whatif', 'building_info']),
+        PromptTemplate('benefits', BENEFITS, trim=['building_info']),
+        PromptTemplate('next_steps', NEXT_STEPS, trim=['whatif', 'building_info']),
+        PromptTemplate('chat', CHAT, trim=['history', 'building_info', 'question'])
+    ]
+}
+
+SECTION_TEMPLATES = ('strengths', 'improvements', 'benefits', 'next_steps')
+
+
+def render(name, budget=None, **values):
+    """
+    Render a template by name, or return None for an unknown name.
+    """
+    template = TEMPLATES.get(name)
+    if template is None:
+        return None
+    return template.render(budget, **values)
+
+
+def room(name, budget, field, **values):
+    """
+    Tokens a template has left for one field, given the other values.
+    """
+    return TEMPLATES[name].room(budget, field, **values)
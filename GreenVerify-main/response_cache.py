@@ -0,0 +1,76 @@
+import hashlib
+import json
+import time
+
+from store import json_default
+
+
+def canonical_key(**parts):
+    """
+    Content hash of the request parts (inputs, rating, prompt template,
+    model name). Key order and whitespace never change the hash.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=json_default, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for generated LLM text on top of a bounded
+    store, so identical assessments are answered without calling Gemini.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.generations = 0
+        self.generation_seconds = 0.0
+        self.seconds_saved = 0.0
+
+    def get(self, key):
+        """
+        Return the cached text for key, or None.
+        """
+        cached = self.store.get(key)
+        if cached is None:
+            return None
+        self.seconds_saved += cached.get('generation_seconds', 0.0)
+        return cached['text']
+
+    def put(self, key, text, generation_seconds=0.0):
+        """
+        Record a generation and cache its text. Empty results are never
+        cached so the caller can fall back and retry later.
+        """
+        self.generations += 1
+        self.generation_seconds += generation_seconds
+        if text:
+            self.store.set(key, {
+                'text': text,
+                'created_at': time.time(),
+                'generation_seconds': generation_seconds
+            })
+
+    def get_or_generate(self, key, generate):
+        """
+        Return the cached text for key, or call generate() and cache a
+        non-empty result.
+        """
+        text = self.get(key)
+        if text is not None:
+            return text
+
+        start = time.perf_counter()
+        text = generate()
+        self.put(key, text, time.perf_counter() - start)
+        return text
+
+    def stats(self):
+        stats = self.store.stats()
+        stats.update({
+            'generations': self.generations,
+            'avg_generation_seconds': (
+                self.generation_seconds / self.generations if self.generations else 0.0
+            ),
+            'seconds_saved': self.seconds_saved
+        })
+        return stats
@@ -0,0 +1,324 @@
+"""
+Offline retrieval over GRIHA guidance and the green_building.csv buildings.
+
+Two indexes are built once at startup and answer in well under a
+millisecond:
+
+- BM25 over short guidance snippets: the offline assessment and section
+  text, one line per recommendation, plus a note on each input feature.
+- Nearest neighbours over the buildings in the reference CSV, on features
+  normalized by their 10th to 90th percentile spread, so answers can cite
+  similar buildings that reached a given rating.
+
+Without Gemini, GreenyBot answers chat questions and fills the report
+sections from these indexes, and chat prompts send only the inputs the
+question is about.
+"""
+import math
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from explain import feature_label
+from prompts import format_value
+from whatif import FEATURE_CONSTRAINTS
+
+# What each input measures and how it is usually improved, with the
+# everyday words people use for it so that questions find it
+FEATURE_GUIDANCE = {
+    'Energy_Consumption_Reduction': "Energy consumption reduction is the percentage cut in energy use against the GRIHA baseline, through efficient lighting, HVAC, appliances and controls; higher is better.",
+    'Waste_Management': "Waste management (a score from 0 to 4, higher is better) covers segregation, recycling and composting of construction and operational waste.",
+    'Utilization_Of_Alternative_Materials': "Alternative materials are recycled, low-embodied-carbon or locally sourced materials such as fly ash bricks and recycled steel; a higher share improves the materials and resources credits.",
+    'Soil_Preservation(m^3)': "Soil preservation is the volume of topsoil stripped, stored and reused on site for landscaping instead of being lost during excavation.",
+    'Renewable_Energy_Utilization(MW)': "Renewable energy utilization is on-site generating capacity from solar panels, rooftop photovoltaics or wind; more capacity offsets grid electricity.",
+    'Water_Demand_Reduction(Building)': "Building water demand reduction is the percentage cut in indoor water use through low-flow fixtures, dual-flush toilets and aerators.",
+    'Waste_Demand_Reduction(Landscape)': "Landscape water demand reduction is the percentage cut in irrigation water through native plants, drip irrigation and rainwater harvesting.",
+    'Waste_Water_Treatment(KLD)': "Waste water treatment is the on-site sewage and greywater treatment capacity in kilolitres per day, with treated water reused for flushing and irrigation.",
+    'Social_Benefits': "Social benefits (a score from 0 to 2, higher is better) covers facilities and welfare for construction workers and occupants, such as sanitation, safety and accessibility.",
+    'VOC/Lead Free Paints': "VOC and lead free paints (1 when present) use low-emission paints, adhesives and sealants that protect indoor air quality.",
+    'EPI(Energy Performance Index)': "The energy performance index (EPI) is annual energy use per square metre; a lower EPI means a more efficient building envelope, lighting and cooling.",
+    'Daylight_Factor': "Daylight factor is the share of outdoor daylight reaching indoor spaces through windows, skylights and shading design; good daylight cuts lighting energy.",
+    'EPR(Energy performane Reduction)': "Energy performance reduction (EPR) is the improvement of the building's energy performance over the benchmark; higher is better.",
+    'Air_Pollution_Control': "Air pollution control (1 when present) covers dust and emission control during construction, such as screens, wet suppression and covered storage.",
+    'Building Performance(kWh /sqm/year)': "Building performance is the operational energy intensity in kWh per square metre per year; lower values mean better performance.",
+    'Water_Consumption_in_building(KL/annum)': "Water consumption is the building's annual water use in kilolitres; lower values, through efficient fixtures and reuse, are better.",
+    'Renewable_Energy_REC(kWH/annum)': "Renewable energy certificates (REC) account for renewable electricity bought off site in kWh per year, offsetting grid electricity where on-site solar is limited."
+}
+
+# Smallest gap to similar buildings worth mentioning, as a share of the
+# feature's 10th to 90th percentile spread
+MIN_PEER_GAP = 0.05
+
+# Matches scoring below this share of the best match are left out
+MIN_SCORE_RATIO = 0.5
+
+STOPWORDS = {
+    'a', 'about', 'add', 'an', 'and', 'are', 'as', 'at', 'be', 'building', 'buildings', 'by', 'can', 'do',
+    'does', 'for', 'from', 'get', 'green', 'griha', 'has', 'have', 'how', 'i', 'if', 'implement', 'in', 'is',
+    'it', 'its', 'make', 'me', 'more', 'my', 'need', 'of', 'on', 'or', 'our', 'should', 'so', 'that', 'the',
+    'their', 'this', 'to', 'use', 'want', 'was', 'we', 'what', 'when', 'which', 'why', 'will', 'with',
+    'would', 'you', 'your'
+}
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens without stopwords, with plural endings stripped.
+    """
+    tokens = []
+    for token in re.findall(r'[a-z0-9]+', text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith('ies'):
+            token = token[:-3] + 'y'
+        elif len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of documents, each a dict with a 'text' key
+    and any metadata used to filter results.
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.documents = documents
+        self.k1 = k1
+        postings = defaultdict(lambda: defaultdict(int))
+        lengths = np.zeros(len(documents))
+        for doc_id, doc in enumerate(documents):
+            tokens = tokenize(doc['text'])
+            lengths[doc_id] = len(tokens)
+            for token in tokens:
+                postings[token][doc_id] += 1
+
+        self.norms = k1 * (1 - b + b * lengths / max(lengths.mean(), 1.0))
+        n = len(documents)
+        self.postings = {}
+        for token, counts in postings.items():
+            ids = np.fromiter(counts.keys(), dtype=np.int64)
+            tfs = np.fromiter(counts.values(), dtype=np.float64)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            self.postings[token] = (ids, tfs, idf)
+
+    def search(self, query, top_k=5, min_ratio=0.0, **where):
+        """
+        Up to top_k (score, document) pairs with a positive score of at
+        least min_ratio times the best, best first. Keyword arguments keep
+        only documents whose metadata match; a list matches any of its values.
+        """
+        scores = np.zeros(len(self.documents))
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            ids, tfs, idf = posting
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self.norms[ids])
+
+        results = []
+        for doc_id in np.argsort(-scores, kind='stable'):
+            if scores[doc_id] <= 0 or len(results) >= top_k:
+                break
+            doc = self.documents[doc_id]
+            if all(doc.get(key) in (value if isinstance(value, list) else [value]) for key, value in where.items()):
+                results.append((float(scores[doc_id]), doc))
+        return [(score, doc) for score, doc in results if score >= min_ratio * results[0][0]]
+
+
+class BuildingNeighbours:
+    """
+    Nearest buildings in the reference CSV to a set of inputs.
+    """
+
+    def __init__(self, reference_csv='green_building.csv', rating_column='Green_Rating'):
+        frame = pd.read_csv(reference_csv)
+        self.features = [f for f in FEATURE_CONSTRAINTS if f in frame.columns]
+        self.values = frame[self.features].apply(pd.to_numeric, errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+        self.ratings = frame[rating_column].to_numpy()
+
+        self.center = np.median(self.values, axis=0)
+        low, high = np.quantile(self.values, [0.1, 0.9], axis=0)
+        spread = high - low
+        std = self.values.std(axis=0)
+        self.spread = np.where(spread > 0, spread, np.where(std > 0, std, 1.0))
+        self.normalized = (self.values - self.center) / self.spread
+
+    def _vector(self, inputs):
+        return np.array([float(inputs.get(f) or 0.0) for f in self.features])
+
+    def nearest(self, inputs, k=10, rating=None):
+        """
+        Row indices of the k nearest buildings, optionally only those with
+        the given rating.
+        """
+        query = (self._vector(inputs) - self.center) / self.spread
+        candidates = np.arange(len(self.values)) if rating is None else np.flatnonzero(self.ratings == rating)
+        if not len(candidates):
+            return candidates
+        distances = ((self.normalized[candidates] - query) ** 2).sum(axis=1)
+        k = min(k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        return candidates[nearest[np.argsort(distances[nearest])]]
+
+    def rating_mix(self, inputs, k=10):
+        """
+        How many of the k nearest buildings have each rating.
+        """
+        ratings, counts = np.unique(self.ratings[self.nearest(inputs, k)], return_counts=True)
+        return {int(r): int(c) for r, c in zip(ratings, counts)}
+
+    def compare(self, inputs, rating, k=10):
+        """
+        Per-feature gaps to the median of the k nearest buildings with the
+        given rating, in each feature's improving direction: a positive gap
+        means those buildings do better. Largest gaps first.
+        """
+        rows = self.nearest(inputs, k, rating)
+        if not len(rows):
+            return []
+        yours = self._vector(inputs)
+        medians = np.median(self.values[rows], axis=0)
+        gaps = []
+        for pos, feature in enumerate(self.features):
+            direction = FEATURE_CONSTRAINTS[feature]['direction']
+            gap = direction * (medians[pos] - yours[pos]) / self.spread[pos]
+            gaps.append({
+                'feature': feature,
+                'label': feature_label(feature),
+                'yours': float(yours[pos]),
+                'peer_median': float(medians[pos]),
+                'gap': round(float(gap), 3)
+            })
+        gaps.sort(key=lambda g: -g['gap'])
+        return gaps
+
+
+def build_documents(rating_explanations, section_content):
+    """
+    Guidance snippets from the offline assessment and section text, one
+    per rating paragraph or list item, plus one per feature.
+    """
+    documents = []
+    for rating, text in rating_explanations.items():
+        documents.append({'kind': 'assessment', 'rating': rating, 'text': ' '.join(text.split())})
+    for section, by_rating in section_content.items():
+        for rating, text in by_rating.items():
+            for line in text.split('\n'):
+                line = re.sub(r'^\d+\.\s*', '', line.strip())
+                if line:
+                    documents.append({'kind': 'section', 'section': section, 'rating': rating, 'text': line})
+    for feature, text in FEATURE_GUIDANCE.items():
+        documents.append({
+            'kind': 'feature', 'feature': feature, 'rating': None,
+            'text': f"{feature_label(feature)}. {text}"
+        })
+    return documents
+
+
+class RetrievalIndex:
+    """
+    Guidance search and building neighbours behind the offline answers.
+    """
+
+    def __init__(self, documents, neighbours, peers=10):
+        self.guidance = BM25Index(documents)
+        self.neighbours = neighbours
+        self.peers = peers
+
+    @classmethod
+    def build(cls, rating_explanations, section_content, reference_csv='green_building.csv', peers=10):
+        return cls(build_documents(rating_explanations, section_content), BuildingNeighbours(reference_csv), peers)
+
+    def stats(self):
+        return {
+            'enabled': True,
+            'documents': len(self.guidance.documents),
+            'terms': len(self.guidance.postings),
+            'buildings': len(self.neighbours.values)
+        }
+
+    def relevant_features(self, question, top_k=4):
+        """
+        Input features a question is about, best match first.
+        """
+        return [doc['feature'] for _, doc in self.guidance.search(question, top_k, MIN_SCORE_RATIO, kind='feature')]
+
+    def snippets(self, question, rating, top_k=3):
+        """
+        Guidance lines for a question, from the text written for this rating.
+        """
+        return [
+            doc['text'] for _, doc in self.guidance.search(question, top_k, MIN_SCORE_RATIO, kind='section', rating=rating)
+        ]
+
+    def peer_lines(self, inputs, target_rating, top_n=3, ahead=True):
+        """
+        Where similar buildings with target_rating do better than these
+        inputs (ahead=True) or worse (ahead=False), as plain-text lines.
+        """
+        gaps = self.neighbours.compare(inputs, target_rating, self.peers)
+        if not ahead:
+            gaps = [dict(g, gap=-g['gap']) for g in reversed(gaps)]
+        lines = []
+        for gap in gaps[:top_n]:
+            if gap['gap'] < MIN_PEER_GAP:
+                break
+            lines.append(
+                f"- {gap['label']}: yours is {format_value(gap['yours'])}, "
+                f"the median of similar {target_rating}-star buildings is {format_value(gap['peer_median'])}"
+            )
+        return lines
+
+    def peer_summary(self, inputs, rating, target_rating):
+        """
+        Comparison with similar buildings for the report sections: where
+        peers one star up are ahead, or, at the top rating, where this
+        building leads its peers.
+        """
+        if target_rating > rating:
+            lines = self.peer_lines(inputs, target_rating)
+            heading = f"Similar buildings in the dataset that reached {target_rating} stars do better on:"
+        else:
+            lines = self.peer_lines(inputs, rating, ahead=False)
+            heading = f"Compared with similar {rating}-star buildings in the dataset, this building leads on:"
+        return f"{heading}\n" + "\n".join(lines) if lines else None
+
+    def rating_summary(self, inputs):
+        mix = self.neighbours.rating_mix(inputs, self.peers)
+        parts = ', '.join(f"{count} rated {rating} stars" for rating, count in sorted(mix.items(), reverse=True))
+        return f"Of the {sum(mix.values())} most similar buildings in the dataset, {parts}."
+
+    def answer(self, question, inputs, rating):
+        """
+        Offline chat answer from the guidance snippets and similar
+        buildings, or None when nothing in the index matches the question.
+        """
+        features = self.relevant_features(question, top_k=3)
+        snippets = self.snippets(question, rating)
+        if not features and not snippets:
+            return None
+
+        lines = []
+        for feature in features:
+            value = inputs.get(feature)
+            note = FEATURE_GUIDANCE[feature]
+            if value is not None:
+                note = f"{note} Your building: {format_value(value)}."
+            lines.append(f"- {note}")
+        lines.extend(f"- {snippet}" for snippet in snippets)
+
+        target = min(rating + 1, int(self.neighbours.ratings.max()))
+        if features and target > rating:
+            gaps = {g['feature']: g for g in self.neighbours.compare(inputs, target, self.peers)}
+            for feature in features:
+                gap = gaps.get(feature)
+                if gap and gap['gap'] >= MIN_PEER_GAP:
+                    lines.append(
+                        f"- Similar buildings that reached {target} stars have a median {gap['label']} "
+                        f"of {format_value(gap['peer_median'])}, against your {format_value(gap['yours'])}."
+                    )
+        return "\n".join(lines)
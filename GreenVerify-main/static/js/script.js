@@ -176,28 +176,31 @@ async function getRecommendations() {
     }, 300);
     
     try {
-        const response = await fetch('/get_initial_assessment', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ session_id: currentSessionId })
-        });
+        assessmentContent.innerHTML = `
+            <div class="assessment-item">
+                <h3><i class="fas fa-lightbulb"></i> Why This Rating?</h3>
+                <div class="content" id="assessmentText"><span class="spinner"></span></div>
+            </div>
+        `;
+        const assessmentText = document.getElementById('assessmentText');
+        let partialText = '';
         
-        const data = await response.json();
+        // Stream the assessment so text appears as soon as GreenyBot starts writing
+        const data = await streamEvents('/get_initial_assessment', {
+            session_id: currentSessionId,
+            stream: true
+        }, chunk => {
+            partialText += chunk.text;
+            assessmentText.innerHTML = cleanMarkdownText(partialText);
+        });
         
-        if (data.success) {
-            const cleanedAssessment = cleanMarkdownText(data.assessment);
-            
-            assessmentContent.innerHTML = `
-                <div class="assessment-item">
-                    <h3><i class="fas fa-lightbulb"></i> Why This Rating?</h3>
-                    <div class="content">${cleanedAssessment}</div>
-                </div>
-            `;
+        if (data && data.text) {
+            assessmentText.innerHTML = cleanMarkdownText(data.text);
         } else {
             assessmentContent.innerHTML = `
                 <div class="assessment-item">
                     <h3><i class="fas fa-exclamation-triangle"></i> Assessment Error</h3>
-                    <div class="content">Unable to generate assessment. Please try again later.</div>
+                    <div class="content">${data && data.error ? data.error : 'Unable to generate assessment. Please try again later.'}</div>
                 </div>
             `;
         }
@@ -244,38 +247,7 @@ async function getSection(sectionType) {
         const data = await response.json();
         
         if (data.success) {
-            const sectionTitles = {
-                'strengths': 'Key Strengths',
-                'improvements': 'Areas for Improvement', 
-                'benefits': 'Benefits of Improvement',
-                'next_steps': 'Next Steps'
-            };
-            
-            const sectionIcons = {
-                'strengths': 'fas fa-trophy',
-                'improvements': 'fas fa-tools',
-                'benefits': 'fas fa-gem',
-                'next_steps': 'fas fa-route'
-            };
-            
-            const cleanedContent = cleanMarkdownText(data.content);
-            
-            // Add or update the section in assessment content
-            const assessmentContent = document.getElementById('assessmentContent');
-            const existingSection = document.getElementById(`section-${sectionType}`);
-            
-            const newSectionHTML = `
-                <div class="assessment-item fade-in" id="section-${sectionType}">
-                    <h3><i class="${sectionIcons[sectionType]}"></i> ${sectionTitles[sectionType]}</h3>
-                    <div class="content">${cleanedContent}</div>
-                </div>
-            `;
-            
-            if (existingSection) {
-                existingSection.outerHTML = newSectionHTML;
-            } else {
-                assessmentContent.innerHTML += newSectionHTML;
-            }
+            renderSection(sectionType, data.content);
             
             // Scroll to the new section
             setTimeout(() => {
@@ -301,6 +273,87 @@ async function getSection(sectionType) {
     });
 }
 
+// Add or update one report section in the assessment content
+function renderSection(sectionType, content) {
+    const sectionTitles = {
+        'strengths': 'Key Strengths',
+        'improvements': 'Areas for Improvement', 
+        'benefits': 'Benefits of Improvement',
+        'next_steps': 'Next Steps'
+    };
+    
+    const sectionIcons = {
+        'strengths': 'fas fa-trophy',
+        'improvements': 'fas fa-tools',
+        'benefits': 'fas fa-gem',
+        'next_steps': 'fas fa-route'
+    };
+    
+    const cleanedContent = cleanMarkdownText(content);
+    
+    const assessmentContent = document.getElementById('assessmentContent');
+    const existingSection = document.getElementById(`section-${sectionType}`);
+    
+    const newSectionHTML = `
+        <div class="assessment-item fade-in" id="section-${sectionType}">
+            <h3><i class="${sectionIcons[sectionType]}"></i> ${sectionTitles[sectionType]}</h3>
+            <div class="content">${cleanedContent}</div>
+        </div>
+    `;
+    
+    if (existingSection) {
+        existingSection.outerHTML = newSectionHTML;
+    } else {
+        assessmentContent.innerHTML += newSectionHTML;
+    }
+}
+
+// Get the assessment and every section in a single request
+async function getFullReport() {
+    if (!currentSessionId) {
+        showAlert('Please get a prediction first!', 'warning');
+        return;
+    }
+    
+    const buttons = document.querySelectorAll('.action-btn');
+    const clickedButton = event.target.closest('.action-btn');
+    const originalText = clickedButton.innerHTML;
+    
+    clickedButton.innerHTML = '<span class="spinner"></span> Loading...';
+    buttons.forEach(btn => btn.disabled = true);
+    
+    try {
+        const response = await fetch('/get_report', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ session_id: currentSessionId })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            const assessmentContent = document.getElementById('assessmentContent');
+            assessmentContent.innerHTML = `
+                <div class="assessment-item">
+                    <h3><i class="fas fa-lightbulb"></i> Why This Rating?</h3>
+                    <div class="content">${cleanMarkdownText(data.assessment)}</div>
+                </div>
+            `;
+            ['strengths', 'improvements', 'benefits', 'next_steps'].forEach(sectionType => {
+                renderSection(sectionType, data.sections[sectionType]);
+            });
+            assessmentContent.scrollIntoView({ behavior: 'smooth', block: 'start' });
+        } else {
+            showAlert('Failed to get the full report. Please try again.', 'error');
+        }
+    } catch (error) {
+        showAlert('Error getting the full report: ' + error.message, 'error');
+    }
+    
+    buttons.forEach(btn => btn.disabled = false);
+    clickedButton.innerHTML = originalText;
+}
+
 // Clean markdown text and format properly
 function cleanMarkdownText(text) {
     if (!text) return '';
@@ -371,25 +424,34 @@ async function sendChatMessage() {
     const typingId = addTypingIndicator();
     
     try {
-        const response = await fetch('/chat', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                session_id: currentSessionId,
-                question: question
-            })
-        });
+        let partialText = '';
+        let messageContent = null;
         
-        const data = await response.json();
+        // Stream the answer into a bot message as it is generated
+        const data = await streamEvents('/chat', {
+            session_id: currentSessionId,
+            question: question,
+            stream: true
+        }, chunk => {
+            partialText += chunk.text;
+            if (!messageContent) {
+                removeTypingIndicator(typingId);
+                messageContent = addBotMessage("GreenyBot", '');
+            }
+            messageContent.innerHTML = `<strong>GreenyBot</strong>${cleanMarkdownText(partialText)}`;
+        });
         
-        // Remove typing indicator
         removeTypingIndicator(typingId);
         
-        if (data.success) {
+        if (data && data.response !== undefined) {
             const cleanedResponse = cleanMarkdownText(data.response);
-            addBotMessage("GreenyBot", cleanedResponse);
+            if (messageContent) {
+                messageContent.innerHTML = `<strong>GreenyBot</strong>${cleanedResponse}`;
+            } else {
+                addBotMessage("GreenyBot", cleanedResponse);
+            }
         } else {
-            addBotMessage("Error", data.error || "Sorry, I couldn't process your question.");
+            addBotMessage("Error", (data && data.error) || "Sorry, I couldn't process your question.");
         }
     } catch (error) {
         removeTypingIndicator(typingId);
@@ -397,6 +459,56 @@ async function sendChatMessage() {
     }
 }
 
+// POST a JSON body to a streaming endpoint and read its server-sent events.
+// Calls onChunk for each partial event and resolves with the final 'done'
+// payload, or with the JSON body when the server answers without streaming.
+async function streamEvents(url, body, onChunk) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    });
+    
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!contentType.includes('text/event-stream')) {
+        return await response.json();
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let eventName = 'message';
+            let payload = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) eventName = line.slice(7);
+                if (line.startsWith('data: ')) payload += line.slice(6);
+            });
+            if (!payload) continue;
+            
+            const data = JSON.parse(payload);
+            if (eventName === 'done') {
+                result = data;
+            } else {
+                onChunk(data);
+            }
+        }
+    }
+    
+    return result;
+}
+
 function addUserMessage(message) {
     const messagesContainer = document.getElementById('chatbotMessages');
     const messageDiv = document.createElement('div');
@@ -433,6 +545,8 @@ function addBotMessage(title, content) {
     
     messagesContainer.appendChild(messageDiv);
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    
+    return messageDiv.querySelector('.message-content');
 }
 
 function addTypingIndicator() {
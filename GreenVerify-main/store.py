@@ -0,0 +1,346 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+
+
+def json_default(value):
+    """
+    Serialize the NumPy values that end up in session data.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_value(value):
+    return json.dumps(value, default=json_default, separators=(',', ':'))
+
+
+class KeyValueStore(ABC):
+    """
+    Bounded key/value store with LRU + TTL eviction, memory accounting and
+    hit/miss stats. Values must be JSON serializable; call set() again
+    after changing a value so every backend sees the update.
+    """
+
+    backend = 'base'
+
+    def __init__(self, max_entries=10000, max_bytes=None, ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expiry(self, now):
+        return now + self.ttl if self.ttl else None
+
+    @abstractmethod
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key, value):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def size_bytes(self):
+        raise NotImplementedError
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'entries': len(self),
+            'bytes': self.size_bytes(),
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class MemoryStore(KeyValueStore):
+    """
+    In-process store backed by an OrderedDict kept in LRU order.
+    """
+
+    backend = 'memory'
+    purge_interval = 256
+
+    def __init__(self, max_entries=10000, max_bytes=None, ttl=3600):
+        super().__init__(max_entries, max_bytes, ttl)
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def _purge_expired(self, now):
+        expired = [k for k, (_, _, exp) in self._data.items() if exp is not None and exp <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, _, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = len(encode_value(value))
+        now = time.time()
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, self._expiry(now))
+            self._bytes += size
+
+            self._writes += 1
+            if self._writes % self.purge_interval == 0:
+                self._purge_expired(now)
+
+            # Evict least recently used entries until within bounds
+            while len(self._data) > 1 and (
+                (self.max_entries and len(self._data) > self.max_entries)
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def size_bytes(self):
+        return self._bytes
+
+
+class SQLiteStore(KeyValueStore):
+    """
+    Store shared by every worker on the host through a SQLite file, so a
+    session created by one gunicorn worker can be read by another.
+    Hit/miss stats are counted per worker. The entry count and byte total
+    live in a one-row meta table kept current by triggers, so checking
+    the limits on a write never scans the table.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path, table='store', max_entries=10000, max_bytes=None, ttl=3600):
+        super().__init__(max_entries, max_bytes, ttl)
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self):
+        """
+        One connection per thread and per process, reopened after fork.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.table}" ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+            'expires_at REAL, accessed_at REAL NOT NULL)'
+        )
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS "{self.table}_accessed" ON "{self.table}" (accessed_at)'
+        )
+        conn.execute(
+            f'CREATE INDEX IF NOT EXISTS "{self.table}_expires" ON "{self.table}" (expires_at)'
+        )
+        self._create_totals(conn)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _create_totals(self, conn):
+        """
+        Meta row with the running entry count and byte total, seeded from
+        the table once and then updated by triggers in the same transaction
+        as every insert, update and delete.
+        """
+        meta = f'{self.table}_meta'
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{meta}" ('
+                'id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)'
+            )
+            conn.execute(
+                f'INSERT OR IGNORE INTO "{meta}" (id, entries, bytes) '
+                f'SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM "{self.table}"'
+            )
+            conn.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{self.table}_insert" AFTER INSERT ON "{self.table}" BEGIN '
+                f'UPDATE "{meta}" SET entries = entries + 1, bytes = bytes + new.size WHERE id = 1; END'
+            )
+            conn.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{self.table}_delete" AFTER DELETE ON "{self.table}" BEGIN '
+                f'UPDATE "{meta}" SET entries = entries - 1, bytes = bytes - old.size WHERE id = 1; END'
+            )
+            conn.execute(
+                f'CREATE TRIGGER IF NOT EXISTS "{self.table}_update" AFTER UPDATE OF size ON "{self.table}" BEGIN '
+                f'UPDATE "{meta}" SET bytes = bytes + new.size - old.size WHERE id = 1; END'
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _totals(self, conn=None):
+        conn = conn or self._connect()
+        return conn.execute(f'SELECT entries, bytes FROM "{self.table}_meta" WHERE id = 1').fetchone()
+
+    def get(self, key, default=None):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            f'SELECT value, expires_at FROM "{self.table}" WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            conn.execute(f'DELETE FROM "{self.table}" WHERE key = ?', (key,))
+            self.expirations += 1
+            self.misses += 1
+            return default
+        conn.execute(f'UPDATE "{self.table}" SET accessed_at = ? WHERE key = ?', (now, key))
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        conn = self._connect()
+        encoded = encode_value(value)
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # An upsert rather than INSERT OR REPLACE, whose implicit
+            # delete would not fire the totals trigger
+            conn.execute(
+                f'INSERT INTO "{self.table}" (key, value, size, expires_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET '
+                'value = excluded.value, size = excluded.size, '
+                'expires_at = excluded.expires_at, accessed_at = excluded.accessed_at',
+                (key, encoded, len(encoded), self._expiry(now), now)
+            )
+            cursor = conn.execute(
+                f'DELETE FROM "{self.table}" WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,)
+            )
+            self.expirations += max(cursor.rowcount, 0)
+            self._evict(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _evict(self, conn):
+        """
+        Drop least recently accessed rows until within bounds. Only the
+        evicted rows are read, oldest first through the accessed_at index.
+        """
+        count, total = self._totals(conn)
+        if self.max_entries and count > self.max_entries:
+            excess = count - self.max_entries
+            conn.execute(
+                f'DELETE FROM "{self.table}" WHERE key IN ('
+                f'SELECT key FROM "{self.table}" ORDER BY accessed_at LIMIT ?)', (excess,)
+            )
+            self.evictions += excess
+            count, total = self._totals(conn)
+        if self.max_bytes and total > self.max_bytes:
+            stale = []
+            # Keep at least the most recent entry, like the memory store
+            for key, size in conn.execute(
+                f'SELECT key, size FROM "{self.table}" ORDER BY accessed_at LIMIT ?', (count - 1,)
+            ):
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            conn.executemany(f'DELETE FROM "{self.table}" WHERE key = ?', stale)
+            self.evictions += len(stale)
+
+    def delete(self, key):
+        self._connect().execute(f'DELETE FROM "{self.table}" WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connect().execute(f'DELETE FROM "{self.table}"')
+
+    def __len__(self):
+        return self._totals()[0]
+
+    def size_bytes(self, conn=None):
+        return self._totals(conn)[1]
+
+
+def create_store(backend='memory', path=None, table='store', max_entries=10000, max_bytes=None, ttl=3600):
+    """
+    Build a store for the configured backend: 'memory' or 'sqlite'.
+    """
+    if backend == 'sqlite':
+        return SQLiteStore(path or 'greenverify.db', table, max_entries, max_bytes, ttl)
+    if backend != 'memory':
+        print(f"Warning: unknown store backend '{backend}', using memory")
+    return MemoryStore(max_entries, max_bytes, ttl)
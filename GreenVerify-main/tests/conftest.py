@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from artifact import load_trained_model  # noqa: E402
+from model_registry import ModelBundle  # noqa: E402
+
+REFERENCE_CSV = os.path.join(ROOT, 'green_building.csv')
+
+
+@pytest.fixture(scope='session')
+def bundle():
+    models_dir = os.path.join(ROOT, 'models')
+    model, feature_names, label_encoders, scaler, reverse_mapping = load_trained_model(models_dir)
+    if model is None:
+        pytest.skip(f"Model not available: {reverse_mapping}")
+    return ModelBundle(model, feature_names, label_encoders, scaler, reverse_mapping, 'test', models_dir)
@@ -0,0 +1,128 @@
+"""
+Concurrent /predict calls coalesced by the MicroBatcher get the same
+answers as scoring each row on its own.
+"""
+import threading
+import time
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batcher import MicroBatcher
+from conftest import REFERENCE_CSV
+from inference import score
+
+
+@pytest.fixture(scope='module')
+def rows(bundle):
+    frame = pd.read_csv(REFERENCE_CSV).head(200)
+    return [
+        bundle.layout.encode_row({f: max(0.0, float(row[f])) for f in bundle.feature_names})
+        for row in frame.to_dict('records')
+    ]
+
+
+def score_concurrently(batcher, bundle, rows):
+    """
+    Score every row from its own thread, all released at once. Returns the
+    results in row order and the exceptions raised.
+    """
+    results = [None] * len(rows)
+    errors = []
+    start = threading.Barrier(len(rows))
+
+    def worker(i):
+        start.wait()
+        try:
+            results[i] = batcher.score(bundle, rows[i])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_many_threads_get_their_own_rows(bundle, rows):
+    batcher = MicroBatcher(window_ms=20, max_rows=32)
+    results, errors = score_concurrently(batcher, bundle, rows)
+    assert errors == []
+
+    for row, (probs, index) in zip(rows, results):
+        expected_probs, expected_indices = score(bundle.booster, row)
+        np.testing.assert_allclose(probs, expected_probs[0], rtol=1e-6, atol=1e-7)
+        assert index == int(expected_indices[0])
+
+    stats = batcher.stats()
+    assert stats['rows'] == len(rows)
+    # Rows were coalesced, and no batch went over max_rows
+    assert stats['batches'] < len(rows)
+    assert stats['batch_size_histogram']['>128'] == 0
+    assert stats['batch_size_histogram']['<=64'] == 0
+
+
+def test_full_batch_runs_without_waiting_for_the_window(bundle, rows):
+    batcher = MicroBatcher(window_ms=5000, max_rows=4)
+    start = time.perf_counter()
+    results, errors = score_concurrently(batcher, bundle, rows[:8])
+    assert time.perf_counter() - start < 2.5
+    assert errors == []
+    assert all(result is not None for result in results)
+    stats = batcher.stats()
+    assert stats['batches'] == 2
+    assert stats['full_batches'] == 2
+
+
+def test_lone_request_waits_out_the_window(bundle, rows):
+    batcher = MicroBatcher(window_ms=50, max_rows=32)
+    start = time.perf_counter()
+    probs, index = batcher.score(bundle, rows[0])
+    assert time.perf_counter() - start >= 0.045
+    assert index == int(score(bundle.booster, rows[0])[1][0])
+    assert batcher.stats()['batch_size_histogram']['<=1'] == 1
+
+
+class CountingBooster:
+    """
+    Wraps a booster and counts the rows it is asked to score.
+    """
+
+    def __init__(self, booster):
+        self.booster = booster
+        self.rows = 0
+
+    def inplace_predict(self, matrix, **kwargs):
+        self.rows += len(matrix)
+        return self.booster.inplace_predict(matrix, **kwargs)
+
+
+def test_bundles_are_never_mixed_in_one_batch(bundle, rows):
+    bundles = [types.SimpleNamespace(booster=CountingBooster(bundle.booster)) for _ in range(2)]
+    batcher = MicroBatcher(window_ms=20, max_rows=32)
+    results = {}
+
+    def worker(target, i):
+        results[(id(target), i)] = batcher.score(target, rows[i])
+
+    threads = [threading.Thread(target=worker, args=(b, i)) for i in range(8) for b in bundles]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 16
+    assert [b.booster.rows for b in bundles] == [8, 8]
+    for (_, i), (_, index) in results.items():
+        assert index == int(score(bundle.booster, rows[i])[1][0])
+
+
+def test_scoring_error_reaches_every_caller(rows):
+    broken = types.SimpleNamespace(booster=None)
+    batcher = MicroBatcher(window_ms=20, max_rows=32)
+    results, errors = score_concurrently(batcher, broken, rows[:10])
+    assert results == [None] * 10
+    assert len(errors) == 10
@@ -0,0 +1,99 @@
+"""
+Conversation memory stays within its token budgets however long the
+conversation runs.
+"""
+from conversation import ConversationMemory, new_state, parse_structured_response, partial_json_string
+from prompts import estimate_tokens
+
+
+def turn_tokens(memory, state):
+    return sum(estimate_tokens(memory._turn_text(t)) for t in state['turns'])
+
+
+def test_first_turn_is_kept_verbatim():
+    memory = ConversationMemory(turn_budget=400, summary_budget=150)
+    state = memory.record(new_state(), 'How do I save water?', 'Fit low-flow fixtures. They cut use by a third.')
+    assert state['turns'] == [{'question': 'How do I save water?', 'answer': 'Fit low-flow fixtures. They cut use by a third.'}]
+    assert state['summary'] == []
+    assert state['turn_count'] == 1
+    assert 'User: How do I save water?' in memory.render(state)
+
+
+def test_record_does_not_change_the_old_state():
+    memory = ConversationMemory()
+    state = new_state()
+    memory.record(state, 'q', 'a')
+    assert state == new_state()
+
+
+def test_history_stays_within_budget():
+    memory = ConversationMemory(turn_budget=100, summary_budget=60)
+    state = new_state()
+    for i in range(50):
+        state = memory.record(state, f'Question {i} about solar panels?', f'Answer {i} first sentence. ' + 'More detail. ' * 10)
+        assert turn_tokens(memory, state) <= memory.turn_budget
+        assert estimate_tokens('\n'.join(state['summary'])) <= memory.summary_budget
+    assert state['turn_count'] == 50
+    assert state['turns'][-1]['question'] == 'Question 49 about solar panels?'
+    # Older turns are compacted into summary lines, oldest dropped first
+    assert state['summary']
+    assert 'Question 0 ' not in '\n'.join(state['summary'])
+    assert state['summary'][-1].startswith('- Asked: Question')
+
+
+def test_compacted_turn_keeps_question_and_first_sentence():
+    line = ConversationMemory.compact({'question': 'What is EPI?', 'answer': 'Energy use per square metre. Lower is better.'})
+    assert line == '- Asked: What is EPI? Answered: Energy use per square metre.'
+
+
+def test_single_oversized_turn_is_cut_to_budget():
+    memory = ConversationMemory(turn_budget=50, summary_budget=50)
+    state = memory.record(new_state(), 'Tell me everything', 'word ' * 500)
+    assert len(state['turns']) == 1
+    assert state['turns'][0]['answer'].endswith('...')
+    assert turn_tokens(memory, state) <= memory.turn_budget
+
+
+def test_render_is_empty_before_the_first_turn():
+    assert ConversationMemory().render(new_state()) == ''
+
+
+def test_parse_structured_response():
+    text = '```json\n{"answer": "Use solar.", "follow_up_questions": ["How much?", 3, " "]}\n```'
+    assert parse_structured_response(text) == ('Use solar.', ['How much?'])
+    assert parse_structured_response('Plain text answer') is None
+    assert parse_structured_response('{"follow_up_questions": []}') is None
+
+
+def test_partial_json_string_decodes_streamed_prefix():
+    assert partial_json_string('{"answer": "Line one\\nLi', 'answer') == 'Line one\nLi'
+    # An escape that has not fully arrived is held back
+    assert partial_json_string('{"answer": "caf\\u00', 'answer') == 'caf'
+    assert partial_json_string('{"follow', 'answer') == ''
+
+
+def test_render_to_fit_drops_oldest_history_first():
+    memory = ConversationMemory(turn_budget=100, summary_budget=60)
+    state = new_state()
+    for i in range(10):
+        state = memory.record(state, f'Question {i}?', f'Answer {i}. ' + 'Detail. ' * 8)
+    full = memory.render(state)
+    assert state['summary'] and len(state['turns']) > 1
+
+    fitted = memory.render(state, estimate_tokens(full) - 10)
+    assert estimate_tokens(fitted) <= estimate_tokens(full) - 10
+    # The oldest summary line goes before anything else
+    assert state['summary'][0] not in fitted
+    assert memory._turn_text(state['turns'][-1]) in fitted
+
+    latest = state['turns'][-1]
+    only_latest = memory.render({**state, 'summary': [], 'turns': [latest]})
+    fitted = memory.render(state, estimate_tokens(only_latest))
+    assert fitted == only_latest
+
+    cut = memory.render(state, estimate_tokens(only_latest) - 5)
+    assert 'User: Question 9?' in cut
+    assert cut.rstrip().endswith('...')
+    assert estimate_tokens(cut) <= estimate_tokens(only_latest) - 5
+    assert memory.render(state, 1) == ''
+    assert memory.render(state, None) == full
@@ -0,0 +1,148 @@
+"""
+Input drift against a small reference CSV: PSI, the sliding window and
+the data-quality counters.
+"""
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from drift import DriftMonitor, psi
+from inference import FeatureLayout, preprocess_batch
+
+FEATURES = ['area', 'zone']
+ZONES = ['east', 'north', 'south']
+
+
+@pytest.fixture(scope='module')
+def reference(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        'area': rng.uniform(0, 100, 2000).round(2),
+        'zone': rng.choice(ZONES, 2000),
+        'rating': rng.integers(1, 6, 2000)
+    })
+    path = tmp_path_factory.mktemp('drift') / 'reference.csv'
+    frame.to_csv(path, index=False)
+    return str(path), frame
+
+
+@pytest.fixture(scope='module')
+def layout():
+    return FeatureLayout(FEATURES, {'zone': LabelEncoder().fit(ZONES)}, object())
+
+
+@pytest.fixture
+def monitor(reference):
+    return DriftMonitor(reference[0], FEATURES, categorical=['zone'], bins=10, window=100, min_rows=50)
+
+
+def observe_rows(monitor, layout, frame):
+    for row in frame.to_dict('records'):
+        monitor.observe({'area': max(0.0, float(row['area'])), 'zone': row['zone']}, layout)
+
+
+def batch_of(frame):
+    return frame[FEATURES].astype(str)
+
+
+def observe_batch(monitor, layout, batch_df):
+    bundle = types.SimpleNamespace(feature_names=FEATURES, layout=layout)
+    _, zero_mask, invalid_mask, _ = preprocess_batch(bundle, batch_df)
+    monitor.observe_batch(batch_df, layout, zero_mask, invalid_mask)
+
+
+def test_psi_is_zero_for_identical_distributions():
+    assert psi(np.array([0.25, 0.75]), np.array([0.25, 0.75])) == 0.0
+    assert psi(np.array([0.9, 0.1]), np.array([0.1, 0.9])) > 1
+
+
+def test_warming_up_until_min_rows(monitor, layout, reference):
+    observe_rows(monitor, layout, reference[1].head(49))
+    stats = monitor.stats()
+    assert stats['window_rows'] == 49
+    assert stats['max_psi'] is None
+    assert stats['status'] == 'warming_up'
+
+
+def test_reference_traffic_is_stable(monitor, layout, reference):
+    observe_batch(monitor, layout, batch_of(reference[1].sample(150, random_state=1)))
+    stats = monitor.stats()
+    assert stats['status'] == 'stable'
+    assert stats['max_psi'] < 0.1
+
+
+def test_shifted_feature_is_flagged(monitor, layout, reference):
+    shifted = reference[1].sample(150, random_state=2)
+    shifted['area'] = shifted['area'] / 10 + 90
+    observe_batch(monitor, layout, batch_of(shifted))
+    stats = monitor.stats()
+    assert stats['status'] == 'significant'
+    assert stats['top_drift'][0]['feature'] == 'area'
+    assert dict(monitor.psi_samples())[('zone',)] < 0.1
+
+
+def test_window_forgets_old_traffic(monitor, layout, reference):
+    shifted = reference[1].sample(150, random_state=3)
+    shifted['area'] = 99.0
+    observe_rows(monitor, layout, shifted)
+    assert monitor.stats()['status'] == 'significant'
+
+    # 250 more rows rotate the two 100-row tables past every shifted row
+    observe_rows(monitor, layout, reference[1].sample(250, random_state=4))
+    stats = monitor.stats()
+    assert stats['window_rows'] == 100
+    assert stats['rows']['predict'] == 400
+    assert stats['status'] == 'stable'
+
+
+def test_batch_and_single_rows_fill_the_same_bins(reference, layout):
+    rows = reference[1].sample(80, random_state=5)
+    single = DriftMonitor(reference[0], FEATURES, categorical=['zone'], window=1000)
+    batch = DriftMonitor(reference[0], FEATURES, categorical=['zone'], window=1000)
+    observe_rows(single, layout, rows)
+    observe_batch(batch, layout, batch_of(rows))
+    np.testing.assert_array_equal(single._current, batch._current)
+    assert single.drift() == batch.drift()
+
+
+def test_single_row_issue_counters(monitor, layout):
+    monitor.observe({'area': 0.0, 'zone': 'north'}, layout, clamped=['area'])
+    monitor.observe({'area': 10.0, 'zone': 'mars'}, layout)
+    monitor.observe({'area': 0.0, 'zone': None}, layout, all_zero=True)
+    monitor.observe_invalid('area')
+
+    stats = monitor.stats()
+    assert stats['rows'] == {'predict': 4, 'batch': 0}
+    # The all-zero and invalid rows are left out of the histograms
+    assert stats['window_rows'] == 2
+    assert stats['issue_rates'] == {
+        'clamped_negative': 0.25, 'unseen_category': 0.25, 'invalid': 0.25, 'all_zero': 0.25
+    }
+    assert stats['issues_by_feature'] == {
+        'clamped_negative': {'area': 1}, 'unseen_category': {'zone': 1}, 'invalid': {'area': 1}
+    }
+    assert monitor.issue_value_samples() == {
+        ('clamped_negative', 'area'): 1, ('unseen_category', 'zone'): 1, ('invalid', 'area'): 1
+    }
+
+
+def test_batch_issue_counters(monitor, layout):
+    batch_df = pd.DataFrame({
+        'area': ['-5', 'abc', '0', '12', '30'],
+        'zone': ['north', 'south', None, 'mars', 'east']
+    })
+    observe_batch(monitor, layout, batch_df)
+
+    stats = monitor.stats()
+    assert stats['rows'] == {'predict': 0, 'batch': 5}
+    assert monitor.issue_row_samples() == {
+        ('clamped_negative',): 1, ('unseen_category',): 1, ('invalid',): 1, ('all_zero',): 1
+    }
+    assert stats['issues_by_feature'] == {
+        'clamped_negative': {'area': 1}, 'unseen_category': {'zone': 1}, 'invalid': {'area': 1}
+    }
+    # Scored rows only: the clamped, unseen and clean rows
+    assert stats['window_rows'] == 3
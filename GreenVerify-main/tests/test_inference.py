@@ -0,0 +1,150 @@
+"""
+The NumPy scoring paths must give the same answers as the original
+DataFrame path: label encoders, scaler.transform, then predict_proba and
+predict on the sklearn model.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from conftest import REFERENCE_CSV
+from inference import FeatureLayout, preprocess_batch, score
+from model_registry import ModelBundle
+
+
+def parse_form(feature_names, label_encoders, form):
+    inputs = {}
+    for feature in feature_names:
+        value = form.get(feature)
+        if feature in label_encoders:
+            inputs[feature] = value
+        else:
+            num_value = float(value) if value else 0.0
+            inputs[feature] = max(0.0, num_value)
+    return inputs
+
+
+def dataframe_predict(bundle, inputs):
+    """
+    The original /predict path, or None for a building that is not certified.
+    """
+    input_df = pd.DataFrame({feature: [inputs[feature]] for feature in bundle.feature_names})
+    if input_df.replace(0, np.nan).dropna(axis=1, how='all').empty:
+        return None
+    for col, encoder in bundle.label_encoders.items():
+        if col in input_df.columns:
+            try:
+                input_df[col] = encoder.transform(input_df[col])
+            except ValueError:
+                input_df[col] = 0
+    numeric = [f for f in bundle.feature_names if f not in bundle.label_encoders]
+    if numeric:
+        input_df[numeric] = bundle.scaler.transform(input_df[numeric])
+    return bundle.model.predict_proba(input_df)[0], int(bundle.model.predict(input_df)[0])
+
+
+def numpy_predict(bundle, inputs):
+    if bundle.layout.is_all_zero(inputs):
+        return None
+    probs, indices = score(bundle.booster, bundle.layout.encode_row(inputs))
+    return probs[0], int(indices[0])
+
+
+def assert_same(expected, actual):
+    if expected is None:
+        assert actual is None
+        return
+    np.testing.assert_allclose(actual[0], expected[0], rtol=1e-6, atol=1e-7)
+    assert actual[1] == expected[1]
+
+
+@pytest.fixture(scope='module')
+def forms(bundle):
+    frame = pd.read_csv(REFERENCE_CSV, dtype=str)
+    rows = [{f: row[f] for f in bundle.feature_names} for _, row in frame.iloc[::10].iterrows()]
+    first = rows[0]
+    rows += [
+        {f: '0' for f in bundle.feature_names},
+        {f: '' for f in bundle.feature_names},
+        {**{f: '0' for f in bundle.feature_names}, bundle.feature_names[3]: '-5'},
+        {**first, bundle.feature_names[0]: '-12.5'},
+        {**first, bundle.feature_names[1]: ''},
+    ]
+    return rows
+
+
+def test_single_row_matches_dataframe_path(bundle, forms):
+    for form in forms:
+        inputs = parse_form(bundle.feature_names, bundle.label_encoders, form)
+        assert_same(dataframe_predict(bundle, inputs), numpy_predict(bundle, inputs))
+
+
+def test_batch_matches_dataframe_path(bundle, forms):
+    batch = pd.DataFrame(forms + [{**forms[0], bundle.feature_names[2]: 'abc'}])
+    features, zero_mask, invalid_mask, _ = preprocess_batch(bundle, batch)
+
+    expected_invalid = np.zeros(len(batch), dtype=bool)
+    expected_invalid[-1] = True
+    np.testing.assert_array_equal(invalid_mask, expected_invalid)
+
+    scored = ~(zero_mask | invalid_mask)
+    probs, indices = score(bundle.booster, features[scored])
+    results = iter(zip(probs, indices))
+    for row, form in enumerate(forms):
+        expected = dataframe_predict(bundle, parse_form(bundle.feature_names, bundle.label_encoders, form))
+        assert zero_mask[row] == (expected is None)
+        if expected is not None:
+            assert_same(expected, next(results))
+
+
+def test_output_margin_gives_the_same_labels(bundle, forms):
+    batch = pd.DataFrame(forms)
+    features, zero_mask, invalid_mask, _ = preprocess_batch(bundle, batch)
+    matrix = features[~(zero_mask | invalid_mask)]
+    probs, indices = score(bundle.booster, matrix)
+    margin_probs, margin_indices = score(bundle.booster, matrix, output_margin=True)
+    np.testing.assert_array_equal(margin_indices, indices)
+    np.testing.assert_allclose(margin_probs, probs, rtol=1e-5, atol=1e-6)
+
+
+@pytest.fixture(scope='module')
+def categorical_bundle():
+    """
+    A small model with one categorical feature, since the shipped model
+    has none.
+    """
+    rng = np.random.default_rng(0)
+    n = 300
+    frame = pd.DataFrame({
+        'area': rng.uniform(0, 100, n),
+        'zone': rng.choice(['north', 'south', 'east'], n),
+        'rating': rng.uniform(0, 5, n)
+    })
+    encoder = LabelEncoder().fit(frame['zone'])
+    scaler = StandardScaler().fit(frame[['area', 'rating']])
+    encoded = frame.copy()
+    encoded['zone'] = encoder.transform(frame['zone'])
+    encoded[['area', 'rating']] = scaler.transform(frame[['area', 'rating']])
+    labels = (frame['area'] > 50).astype(int) + (frame['zone'] == 'south').astype(int)
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3).fit(encoded, labels)
+    return ModelBundle(model, ['area', 'zone', 'rating'], {'zone': encoder}, scaler, {0: 1, 1: 2, 2: 3}, 'cat', 'test')
+
+
+def test_unseen_category_encodes_as_zero(categorical_bundle):
+    bundle = categorical_bundle
+    for form in [
+        {'area': '70', 'zone': 'south', 'rating': '3'},
+        {'area': '70', 'zone': 'mars', 'rating': '3'},
+        {'area': '-4', 'zone': 'east', 'rating': '1'},
+        {'area': '0', 'zone': None, 'rating': '0'},
+    ]:
+        inputs = parse_form(bundle.feature_names, bundle.label_encoders, form)
+        assert_same(dataframe_predict(bundle, inputs), numpy_predict(bundle, inputs))
+
+
+def test_layout_without_scaler_stats_passes_values_through():
+    layout = FeatureLayout(['a', 'b'], {}, object())
+    row = layout.encode_row({'a': 2.0, 'b': 3.5})
+    np.testing.assert_array_equal(row, [[2.0, 3.5]])
@@ -0,0 +1,130 @@
+"""
+LRU, size and TTL eviction for both session store backends.
+"""
+import pytest
+
+import store
+from store import KeyValueStore, MemoryStore, SQLiteStore
+
+
+class Clock:
+    """
+    Fake time.time that moves forward a millisecond per call, so LRU
+    order never depends on two writes landing in the same instant.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(store.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path, clock):
+    def make(**limits):
+        if request.param == 'memory':
+            return MemoryStore(**limits)
+        return SQLiteStore(str(tmp_path / 'store.db'), 'test', **limits)
+    return make
+
+
+def test_get_set_delete(make_store):
+    s = make_store(ttl=0)
+    s.set('a', {'inputs': [1, 2]})
+    assert s.get('a') == {'inputs': [1, 2]}
+    assert 'a' in s
+    s.delete('a')
+    assert s.get('a') is None
+    assert s.get('a', 'default') == 'default'
+
+
+def test_evicts_least_recently_used_entry(make_store):
+    s = make_store(max_entries=3, ttl=0)
+    for key in 'abc':
+        s.set(key, key)
+    s.get('a')
+    s.set('d', 'd')
+    assert s.get('b') is None
+    assert [s.get(key) for key in 'acd'] == ['a', 'c', 'd']
+    assert len(s) == 3
+    assert s.stats()['evictions'] == 1
+
+
+def test_evicts_oldest_entries_over_byte_limit(make_store):
+    s = make_store(max_bytes=30, ttl=0)
+    for key in 'abcd':
+        s.set(key, 'x' * 8)  # 10 bytes encoded
+    assert s.size_bytes() <= 30
+    assert s.get('a') is None
+    assert s.get('d') == 'x' * 8
+
+
+def test_keeps_newest_entry_even_over_byte_limit(make_store):
+    s = make_store(max_bytes=10, ttl=0)
+    s.set('small', 'x')
+    s.set('big', 'x' * 100)
+    assert s.get('small') is None
+    assert s.get('big') == 'x' * 100
+    assert len(s) == 1
+
+
+def test_entries_expire_after_ttl(make_store, clock):
+    s = make_store(ttl=60)
+    s.set('a', 1)
+    clock.now += 30
+    assert s.get('a') == 1
+    clock.now += 31
+    assert s.get('a') is None
+    assert s.stats()['expirations'] == 1
+
+
+def test_overwrite_updates_size_and_count(make_store):
+    s = make_store(ttl=0)
+    s.set('a', 'x' * 10)
+    s.set('a', 'x')
+    assert len(s) == 1
+    assert s.size_bytes() == len('"x"')
+    s.clear()
+    assert len(s) == 0
+    assert s.size_bytes() == 0
+
+
+def test_sqlite_totals_match_table(tmp_path, clock):
+    s = SQLiteStore(str(tmp_path / 'store.db'), 'test', max_entries=50, max_bytes=2000, ttl=5)
+    for i in range(500):
+        s.set(f'k{i % 80}', 'v' * (i % 37))
+        if i % 7 == 0:
+            s.delete(f'k{(i * 3) % 80}')
+        if i % 50 == 0:
+            clock.now += 3
+    conn = s._connect()
+    count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM "test"').fetchone()
+    assert (len(s), s.size_bytes()) == (count, total)
+    assert count <= 50 and total <= 2000
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / 'store.db')
+    writer = SQLiteStore(path, 'sessions', ttl=0)
+    reader = SQLiteStore(path, 'sessions', ttl=0)
+    writer.set('session', {'prediction': 4})
+    assert reader.get('session') == {'prediction': 4}
+    assert len(reader) == 1
+
+
+def test_incomplete_backend_fails_when_created():
+    class GetOnlyStore(KeyValueStore):
+        def get(self, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        GetOnlyStore()
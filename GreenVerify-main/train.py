@@ -0,0 +1,342 @@
+"""
+Retrain the Green Verify model from a CSV and write artifacts that
+load_trained_model can serve.
+
+The CSV is read in chunks, so the encoders and scaler never need the raw
+frame in memory. Cross-validation and the hyperparameter search run as
+independent single-threaded fits spread over a process pool, and the final
+model is fit with every core. Run from the GreenVerify-main directory:
+    python train.py --csv green_building.csv
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from joblib import Parallel, delayed
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from artifact import BUNDLE_FILENAME, write_bundle
+
+TARGET = 'Green_Rating'
+
+# Settings of the model that shipped in models/
+DEFAULT_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 6,
+    'learning_rate': 0.3
+}
+
+DEFAULT_GRID = {
+    'n_estimators': [200],
+    'max_depth': [4, 6, 8],
+    'learning_rate': [0.1, 0.3]
+}
+
+
+class StageTimer:
+    """
+    Records wall time for each named training stage.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, name):
+        return _Stage(self, name)
+
+    def report(self):
+        total = sum(self.stages.values())
+        lines = [f"{name:<20} {seconds:8.2f}s" for name, seconds in self.stages.items()]
+        lines.append(f"{'total':<20} {total:8.2f}s")
+        return '\n'.join(lines)
+
+
+class _Stage:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        print(f"[{self.name}] ...")
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.timer.stages[self.name] = seconds
+        print(f"[{self.name}] done in {seconds:.2f}s")
+
+
+def read_training_data(csv_path, chunksize=100_000):
+    """
+    Stream the CSV in chunks and build the feature matrix, labels, label
+    encoders and a scaler fit with partial_fit. Categorical codes are
+    assigned as values appear and remapped to LabelEncoder's sorted order
+    at the end, so each chunk is encoded exactly once.
+    """
+    feature_names = None
+    categorical = []
+    vocab = {}
+    scaler = StandardScaler()
+    blocks = []
+    labels = []
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        chunk = chunk.dropna(subset=[TARGET])
+        if feature_names is None:
+            feature_names = [c for c in chunk.columns if c != TARGET]
+            categorical = [f for f in feature_names if not pd.api.types.is_numeric_dtype(chunk[f])]
+            vocab = {f: {} for f in categorical}
+
+        features = chunk[feature_names].copy()
+        for feature in categorical:
+            values = features[feature].fillna('').astype(str)
+            codes = vocab[feature]
+            for value in values.unique():
+                codes.setdefault(value, len(codes))
+            features[feature] = values.map(codes)
+        features = features.apply(pd.to_numeric, errors='coerce').fillna(0)
+
+        numeric = [f for f in feature_names if f not in categorical]
+        if numeric:
+            scaler.partial_fit(features[numeric])
+        blocks.append(features.to_numpy(dtype=np.float32))
+        labels.append(chunk[TARGET].to_numpy())
+
+    if feature_names is None:
+        raise ValueError(f"No rows found in {csv_path}")
+
+    matrix = np.concatenate(blocks)
+    del blocks
+    label_encoders = {}
+    for feature in categorical:
+        classes = sorted(vocab[feature])
+        remap = np.empty(len(classes), dtype=np.float32)
+        for rank, value in enumerate(classes):
+            remap[vocab[feature][value]] = rank
+        pos = feature_names.index(feature)
+        matrix[:, pos] = remap[matrix[:, pos].astype(np.int64)]
+        encoder = LabelEncoder()
+        encoder.classes_ = np.array(classes)
+        label_encoders[feature] = encoder
+
+    return matrix, np.concatenate(labels), feature_names, label_encoders, scaler
+
+
+def scale_matrix(matrix, feature_names, label_encoders, scaler):
+    """
+    Standardize the numeric columns in place, exactly as the app does at
+    prediction time.
+    """
+    positions = [i for i, f in enumerate(feature_names) if f not in label_encoders]
+    if positions:
+        matrix[:, positions] -= scaler.mean_.astype(np.float32)
+        matrix[:, positions] /= scaler.scale_.astype(np.float32)
+    return matrix
+
+
+def make_model(params, seed, n_jobs):
+    return xgb.XGBClassifier(
+        objective='multi:softprob',
+        tree_method='hist',
+        random_state=seed,
+        n_jobs=n_jobs,
+        **params
+    )
+
+
+def fit_fold(X, y, train_idx, test_idx, params, seed):
+    """
+    Fit and score one (params, fold) pair on a single thread; the process
+    pool provides the parallelism.
+    """
+    model = make_model(params, seed, n_jobs=1)
+    model.fit(X[train_idx], y[train_idx])
+    return float(np.mean(model.predict(X[test_idx]) == y[test_idx]))
+
+
+def search(X, y, grid, folds, seed, n_jobs):
+    """
+    Cross-validate every parameter combination in grid and return the
+    results sorted best first.
+    """
+    names = sorted(grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+
+    tasks = [(params, train_idx, test_idx) for params in candidates for train_idx, test_idx in splits]
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(fit_fold)(X, y, train_idx, test_idx, params, seed)
+        for params, train_idx, test_idx in tasks
+    )
+
+    results = []
+    for i, params in enumerate(candidates):
+        fold_scores = scores[i * folds:(i + 1) * folds]
+        results.append({
+            'params': params,
+            'mean_accuracy': float(np.mean(fold_scores)),
+            'std_accuracy': float(np.std(fold_scores))
+        })
+    return sorted(results, key=lambda r: -r['mean_accuracy'])
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_artifacts(output_dir, model, feature_names, label_encoders, scaler, reverse_mapping, metadata, bundle=False):
+    """
+    Write the pickled artifacts (and optionally a bundle) to output_dir.
+    Files go to a temporary directory that is renamed into place, so the
+    model watcher never sees a half-written version.
+    """
+    parent, name = os.path.split(os.path.abspath(output_dir))
+    tmp_dir = os.path.join(parent, f".{name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    joblib.dump(model, os.path.join(tmp_dir, 'xgboost_green_certified_model.pkl'))
+    joblib.dump(label_encoders, os.path.join(tmp_dir, 'label_encoders.pkl'))
+    joblib.dump(feature_names, os.path.join(tmp_dir, 'feature_names.pkl'))
+    joblib.dump(scaler, os.path.join(tmp_dir, 'scaler.pkl'))
+    joblib.dump(reverse_mapping, os.path.join(tmp_dir, 'reverse_mapping.pkl'))
+    if bundle:
+        write_bundle(os.path.join(tmp_dir, BUNDLE_FILENAME),
+                     model, feature_names, label_encoders, scaler, reverse_mapping)
+    with open(os.path.join(tmp_dir, 'training.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    if not os.path.isdir(output_dir):
+        os.rename(tmp_dir, output_dir)
+        return
+    # Updating an existing directory (such as models/) in place: replace
+    # the files one by one and leave everything else there untouched
+    for name in os.listdir(tmp_dir):
+        os.replace(os.path.join(tmp_dir, name), os.path.join(output_dir, name))
+    os.rmdir(tmp_dir)
+    # The loader prefers a bundle over the pickles, so a bundle left from
+    # an earlier run would keep serving the old model
+    stale_bundle = os.path.join(output_dir, BUNDLE_FILENAME)
+    if not bundle and os.path.exists(stale_bundle):
+        os.remove(stale_bundle)
+        print(f"Removed stale {stale_bundle}")
+
+
+def train(csv_path, output_dir, chunksize=100_000, folds=5, grid=None, seed=42, n_jobs=-1, bundle=False):
+    """
+    Run the full pipeline and return the training metadata.
+    """
+    timer = StageTimer()
+
+    with timer('read_and_encode'):
+        X, ratings, feature_names, label_encoders, scaler = read_training_data(csv_path, chunksize)
+        classes = np.unique(ratings)
+        y = np.searchsorted(classes, ratings)
+        reverse_mapping = {i: np.int64(label) for i, label in enumerate(classes)}
+        print(f"{len(X)} rows, {len(feature_names)} features, classes {classes.tolist()}")
+
+    with timer('scale'):
+        scale_matrix(X, feature_names, label_encoders, scaler)
+
+    results = []
+    params = dict(DEFAULT_PARAMS)
+    if grid:
+        with timer('cross_validate'):
+            results = search(X, y, grid, folds, seed, n_jobs)
+            params = results[0]['params']
+            for result in results:
+                print(f"  {result['params']}: {result['mean_accuracy']:.4f} "
+                      f"(+/- {result['std_accuracy']:.4f})")
+
+    with timer('fit_final'):
+        model = make_model(params, seed, n_jobs)
+        model.fit(X, y)
+
+    metadata = {
+        'trained_at': datetime.now().isoformat(),
+        'csv': os.path.abspath(csv_path),
+        'csv_sha256': file_sha256(csv_path),
+        'rows': int(len(X)),
+        'seed': seed,
+        'folds': folds if grid else None,
+        'params': params,
+        'cv_results': results,
+        'xgboost_version': xgb.__version__,
+        'stage_seconds': timer.stages
+    }
+    with timer('save'):
+        save_artifacts(output_dir, model, feature_names, label_encoders, scaler,
+                       reverse_mapping, metadata, bundle)
+    metadata['stage_seconds'] = timer.stages
+
+    print(timer.report())
+    print(f"Wrote model to {output_dir}")
+    return metadata
+
+
+def promote(staged_dir, models_dir='models'):
+    """
+    Deploy a staged model by renaming it into models/versions/, where the
+    running app picks it up on its next check.
+    """
+    staged_dir = os.path.normpath(staged_dir)
+    name = os.path.basename(staged_dir)
+    if not os.path.isfile(os.path.join(staged_dir, 'training.json')):
+        raise SystemExit(f"Not a trained model directory: {staged_dir}")
+    versions_dir = os.path.join(models_dir, 'versions')
+    target = os.path.join(versions_dir, name)
+    if os.path.exists(target):
+        raise SystemExit(f"Version already deployed: {target}")
+    os.makedirs(versions_dir, exist_ok=True)
+    os.rename(staged_dir, target)
+    print(f"Promoted {staged_dir} to {target}")
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the Green Verify rating model')
+    parser.add_argument('--csv', default='green_building.csv')
+    parser.add_argument('--output', default=None,
+                        help='artifact directory (default: models/staging/<timestamp>, '
+                             'which the app does not serve until promoted)')
+    parser.add_argument('--promote', metavar='STAGED_DIR', default=None,
+                        help='deploy a staged model to models/versions/ instead of training')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--no-search', action='store_true',
+                        help='skip cross-validation and fit the default parameters')
+    parser.add_argument('--grid', default=None,
+                        help='JSON object mapping XGBoost parameters to candidate lists')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--bundle', action='store_true', help='also write greenverify.bundle')
+    args = parser.parse_args()
+
+    if args.promote:
+        promote(args.promote)
+        return
+
+    grid = None if args.no_search else (json.loads(args.grid) if args.grid else DEFAULT_GRID)
+    output = args.output or os.path.join('models', 'staging', datetime.now().strftime('%Y%m%d-%H%M%S'))
+    train(args.csv, output, args.chunksize, args.folds, grid, args.seed, args.n_jobs, args.bundle)
+    if not args.output:
+        print(f"Review training.json, then deploy with: python train.py --promote {output}")
+
+
+if __name__ == '__main__':
+    main()
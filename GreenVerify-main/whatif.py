@@ -0,0 +1,270 @@
+"""
+Counterfactual "what to improve" search over the loaded model.
+
+Given a building's inputs, finds the smallest changes that raise the
+predicted rating. Candidates are scored in vectorized batches through the
+booster: single-feature changes first, then pairs and triples of the most
+promising features, stopping at the smallest number of changes that
+reaches the target. Every move respects FEATURE_CONSTRAINTS: features
+only move in their improving direction within the range seen in
+green_building.csv. Features coded as a few integer levels there (0/1
+flags, or scores such as Waste_Management from 0 to 4) move between
+those levels, so a flag can only be switched on.
+"""
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from explain import feature_label
+from inference import score
+from prediction_cache import PredictionCache
+from prompts import format_value
+
+# Improving direction per feature: +1 higher is better, -1 lower is better.
+# Features not listed here are never changed.
+FEATURE_CONSTRAINTS = {
+    'Energy_Consumption_Reduction': {'direction': 1},
+    'Waste_Management': {'direction': 1},
+    'Utilization_Of_Alternative_Materials': {'direction': 1},
+    'Soil_Preservation(m^3)': {'direction': 1},
+    'Renewable_Energy_Utilization(MW)': {'direction': 1},
+    'Water_Demand_Reduction(Building)': {'direction': 1},
+    'Waste_Demand_Reduction(Landscape)': {'direction': 1},
+    'Waste_Water_Treatment(KLD)': {'direction': 1},
+    'Social_Benefits': {'direction': 1},
+    'VOC/Lead Free Paints': {'direction': 1},
+    'EPI(Energy Performance Index)': {'direction': -1},
+    'Daylight_Factor': {'direction': 1},
+    'EPR(Energy performane Reduction)': {'direction': 1},
+    'Air_Pollution_Control': {'direction': 1},
+    'Building Performance(kWh /sqm/year)': {'direction': -1},
+    'Water_Consumption_in_building(KL/annum)': {'direction': -1},
+    'Renewable_Energy_REC(kWH/annum)': {'direction': 1},
+}
+
+# A feature whose reference values are at most this many integers is
+# treated as discrete levels rather than a continuous quantity
+MAX_DISCRETE_LEVELS = 10
+
+
+class WhatIfOptimizer:
+    """
+    Searches one model bundle for minimal improving changes. Population
+    quantiles give the candidate values, and the spread between the 10th
+    and 90th percentiles normalizes the cost of moving each feature.
+    """
+
+    def __init__(self, bundle, reference_csv='green_building.csv', cache_store=None,
+                 levels=24, beam=6, max_changes=3, time_budget=0.5):
+        self.bundle = bundle
+        self.cache_store = cache_store
+        self.levels = levels
+        self.beam = beam
+        self.max_changes = max_changes
+        self.time_budget = time_budget
+
+        layout = bundle.layout
+        frame = pd.read_csv(reference_csv)
+        self.mutable = []
+        self.quantiles = {}
+        self.spread = {}
+        self.flags = set()
+        for pos, feature in enumerate(layout.feature_names):
+            constraint = FEATURE_CONSTRAINTS.get(feature)
+            if constraint is None or feature in bundle.label_encoders or feature not in frame.columns:
+                continue
+            values = pd.to_numeric(frame[feature], errors='coerce').dropna().to_numpy()
+            if not len(values):
+                continue
+            self.mutable.append((pos, feature, constraint))
+            levels = np.unique(values).astype(np.float64)
+            if len(levels) <= MAX_DISCRETE_LEVELS and np.array_equal(levels, np.round(levels)):
+                # Candidates are the levels themselves, one cost unit per level
+                self.quantiles[feature] = levels
+                self.spread[feature] = 1.0
+                if set(levels) <= {0, 1}:
+                    self.flags.add(feature)
+                continue
+            self.quantiles[feature] = np.unique(np.quantile(values, np.linspace(0, 1, 101)))
+            low, high = np.quantile(values, [0.1, 0.9])
+            self.spread[feature] = float(high - low) or float(values.std()) or 1.0
+
+        self.class_labels = np.array([int(bundle.reverse_mapping[i]) for i in range(len(bundle.reverse_mapping))])
+
+    def candidate_values(self, feature, constraint, current, levels):
+        """
+        Values a feature may move to: up to levels population quantiles
+        (or discrete levels) strictly beyond the current value in the
+        improving direction.
+        """
+        quantiles = self.quantiles[feature]
+        if constraint['direction'] > 0:
+            values = quantiles[quantiles > current]
+        else:
+            values = quantiles[quantiles < current][::-1]
+        if len(values) > levels:
+            values = values[np.linspace(0, len(values) - 1, levels).round().astype(int)]
+        return values
+
+    def cost(self, feature, constraint, current, value):
+        return abs(value - current) / self.spread[feature]
+
+    def _score(self, base, changes_list):
+        """
+        Score one candidate per entry of changes_list, each a tuple of
+        (position, value) pairs applied to the unscaled base row.
+        """
+        matrix = np.repeat(base[np.newaxis, :], len(changes_list), axis=0)
+        for i, changes in enumerate(changes_list):
+            for pos, value in changes:
+                matrix[i, pos] = value
+        self.bundle.layout.scale_inplace(matrix)
+        probs, indices = score(self.bundle.booster, matrix)
+        return probs, self.class_labels[indices]
+
+    def search(self, inputs, current_rating, target_rating=None, max_suggestions=3):
+        """
+        Find up to max_suggestions distinct sets of changes that reach
+        target_rating (default: one star above current_rating).
+        """
+        start = time.perf_counter()
+        target = target_rating or current_rating + 1
+        if target > self.class_labels.max():
+            return self._result(current_rating, target, [], 0, start, reason='Already at the highest rating')
+        target_index = int(np.searchsorted(self.class_labels, target))
+
+        base_row = self.bundle.layout.fill_row(inputs)
+        base = base_row[0].copy()
+
+        key = None
+        if self.cache_store is not None:
+            key = f"{PredictionCache.key(self.bundle.version, base_row)}:{target}:{max_suggestions}"
+            cached = self.cache_store.get(key)
+            if cached is not None:
+                return dict(cached, cached=True)
+
+        # Stage 1: every single-feature move, in one booster call
+        options = {}
+        singles = []
+        for pos, feature, constraint in self.mutable:
+            current = base[pos]
+            values = self.candidate_values(feature, constraint, current, self.levels)
+            if len(values):
+                options[pos] = (feature, constraint, current, values)
+                singles.extend(((pos, float(v)),) for v in values)
+        if not singles:
+            return self._result(current_rating, target, [], 0, start, reason='No feature can be improved')
+
+        probs, labels = self._score(base, singles)
+        evaluated = len(singles)
+        found = self._collect(singles, probs, labels, target, options)
+
+        # Prune to the features whose best single move helps the target most
+        gain = {}
+        for changes, prob in zip(singles, probs[:, target_index]):
+            pos = changes[0][0]
+            gain[pos] = max(gain.get(pos, 0.0), float(prob))
+        promising = sorted(gain, key=lambda pos: -gain[pos])[:self.beam]
+
+        # Stages 2+: combinations of promising features on coarser grids
+        for size in range(2, self.max_changes + 1):
+            if len(self._distinct(found, max_suggestions)) >= max_suggestions:
+                break
+            if time.perf_counter() - start > self.time_budget:
+                break
+            per_feature = max(4, int(round((self.levels * 6) ** (1.0 / size))))
+            best_cost = min((f['cost'] for f in found), default=np.inf)
+            combos = []
+            for positions in itertools.combinations(promising, size):
+                grids = []
+                for pos in positions:
+                    feature, constraint, current, values = options[pos]
+                    if len(values) > per_feature:
+                        values = values[np.linspace(0, len(values) - 1, per_feature).round().astype(int)]
+                    grids.append([(pos, float(v)) for v in values])
+                for changes in itertools.product(*grids):
+                    # Skip combinations already costlier than a known answer
+                    total = sum(self.cost(options[p][0], options[p][1], options[p][2], v) for p, v in changes)
+                    if total < best_cost:
+                        combos.append(changes)
+            if not combos:
+                continue
+            probs, labels = self._score(base, combos)
+            evaluated += len(combos)
+            found.extend(self._collect(combos, probs, labels, target, options))
+
+        suggestions = self._distinct(found, max_suggestions)
+        result = self._result(current_rating, target, suggestions, evaluated, start)
+        if key is not None:
+            self.cache_store.set(key, result)
+        return result
+
+    def _collect(self, candidates, probs, labels, target, options):
+        found = []
+        for i in np.flatnonzero(labels >= target):
+            changes = candidates[i]
+            found.append({
+                'changes': [
+                    {
+                        'feature': options[pos][0],
+                        'label': feature_label(options[pos][0]),
+                        'from': float(options[pos][2]),
+                        'to': value,
+                        'flag': options[pos][0] in self.flags
+                    }
+                    for pos, value in changes
+                ],
+                # A candidate can overshoot the target, so report the rating
+                # it is predicted at and that rating's probability
+                'rating': int(labels[i]),
+                'probability': float(probs[i].max()),
+                'cost': round(sum(self.cost(options[p][0], options[p][1], options[p][2], v) for p, v in changes), 4)
+            })
+        return found
+
+    @staticmethod
+    def _distinct(found, limit):
+        """
+        Cheapest suggestion for each distinct set of changed features,
+        preferring fewer changes, then lower cost.
+        """
+        best = {}
+        for suggestion in found:
+            features = frozenset(c['feature'] for c in suggestion['changes'])
+            rank = (len(features), suggestion['cost'])
+            if features not in best or rank < best[features][0]:
+                best[features] = (rank, suggestion)
+        return [s for _, s in sorted(best.values(), key=lambda item: item[0])][:limit]
+
+    def _result(self, current_rating, target, suggestions, evaluated, start, reason=None):
+        result = {
+            'model_version': self.bundle.version,
+            'current_rating': int(current_rating),
+            'target_rating': int(target),
+            'suggestions': suggestions,
+            'candidates_evaluated': evaluated,
+            'seconds': round(time.perf_counter() - start, 4)
+        }
+        if reason:
+            result['reason'] = reason
+        return result
+
+
+def describe_change(change):
+    if change.get('flag'):
+        return f"add {change['label']}"
+    verb = 'raise' if change['to'] > change['from'] else 'lower'
+    return f"{verb} {change['label']} from {format_value(change['from'])} to {format_value(change['to'])}"
+
+
+def suggestion_lines(result):
+    """
+    One plain-text line per suggestion, cheapest first.
+    """
+    return [
+        f"{i}. {', and '.join(describe_change(c) for c in s['changes'])} "
+        f"(predicted {s['rating']} stars, {s['probability']:.0%} probability)"
+        for i, s in enumerate(result['suggestions'], 1)
+    ]